@@ -15,7 +15,9 @@ from datetime import datetime
 
 from src.utils.config import Config
 from src.supabase_data_retriever import SupabaseDataRetriever
+from src.local_dvf_store import LocalDvfStore
 from src.estimation_algorithm import EstimationAlgorithm
+from src.scoring_profiles import load_configured_profiles
 from src.streamlit_components.form_input import render_form_input, get_well_params
 from src.streamlit_components.dashboard_metrics import render_dashboard_metrics
 from src.streamlit_components.comparables_table import render_comparables_table
@@ -26,6 +28,9 @@ from src.streamlit_components.pdf_export import render_pdf_export
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Profils de scoring nommés (Config.SCORING_PROFILES_PATH)
+load_configured_profiles()
+
 # ===================================
 # CONFIGURATION STREAMLIT
 # ===================================
@@ -64,11 +69,21 @@ st.markdown("""
 @st.cache_resource(show_spinner=False)
 def init_supabase_retriever():
     """Initialiser connexion Supabase (cache)"""
+    # Réplique locale (DVF_BACKEND=local): pas d'aller-retour réseau par estimation
+    if Config.DVF_BACKEND == "local":
+        store = LocalDvfStore()
+        if store.health_check():
+            logger.info(f"[OK] Réplique locale DVF+ {store.path}")
+            return store
+        logger.warning("[WARNING] Réplique locale vide, utilisation de Supabase")
+
     logger.info("[INFO] Initialisation Supabase...")
     try:
         retriever = SupabaseDataRetriever()
-        if retriever.test_connection():
+        if retriever.health_check():
             logger.info("[OK] Connexion Supabase OK")
+            # Connexions ouvertes (TLS) et catalogue chargé avant la première estimation
+            retriever.prewarm(2)
             return retriever
         else:
             logger.error("[ERROR] Connexion Supabase echouee")
@@ -216,7 +231,8 @@ else:
                     surface_max=bien_params['surface'] * (1 + surface_tolerance_pct / 100),
                     rayon_km=rayon_km,
                     annees=anciennete_max_ans,
-                    limit=50
+                    limit=50,
+                    as_set=True
                 )
 
                 st.session_state['comparables_df'] = comparables_df
@@ -237,25 +253,21 @@ else:
     if st.session_state['estimation_result'] is None and len(comparables_df) > 0:
         with st.spinner("Calcul estimation en cours..."):
             try:
-                # Convertir DF en list de dicts pour estimateur
-                comparables_list = comparables_df.to_dict('records')
-
-                # Effectuer estimation
+                # Effectuer estimation (ComparableSet passé tel quel)
                 estimation_result = estimator.estimate(
                     target_latitude=bien_params['latitude'],
                     target_longitude=bien_params['longitude'],
                     target_surface=bien_params['surface'],
                     target_type=bien_params['type_bien'],
-                    comparables=comparables_list
+                    comparables=comparables_df
                 )
 
                 st.session_state['estimation_result'] = estimation_result
 
-                # Ajouter les scores au DataFrame des comparables
-                if estimation_result.get('success') and estimation_result.get('comparables_with_scores'):
-                    comparables_with_scores = pd.DataFrame(estimation_result['comparables_with_scores'])
-                    st.session_state['comparables_df'] = comparables_with_scores
-                    comparables_df = comparables_with_scores
+                # Comparables enrichis de la colonne score
+                if estimation_result.get('success') and estimation_result.get('comparables_with_scores') is not None:
+                    comparables_df = estimation_result['comparables_with_scores']
+                    st.session_state['comparables_df'] = comparables_df
 
                 if estimation_result.get('success'):
                     st.success("[OK] Estimation calculee")
@@ -290,16 +302,22 @@ else:
 
         # === TAB 2 : COMPARABLES ===
         with tab2:
-            def recalculate_estimation(latitude, longitude, surface, type_bien, comparables, filtered=False):
+            def recalculate_estimation(latitude, longitude, surface, type_bien, comparables, filtered=False,
+                                       selection_indices=None):
                 """Callback pour recalcul estimation avec comparables filtrés"""
                 estimator = init_estimation_algorithm()
-                new_estimation = estimator.estimate(
-                    target_latitude=latitude,
-                    target_longitude=longitude,
-                    target_surface=surface,
-                    target_type=type_bien,
-                    comparables=comparables
-                )
+                previous = st.session_state.get('estimation_result') or {}
+                if selection_indices is not None and previous.get('incremental') is not None:
+                    # Scores déjà calculés : mise à jour incrémentale sur la sélection
+                    new_estimation = estimator.reestimate(previous, selection_indices)
+                else:
+                    new_estimation = estimator.estimate(
+                        target_latitude=latitude,
+                        target_longitude=longitude,
+                        target_surface=surface,
+                        target_type=type_bien,
+                        comparables=comparables
+                    )
                 st.session_state['estimation_result'] = new_estimation
                 st.session_state['comparables_filtered'] = comparables
 
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Construire l'index BAN local (géocodage hors ligne du département 74)
+Source: extrait départemental de la Base Adresse Nationale (CSV ;, gzip accepté).
+L'index (libellés normalisés triés + coordonnées) est écrit dans BAN_INDEX_PATH.
+
+Usage:
+    python scripts/maintenance/build_ban_index.py [--source adresses-74.csv.gz] [--output .cache/ban_74.npz]
+"""
+
+import argparse
+import os
+import sys
+import io
+import time
+
+# Forcer UTF-8 sur Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.utils.ban_geocoder import BanGeocoder
+from src.utils.config import Config
+
+SOURCE_BAN = "https://adresse.data.gouv.fr/data/ban/adresses/latest/csv/adresses-74.csv.gz"
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description="Construction de l'index BAN local")
+    parser.add_argument("--source", default=SOURCE_BAN, help="Extrait CSV BAN (fichier ou URL)")
+    parser.add_argument("--output", default=Config.BAN_INDEX_PATH, help="Fichier index (.npz)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("INDEX BAN LOCAL - CONSTRUCTION")
+    print("=" * 70)
+
+    try:
+        print(f"\nLecture {args.source}...")
+        start = time.time()
+        geocoder = BanGeocoder.from_csv(args.source)
+        print(f"   ✅ {len(geocoder)} entrées (adresses, voies, communes) en {time.time() - start:.1f}s")
+
+        geocoder.save(args.output)
+        taille_mo = os.path.getsize(args.output) / 1e6
+        print(f"   ✅ Index écrit: {args.output} ({taille_mo:.1f} Mo)")
+        return True
+    except Exception as e:
+        print(f"\n❌ ERREUR: {str(e)}")
+        return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synchroniser la réplique locale DVF+ (LocalDvfStore) depuis Supabase
+Incrémental par datemut (dernière date locale incluse); --full pour tout relire.
+
+Usage:
+    python scripts/maintenance/sync_local_dvf.py [--coddep 74] [--path .cache/dvf_local.sqlite] [--full]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import io
+
+# Forcer UTF-8 sur Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.local_dvf_store import LocalDvfStore
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description="Synchronisation de la réplique locale DVF+")
+    parser.add_argument("--coddep", default="74", help="Département répliqué")
+    parser.add_argument("--path", default=None, help="Fichier SQLite (défaut: LOCAL_DVF_PATH)")
+    parser.add_argument("--full", action="store_true", help="Relire tout l'historique")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    print("=" * 70)
+    print("SYNCHRONISATION RÉPLIQUE LOCALE DVF+")
+    print("=" * 70)
+
+    try:
+        store = LocalDvfStore(args.path)
+        print(f"\nRéplique: {store.path} (dernière mutation: {store.last_datemut() or 'aucune'})")
+        total = store.sync(coddep=args.coddep, full=args.full)
+        print(f"\n✅ {total} mutations synchronisées (dernière mutation: {store.last_datemut()})")
+        return True
+    except Exception as e:
+        print(f"\n❌ ERREUR: {str(e)}")
+        return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
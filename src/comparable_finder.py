@@ -1,19 +1,7 @@
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calcule la distance en km entre deux points GPS"""
-    R = 6371  # Rayon Terre en km
-    
-    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    
-    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-    c = 2 * np.arcsin(np.sqrt(a))
-    
-    return R * c
+from src.utils.distance import DistanceKernel
 
 def find_comparables(
     df,
@@ -25,7 +13,8 @@ def find_comparables(
     anciennete='ancien',
     max_radius_km=10,
     max_age_months=24,
-    surface_tolerance=0.25
+    surface_tolerance=0.25,
+    distance_mode="haversine"
 ):
     """
     Trouve les biens comparables selon méthodologie DV3F
@@ -40,6 +29,8 @@ def find_comparables(
         max_radius_km: Rayon max de recherche
         max_age_months: Ancienneté max des transactions
         surface_tolerance: Tolérance sur la surface (0.25 = ±25%)
+        distance_mode: 'haversine' (exact) ou 'equirectangular' (plus rapide,
+            erreur relative < 0.5% jusqu'à ~20 km)
         
     Returns:
         pd.DataFrame: Biens comparables triés par pertinence
@@ -56,12 +47,9 @@ def find_comparables(
     
     # 1. Calcul des distances
     print(f"\n   📏 Calcul des distances...")
-    df_search['distance_km'] = df_search.apply(
-        lambda row: haversine_distance(
-            target_lat, target_lon,
-            row['geompar_y'], row['geompar_x']
-        ),
-        axis=1
+    kernel = DistanceKernel(target_lat, target_lon, mode=distance_mode)
+    df_search['distance_km'] = kernel.distances(
+        df_search['geompar_y'].to_numpy(), df_search['geompar_x'].to_numpy()
     )
     
     # 2. Filtre rayon
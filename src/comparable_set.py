@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ComparableSet - Représentation en colonnes des comparables DVF+
+Utilisée de bout en bout : récupération, scoring, estimation, tableau, carte, PDF
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+
+# Colonnes typées (le reste est conservé tel quel)
+FLOAT_COLUMNS = ("latitude", "longitude", "sbati", "valeurfonc")
+DATE_COLUMN = "datemut"
+TYPE_COLUMN = "libtypbien"
+
+# Dates ISO (AAAA-MM-JJ, avec ou sans heure)
+_ISO_DATE_RE = re.compile(r"^\s*\d{4}-\d{2}-\d{2}")
+
+# Codes motif de validation (une passe par ensemble, voir ComparableSet.motifs_invalides)
+MOTIF_VALIDE = 0
+MOTIF_COORDONNEES_MANQUANTES = 1
+MOTIF_SURFACE_INVALIDE = 2
+MOTIF_DATE_INVALIDE = 3
+MOTIFS_LIBELLES = {
+    MOTIF_COORDONNEES_MANQUANTES: "coordonnees_manquantes",
+    MOTIF_SURFACE_INVALIDE: "surface_invalide",
+    MOTIF_DATE_INVALIDE: "date_invalide",
+}
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """
+    Parse une colonne de dates (format FR JJ/MM/AAAA, ISO ou datetime) en datetime64.
+    Les valeurs ISO (AAAA-MM-JJ, renvoyées par PostGIS et SQLite) sont lues en ISO 8601,
+    les autres en jour d'abord. Les valeurs non interprétables deviennent NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    iso = values.astype(str).str.match(_ISO_DATE_RE).to_numpy(dtype=bool)
+    parsed = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[ns]")
+    if iso.any():
+        parsed[iso] = _to_datetime(values[iso], format="ISO8601")
+    if not iso.all():
+        parsed[~iso] = _to_datetime(values[~iso], dayfirst=True)
+    return pd.Series(parsed, index=values.index)
+
+
+def _to_datetime(values: pd.Series, **options) -> np.ndarray:
+    """pd.to_datetime en une passe, sinon par valeur distincte (formats mélangés)"""
+    try:
+        return pd.to_datetime(values, **options).to_numpy(dtype="datetime64[ns]")
+    except (ValueError, TypeError):
+        def parse_one(value):
+            try:
+                return pd.to_datetime(value, **options)
+            except (ValueError, TypeError):
+                return pd.NaT
+
+        codes, uniques = pd.factorize(values)
+        parsed = pd.to_datetime(pd.Series([parse_one(value) for value in uniques] + [pd.NaT]))
+        return parsed.to_numpy(dtype="datetime64[ns]")[codes]
+
+
+class ComparableSet:
+    """
+    Ensemble de comparables stocké par colonnes (tableaux NumPy).
+
+    Colonnes typées:
+    - latitude, longitude, sbati, valeurfonc : float64 (NaN si manquant)
+    - datemut : datetime64 (NaT si non interprétable)
+    - libtypbien : codes entiers (type_codes) + libellés distincts (type_labels)
+
+    Les autres colonnes (idmutation, adresse, distance_km, score...) sont gardées
+    comme tableaux bruts. Les opérations (ajout de colonnes, sélection de lignes)
+    retournent un nouvel ensemble qui partage les tableaux non modifiés.
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        type_codes: Optional[np.ndarray] = None,
+        type_labels: Optional[Sequence[str]] = None
+    ):
+        self._columns = dict(columns)
+        lengths = {len(values) for values in self._columns.values()}
+        if type_codes is not None:
+            lengths.add(len(type_codes))
+        if len(lengths) > 1:
+            raise ValueError(f"Colonnes de longueurs différentes: {sorted(lengths)}")
+        self._length = lengths.pop() if lengths else 0
+        self.type_codes = type_codes
+        self.type_labels = list(type_labels) if type_labels is not None else []
+        self._order: Optional[List[str]] = None
+        self._motifs: Optional[np.ndarray] = None
+
+    # ===================================
+    # CONSTRUCTION
+    # ===================================
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "ComparableSet":
+        """Construit un ensemble depuis un DataFrame (une conversion par colonne)"""
+        columns = {}
+        type_codes = None
+        type_labels = None
+
+        for col in df.columns:
+            values = df[col]
+            if col in FLOAT_COLUMNS:
+                columns[col] = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+            elif col == DATE_COLUMN:
+                columns[col] = parse_dates(values).to_numpy(dtype="datetime64[ns]")
+            elif col == TYPE_COLUMN:
+                type_codes, uniques = pd.factorize(values)
+                type_labels = [str(label) for label in uniques]
+            else:
+                columns[col] = values.to_numpy()
+
+        comparable_set = cls(columns, type_codes, type_labels)
+        comparable_set._order = list(df.columns)
+        return comparable_set
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> "ComparableSet":
+        """Construit un ensemble depuis une liste de dicts"""
+        return cls.from_dataframe(pd.DataFrame(records))
+
+    @classmethod
+    def coerce(cls, comparables: Union["ComparableSet", pd.DataFrame, List[Dict], None]) -> "ComparableSet":
+        """Retourne un ComparableSet quel que soit le format d'entrée (sans copie si déjà un ensemble)"""
+        if isinstance(comparables, ComparableSet):
+            return comparables
+        if comparables is None:
+            return cls({})
+        if isinstance(comparables, pd.DataFrame):
+            return cls.from_dataframe(comparables)
+        return cls.from_records(list(comparables))
+
+    # ===================================
+    # ACCÈS
+    # ===================================
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def empty(self) -> bool:
+        """True si aucun comparable"""
+        return self._length == 0
+
+    @property
+    def columns(self) -> List[str]:
+        """Noms des colonnes disponibles (ordre d'origine conservé)"""
+        names = list(self._columns.keys())
+        if self.type_codes is not None:
+            names.append(TYPE_COLUMN)
+        if self._order:
+            rank = {name: i for i, name in enumerate(self._order)}
+            names.sort(key=lambda name: rank.get(name, len(rank)))
+        return names
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._columns or (column == TYPE_COLUMN and self.type_codes is not None)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        if column == TYPE_COLUMN and self.type_codes is not None:
+            labels = np.array(self.type_labels + [None], dtype=object)
+            return labels[self.type_codes]
+        return self._columns[column]
+
+    def get(self, column: str, default=None) -> Optional[np.ndarray]:
+        """Retourne la colonne ou default si absente"""
+        return self[column] if column in self else default
+
+    # ===================================
+    # VALIDATION
+    # ===================================
+
+    def motifs_invalides(self) -> np.ndarray:
+        """
+        Code motif par ligne (MOTIF_VALIDE = 0 si exploitable), calculé une fois par ensemble.
+        Premier motif rencontré: coordonnées manquantes, surface nulle/absente, date non interprétable.
+        """
+        if self._motifs is None:
+            n = self._length
+            missing = np.full(n, np.nan)
+            latitudes = self._columns.get("latitude", missing)
+            longitudes = self._columns.get("longitude", missing)
+            surfaces = self._columns.get("sbati", missing)
+            dates = self._columns.get(DATE_COLUMN)
+            dates_invalides = np.isnat(dates) if dates is not None else np.ones(n, dtype=bool)
+
+            self._motifs = np.select(
+                [
+                    np.isnan(latitudes) | np.isnan(longitudes),
+                    ~(surfaces > 0),
+                    dates_invalides
+                ],
+                [MOTIF_COORDONNEES_MANQUANTES, MOTIF_SURFACE_INVALIDE, MOTIF_DATE_INVALIDE],
+                MOTIF_VALIDE
+            ).astype(np.uint8)
+        return self._motifs
+
+    def resume_invalides(self) -> Dict[str, int]:
+        """Nombre de lignes par motif d'invalidité (vide si tout est valide)"""
+        codes, counts = np.unique(self.motifs_invalides(), return_counts=True)
+        return {
+            MOTIFS_LIBELLES[int(code)]: int(count)
+            for code, count in zip(codes, counts) if code != MOTIF_VALIDE
+        }
+
+    # ===================================
+    # TRANSFORMATIONS
+    # ===================================
+
+    def _derive(self, columns: Dict[str, np.ndarray], type_codes: Optional[np.ndarray]) -> "ComparableSet":
+        derived = ComparableSet(columns, type_codes, self.type_labels)
+        derived._order = self._order
+        return derived
+
+    def with_columns(self, **arrays: Iterable) -> "ComparableSet":
+        """Nouvel ensemble avec colonnes ajoutées/remplacées (tableaux existants partagés)"""
+        columns = dict(self._columns)
+        for name, values in arrays.items():
+            columns[name] = np.asarray(values)
+        derived = self._derive(columns, self.type_codes)
+        if not set(arrays) & {"latitude", "longitude", "sbati", DATE_COLUMN}:
+            derived._motifs = self._motifs
+        return derived
+
+    def take(self, indices: Sequence[int]) -> "ComparableSet":
+        """Nouvel ensemble restreint aux lignes d'indices donnés (positions)"""
+        indices = np.asarray(indices, dtype=int)
+        columns = {name: values[indices] for name, values in self._columns.items()}
+        type_codes = self.type_codes[indices] if self.type_codes is not None else None
+        return self._derive(columns, type_codes)
+
+    def filter(self, mask: np.ndarray) -> "ComparableSet":
+        """Nouvel ensemble restreint aux lignes où mask est True"""
+        return self.take(np.flatnonzero(mask))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Vue DataFrame (pour affichage Streamlit / export)"""
+        return pd.DataFrame({name: self[name] for name in self.columns})
+
+
+def format_date_fr(value) -> str:
+    """Formate une date (datetime64, Timestamp, str) en JJ/MM/AAAA pour affichage"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return "N/A"
+    if isinstance(value, str):
+        return value
+    return pd.Timestamp(value).strftime("%d/%m/%Y")
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ComparablesCache - Cache des résultats de get_comparables partagé par le processus
+Clé normalisée (cellule de grille, type, fourchette de surface, rayon, années), TTL et
+éviction LRU. Une recherche plus étroite (rayon plus petit, surface ou années plus
+restreintes) est servie en mémoire depuis un résultat plus large déjà en cache,
+à condition que celui-ci soit complet (moins de lignes que son LIMIT).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.distance import DistanceKernel
+
+# Taille de la cellule de grille des clés (degrés, ~1 km)
+CELLULE_DEG = 0.01
+
+# Tolérance pour considérer deux centres identiques (degrés)
+_EPSILON_CENTRE = 1e-7
+
+
+def ranking_key(ordre: str, distances_km: np.ndarray, age_jours: np.ndarray, rayon_km: float, annees: int) -> np.ndarray:
+    """
+    Clé de classement des comparables (croissante), mêmes critères que la requête SQL
+    (voir _ORDRES_COMPARABLES): plus récents, plus proches, ou hybride distance/récence.
+    """
+    if ordre == "recent":
+        return age_jours
+    if ordre == "distance":
+        return distances_km
+    return distances_km / rayon_km + age_jours / (annees * 365.0)
+
+
+def age_days(dates: np.ndarray, reference=None) -> np.ndarray:
+    """Âge en jours des mutations à la date de référence (par défaut: aujourd'hui)"""
+    reference = np.datetime64("today") if reference is None else np.datetime64(reference, "D")
+    return (reference - np.asarray(dates, dtype="datetime64[D]")).astype(float)
+
+
+def rank_comparables(df: pd.DataFrame, ordre: str, rayon_km: float, annees: int, limit: int) -> pd.DataFrame:
+    """
+    Classement avant le LIMIT (mêmes critères que la requête SQL, voir _ORDRES_COMPARABLES)
+    puis tri par distance.
+    """
+    if len(df) == 0:
+        return df.reset_index(drop=True)
+    cle = ranking_key(ordre, df["distance_km"].to_numpy(), age_days(df["datemut"].to_numpy()), rayon_km, annees)
+    df = df.iloc[np.argsort(cle, kind="stable")[:limit]]
+    return df.sort_values("distance_km", kind="stable").reset_index(drop=True)
+
+
+def filter_comparables(
+    df: pd.DataFrame,
+    latitude: float,
+    longitude: float,
+    surface_min: float,
+    surface_max: float,
+    rayon_km: float,
+    annees: int
+) -> pd.DataFrame:
+    """Applique en mémoire les critères d'une recherche (distance recalculée depuis le nouveau centre)"""
+    if len(df) == 0:
+        return df.copy()
+    distances = DistanceKernel(latitude, longitude).distances(
+        df["latitude"].to_numpy(), df["longitude"].to_numpy()
+    )
+    limite_date = np.datetime64("today") - np.timedelta64(int(annees * 365), "D")
+    sbati = df["sbati"].to_numpy(dtype=float)
+    mask = (
+        (distances <= rayon_km) &
+        (sbati >= surface_min) &
+        (sbati <= surface_max) &
+        (df["datemut"].to_numpy(dtype="datetime64[D]") >= limite_date)
+    )
+    return df[mask].assign(distance_km=distances[mask])
+
+
+class ComparablesCache:
+    """
+    Cache LRU + TTL des comparables.
+
+    Chaque entrée garde les paramètres exacts de sa requête et le DataFrame produit.
+    Lecture:
+    - même recherche (centre, critères, ordre) avec un LIMIT inférieur ou égal: reclassement
+    - sinon, entrée complète qui couvre la recherche: distance(centres) + rayon <= rayon en cache,
+      surface et années incluses, même type → filtrage en mémoire puis classement
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 900, cellule_deg: float = CELLULE_DEG):
+        """
+        Args:
+            maxsize: Nombre maximal d'entrées (éviction LRU)
+            ttl: Durée de vie d'une entrée en secondes
+            cellule_deg: Taille de la cellule de grille des clés (degrés)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cellule_deg = cellule_deg
+        self._entries: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.superset_hits = 0
+        self.misses = 0
+
+    def key(
+        self,
+        latitude: float,
+        longitude: float,
+        type_bien: str,
+        surface_min: float,
+        surface_max: float,
+        rayon_km: float,
+        annees: int
+    ) -> Tuple:
+        """Clé normalisée: cellule de grille, type, fourchette de surface, rayon, années"""
+        return (
+            int(np.floor(latitude / self.cellule_deg)),
+            int(np.floor(longitude / self.cellule_deg)),
+            type_bien,
+            round(float(surface_min), 1),
+            round(float(surface_max), 1),
+            round(float(rayon_km), 3),
+            int(annees)
+        )
+
+    def get(
+        self,
+        latitude: float,
+        longitude: float,
+        type_bien: str,
+        surface_min: float,
+        surface_max: float,
+        rayon_km: float,
+        annees: int,
+        limit: int,
+        ordre: str
+    ) -> Optional[pd.DataFrame]:
+        """Résultat servi depuis le cache (copie) ou None"""
+        now = time.time()
+        key = self.key(latitude, longitude, type_bien, surface_min, surface_max, rayon_km, annees)
+
+        with self._lock:
+            self._purge(now)
+
+            entry = self._entries.get(key)
+            if (
+                entry is not None and
+                entry["ordre"] == ordre and
+                limit <= entry["limit"] and
+                abs(entry["latitude"] - latitude) < _EPSILON_CENTRE and
+                abs(entry["longitude"] - longitude) < _EPSILON_CENTRE
+            ):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rank_comparables(entry["df"], ordre, rayon_km, annees, limit).copy()
+
+            for candidate_key, candidate in reversed(self._entries.items()):
+                if self._covers(candidate, latitude, longitude, type_bien, surface_min, surface_max, rayon_km, annees):
+                    self._entries.move_to_end(candidate_key)
+                    self.superset_hits += 1
+                    df = candidate["df"]
+                    break
+            else:
+                self.misses += 1
+                return None
+
+        filtered = filter_comparables(df, latitude, longitude, surface_min, surface_max, rayon_km, annees)
+        return rank_comparables(filtered, ordre, rayon_km, annees, limit).copy()
+
+    @staticmethod
+    def _covers(entry: Dict, latitude, longitude, type_bien, surface_min, surface_max, rayon_km, annees) -> bool:
+        """True si l'entrée est complète et couvre la recherche (disque, surface, années, type)"""
+        if not entry["complet"] or entry["type_bien"] != type_bien:
+            return False
+        if surface_min < entry["surface_min"] or surface_max > entry["surface_max"] or annees > entry["annees"]:
+            return False
+        ecart_km = DistanceKernel(entry["latitude"], entry["longitude"]).distance(latitude, longitude)
+        return ecart_km + rayon_km <= entry["rayon_km"]
+
+    def put(
+        self,
+        latitude: float,
+        longitude: float,
+        type_bien: str,
+        surface_min: float,
+        surface_max: float,
+        rayon_km: float,
+        annees: int,
+        limit: int,
+        ordre: str,
+        df: pd.DataFrame
+    ) -> None:
+        """Enregistre un résultat (complet si moins de lignes que le LIMIT)"""
+        key = self.key(latitude, longitude, type_bien, surface_min, surface_max, rayon_km, annees)
+        entry = {
+            "latitude": float(latitude),
+            "longitude": float(longitude),
+            "type_bien": type_bien,
+            "surface_min": float(surface_min),
+            "surface_max": float(surface_max),
+            "rayon_km": float(rayon_km),
+            "annees": int(annees),
+            "limit": int(limit),
+            "ordre": ordre,
+            "complet": len(df) < limit,
+            "df": df.copy(),
+            "expires_at": time.time() + self.ttl
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _purge(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if entry["expires_at"] <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Compteurs d'utilisation"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "superset_hits": self.superset_hits,
+                "misses": self.misses
+            }
+
+
+# Instance globale (partagée par toutes les sessions du processus)
+_comparables_cache: Optional[ComparablesCache] = None
+
+
+def get_comparables_cache() -> ComparablesCache:
+    """Retourne instance singleton ComparablesCache"""
+    global _comparables_cache
+    if _comparables_cache is None:
+        _comparables_cache = ComparablesCache()
+    return _comparables_cache
@@ -5,30 +5,124 @@ EstimationAlgorithm - Classe pour estimation immobilière par scoring multi-crit
 Phase 3 - Algorithmes d'estimation
 """
 
+import copy
 import logging
 import math
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import pandas as pd
 import numpy as np
 
+from src.comparable_set import MOTIF_VALIDE, ComparableSet, parse_dates
+from src.utils.distance import DistanceKernel
+from src.scoring_profiles import DEFAULT_PROFILE, ScoringProfile, compile_profile
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _numeric_column(comparables: ComparableSet, column: str) -> np.ndarray:
+    """Colonne numérique en float (valeur manquante → 0)"""
+    if column not in comparables:
+        return np.zeros(len(comparables))
+    return np.nan_to_num(comparables[column].astype(float), nan=0.0)
+
+
+def _jours_ecoules(dates: np.ndarray, reference: Optional[datetime] = None) -> np.ndarray:
+    """Nombre de jours entiers écoulés depuis chaque date datetime64 (NaN si date manquante)"""
+    if reference is None:
+        reference = datetime.now()
+    delta = np.datetime64(reference, "ns") - dates.astype("datetime64[ns]")
+    jours = np.floor(delta / np.timedelta64(1, "D"))
+    return np.where(np.isnat(delta), np.nan, jours)
+
+
+def _scored_tuples_to_arrays(
+    comparables_with_scores: List[Tuple[Dict, float]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convertit une liste de tuples (comparable_dict, score) en colonnes scores / prix / dates"""
+    scores = np.array([s for _, s in comparables_with_scores], dtype=float)
+    prix = np.array([
+        float(c.get("valeurfonc")) if c.get("valeurfonc") is not None else np.nan
+        for c, _ in comparables_with_scores
+    ], dtype=float)
+    dates = parse_dates(
+        pd.Series([c.get("datemut") for c, _ in comparables_with_scores], dtype=object)
+    ).to_numpy(dtype="datetime64[ns]")
+    return scores, prix, dates
+
+
+def compute_comparable_stats(
+    scores: np.ndarray,
+    prix: np.ndarray,
+    dates: Optional[np.ndarray] = None,
+    reference_date: Optional[datetime] = None
+) -> Dict:
+    """
+    Statistiques des comparables valides (score >= MIN_COMPARABLE_SCORE) en une passe.
+    Lues par EstimationEngine, ConfidenceCalculator et le résumé des comparables.
+
+    Returns:
+        Dict avec keys: nb_valides, nb_prix, prix_pondere, prix_p25, prix_p75,
+        coefficient_variation (None si < 2 prix), mois_moyen (None si aucune date),
+        score_moyen, score_min, score_max
+    """
+    valides = scores >= EstimationEngine.MIN_COMPARABLE_SCORE
+    scores_valides = scores[valides]
+    stats = {
+        "nb_valides": len(scores_valides),
+        "nb_prix": 0,
+        "prix_pondere": None,
+        "prix_p25": None,
+        "prix_p75": None,
+        "coefficient_variation": None,
+        "mois_moyen": None,
+        "score_moyen": None,
+        "score_min": None,
+        "score_max": None
+    }
+    if not len(scores_valides):
+        return stats
+
+    stats["score_moyen"] = float(scores_valides.mean())
+    stats["score_min"] = float(scores_valides.min())
+    stats["score_max"] = float(scores_valides.max())
+
+    # Prix: moyenne pondérée par les scores, quartiles, dispersion
+    prix_valides = prix[valides]
+    avec_prix = prix_valides > 0
+    prix_array = prix_valides[avec_prix]
+    stats["nb_prix"] = len(prix_array)
+    if len(prix_array):
+        poids = scores_valides[avec_prix]
+        stats["prix_pondere"] = float(np.dot(prix_array, poids) / poids.sum())
+        stats["prix_p25"], stats["prix_p75"] = (float(q) for q in np.percentile(prix_array, [25, 75]))
+        if len(prix_array) > 1:
+            stats["coefficient_variation"] = float(np.std(prix_array) / np.mean(prix_array))
+
+    # Ancienneté moyenne (mois)
+    if dates is not None:
+        mois = _jours_ecoules(dates[valides], reference_date) / 30.44
+        mois = mois[~np.isnan(mois)]
+        if len(mois):
+            stats["mois_moyen"] = float(mois.mean())
+
+    return stats
+
+
 class SimilarityScorer:
     """Calcule les scores de similarité multi-critères (0-100)"""
 
-    # Paramètres de scoring
-    DISTANCE_WEIGHT = 0.25
-    SURFACE_WEIGHT = 0.25
-    TYPE_WEIGHT = 0.25
-    ANCIENNETE_WEIGHT = 0.25
+    # Paramètres de scoring (profil par défaut, voir src/scoring_profiles.py)
+    DISTANCE_WEIGHT = DEFAULT_PROFILE.distance_weight
+    SURFACE_WEIGHT = DEFAULT_PROFILE.surface_weight
+    TYPE_WEIGHT = DEFAULT_PROFILE.type_weight
+    ANCIENNETE_WEIGHT = DEFAULT_PROFILE.anciennete_weight
 
     # Limites
-    SURFACE_TOLERANCE_PCT = 0.20  # ±20%
-    DISTANCE_MAX_KM = 15.0
+    SURFACE_TOLERANCE_PCT = DEFAULT_PROFILE.surface_tolerance_pct  # ±20%
+    DISTANCE_MAX_KM = DEFAULT_PROFILE.distance_max_km
     ANCIENNETE_MAX_MOIS = 36
 
     @staticmethod
@@ -72,30 +166,26 @@ class SimilarityScorer:
     def score_type(type_target: str, type_comparable: str) -> float:
         """
         Match de type : 100 si identique, 50 si compatible, 0 sinon
+        (matrice de compatibilité du profil par défaut)
         """
-        if type_target.lower() == type_comparable.lower():
-            return 100
-
-        # Compatibilité partielle
-        compatible_pairs = [
-            ("maison", "appartement"),
-            ("studio", "apartement"),
-        ]
-
-        pair = (type_target.lower(), type_comparable.lower())
-        if pair in compatible_pairs or (pair[1], pair[0]) in compatible_pairs:
-            return 50
-
-        return 0
+        return compile_profile().type_score(type_target, type_comparable)
 
     @staticmethod
-    def score_anciennete(date_mutation: datetime) -> float:
+    def score_anciennete(date_mutation: datetime, reference_date: Optional[datetime] = None) -> float:
         """
         Score ancienneté (récence des données).
         100 = <12 mois, 80 = 12-24 mois, 50 = 24-36 mois, 0 = >36 mois
+
+        Args:
+            date_mutation: Date de la transaction (datetime, date ou datetime64; chaîne acceptée)
+            reference_date: Date de référence de l'estimation (défaut = maintenant)
         """
+        if reference_date is None:
+            reference_date = datetime.now()
         try:
-            if isinstance(date_mutation, str):
+            if isinstance(date_mutation, np.datetime64):
+                date_mutation = pd.Timestamp(date_mutation)
+            elif isinstance(date_mutation, str):
                 # Supporte format FR (JJ/MM/AAAA) ou ISO
                 date_mutation = pd.to_datetime(date_mutation, dayfirst=True)
 
@@ -107,16 +197,8 @@ class SimilarityScorer:
                 # C'est une date, la convertir en datetime
                 date_mutation = datetime.combine(date_mutation, datetime.min.time())
 
-            mois_ecoulis = (datetime.now() - date_mutation).days / 30.44
-
-            if mois_ecoulis <= 12:
-                return 100
-            elif mois_ecoulis <= 24:
-                return 80 - (mois_ecoulis - 12) * (30 / 12)  # Déclin à 50 à 24 mois
-            elif mois_ecoulis <= 36:
-                return 50 - (mois_ecoulis - 24) * (50 / 12)  # Déclin à 0 à 36 mois
-            else:
-                return 0
+            # Courbe du profil par défaut, indexée par l'âge en jours
+            return compile_profile().recency_score((reference_date - date_mutation).days)
         except Exception as e:
             logger.warning(f"Erreur scoring ancienneté: {e}")
             return 50
@@ -150,7 +232,8 @@ class SimilarityScorer:
         target_longitude: float,
         target_surface: float,
         target_type: str,
-        comparable: Dict
+        comparable: Dict,
+        reference_date: Optional[datetime] = None
     ) -> float:
         """
         Calcule le score global de similarité (0-100) pour un comparable.
@@ -160,78 +243,214 @@ class SimilarityScorer:
             target_surface: Surface du bien cible en m²
             target_type: Type du bien cible
             comparable: Dict avec keys: latitude, longitude, sbati, libtypbien, datemut
+            reference_date: Date de référence pour l'ancienneté (défaut = maintenant)
 
         Returns:
-            Score 0-100
+            Score 0-100 (0 si le comparable est invalide: coordonnées, surface ou date)
         """
-        try:
-            # Convertir tous les valeurs Decimal en float
-            def to_float(val):
-                """Convertit Decimal ou autre type en float"""
-                from decimal import Decimal
-                if isinstance(val, Decimal):
-                    return float(val)
-                return float(val) if val is not None else 0
-
-            # Distance
-            distance_km = SimilarityScorer.haversine_distance(
-                to_float(target_latitude),
-                to_float(target_longitude),
-                to_float(comparable.get("latitude")),
-                to_float(comparable.get("longitude"))
-            )
-            distance_score = SimilarityScorer.score_distance(distance_km)
+        # Même chemin que le scoring vectorisé, sur une ligne
+        return float(SimilarityScorer.score_batch(
+            target_latitude, target_longitude, target_surface, target_type,
+            ComparableSet.from_records([comparable]), reference_date
+        )[0])
 
-            # Surface
-            surface_score = SimilarityScorer.score_surface(
-                to_float(target_surface),
-                to_float(comparable.get("sbati", 0))
-            )
+    @staticmethod
+    def score_batch(
+        target_latitude: float,
+        target_longitude: float,
+        target_surface: float,
+        target_type: str,
+        comparables: ComparableSet,
+        reference_date: Optional[datetime] = None,
+        profile: Union[str, ScoringProfile, None] = None
+    ) -> np.ndarray:
+        """
+        Calcule les scores de similarité (0-100) de tous les comparables en une passe vectorisée.
+        Même barème que calculate_comparable_score, appliqué colonne par colonne.
 
-            # Type - normalize DVF+ type to standard format
-            comparable_type_raw = comparable.get("libtypbien", "Inconnu")
-            comparable_type_normalized = SimilarityScorer._normalize_property_type(comparable_type_raw)
-            type_score = SimilarityScorer.score_type(
-                target_type,
-                comparable_type_normalized
-            )
+        Args:
+            target_latitude, target_longitude: Coordonnées du bien cible
+            target_surface: Surface du bien cible en m²
+            target_type: Type du bien cible
+            comparables: ComparableSet (ou DataFrame) avec colonnes: latitude, longitude, sbati, libtypbien, datemut
+            reference_date: Date de référence pour l'ancienneté (défaut = maintenant)
+            profile: Profil de scoring (nom ou ScoringProfile, défaut = barème historique)
 
-            # Ancienneté
-            anciennete_score = SimilarityScorer.score_anciennete(
-                comparable.get("datemut")
+        Returns:
+            Vecteur numpy des scores 0-100 (même ordre que les lignes, 0 pour les lignes invalides)
+        """
+        comparables = ComparableSet.coerce(comparables)
+        n = len(comparables)
+        if n == 0:
+            return np.zeros(0)
+        compiled = compile_profile(profile)
+
+        # Lignes invalides (motif != 0) exclues une fois pour toutes: score 0
+        valides = np.flatnonzero(comparables.motifs_invalides() == MOTIF_VALIDE)
+        if len(valides) < n:
+            scores = np.zeros(n)
+            scores[valides] = SimilarityScorer.score_batch(
+                target_latitude, target_longitude, target_surface, target_type,
+                comparables.take(valides), reference_date, profile
             )
+            return scores
 
-            # Score pondéré
-            total_score = (
-                distance_score * SimilarityScorer.DISTANCE_WEIGHT +
-                surface_score * SimilarityScorer.SURFACE_WEIGHT +
-                type_score * SimilarityScorer.TYPE_WEIGHT +
-                anciennete_score * SimilarityScorer.ANCIENNETE_WEIGHT
-            )
+        distance_scores, surface_scores = SimilarityScorer._spatial_scores(
+            compiled, target_latitude, target_longitude, target_surface, comparables
+        )
+        type_scores, anciennete_scores = SimilarityScorer._type_recency_scores(
+            compiled, target_type, comparables, np.arange(n), reference_date
+        )
 
-            return max(0, min(100, total_score))
-        except Exception as e:
-            logger.error(f"Erreur calcul score comparable: {e}")
-            return 0
+        # Score pondéré
+        total_scores = np.column_stack(
+            [distance_scores, surface_scores, type_scores, anciennete_scores]
+        ) @ compiled.weights
+
+        return np.clip(total_scores, 0, 100)
 
     @staticmethod
-    def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """Calcule la distance en km entre deux points (lat, lon) via Haversine"""
-        try:
-            R = 6371  # Rayon Terre en km
+    def score_top_k(
+        target_latitude: float,
+        target_longitude: float,
+        target_surface: float,
+        target_type: str,
+        comparables: ComparableSet,
+        k: int,
+        reference_date: Optional[datetime] = None,
+        profile: Union[str, ScoringProfile, None] = None,
+        min_score: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sélectionne les K meilleurs comparables avec élagage anticipé.
 
-            lat1_rad = math.radians(lat1)
-            lat2_rad = math.radians(lat2)
-            delta_lat = math.radians(lat2 - lat1)
-            delta_lon = math.radians(lon2 - lon1)
+        Les scores distance et surface sont calculés pour toutes les lignes; ils donnent
+        une borne basse et une borne haute (type et ancienneté au maximum) du score final.
+        Les lignes dont la borne haute ne peut atteindre min_score ni la K-ième meilleure
+        borne basse sont écartées avant le calcul des scores type et ancienneté.
 
-            a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-            c = 2 * math.asin(math.sqrt(a))
+        Args:
+            k: Nombre de comparables à conserver
+            min_score: Score minimum (défaut = EstimationEngine.MIN_COMPARABLE_SCORE)
+            (autres arguments comme score_batch)
 
-            return R * c
-        except Exception as e:
-            logger.error(f"Erreur calcul distance: {e}")
-            return 999
+        Returns:
+            (positions, scores) des comparables retenus, triés par score décroissant
+        """
+        comparables = ComparableSet.coerce(comparables)
+        if min_score is None:
+            min_score = EstimationEngine.MIN_COMPARABLE_SCORE
+        if len(comparables) == 0 or k <= 0:
+            return np.zeros(0, dtype=int), np.zeros(0)
+        compiled = compile_profile(profile)
+        weights = compiled.weights
+
+        distance_scores, surface_scores = SimilarityScorer._spatial_scores(
+            compiled, target_latitude, target_longitude, target_surface, comparables
+        )
+        # Lignes invalides: bornes à -inf, jamais candidates
+        invalides = comparables.motifs_invalides() != MOTIF_VALIDE
+        borne_basse = np.where(invalides, -np.inf, distance_scores * weights[0] + surface_scores * weights[1])
+        # Maxima sur les tables compilées (un profil peut donner à une paire compatible
+        # un score supérieur à type_match_score)
+        type_lookup = SimilarityScorer._type_lookup(compiled, target_type, comparables)
+        anciennetes = np.append(compiled.recency_by_day, [0.0, compiled.profile.anciennete_inconnue_score])
+        borne_haute = (
+            borne_basse +
+            (type_lookup * weights[2]).max() +
+            (anciennetes * weights[3]).max()
+        )
+
+        seuil = min_score
+        if len(borne_basse) > k:
+            # K-ième meilleure borne basse: une ligne en dessous ne peut entrer dans le top K
+            seuil = max(seuil, np.partition(borne_basse, -k)[-k])
+        candidats = np.flatnonzero(borne_haute >= seuil)
+
+        type_scores, anciennete_scores = SimilarityScorer._type_recency_scores(
+            compiled, target_type, comparables, candidats, reference_date, type_lookup
+        )
+        scores = np.clip(
+            borne_basse[candidats] + type_scores * weights[2] + anciennete_scores * weights[3], 0, 100
+        )
+
+        retenus = scores >= min_score
+        candidats, scores = candidats[retenus], scores[retenus]
+        if len(scores) > k:
+            top = np.argpartition(scores, -k)[-k:]
+            candidats, scores = candidats[top], scores[top]
+
+        ordre = np.argsort(-scores, kind="stable")
+        return candidats[ordre], scores[ordre]
+
+    @staticmethod
+    def _spatial_scores(
+        compiled,
+        target_latitude: float,
+        target_longitude: float,
+        target_surface: float,
+        comparables: ComparableSet
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores distance et surface (toutes les lignes)"""
+        # Distance (trigonométrie du bien cible calculée une fois)
+        distances_km = DistanceKernel(target_latitude, target_longitude).distances(
+            _numeric_column(comparables, "latitude"),
+            _numeric_column(comparables, "longitude")
+        )
+        distance_scores = compiled.distance_scores(distances_km)
+
+        # Surface
+        surface_scores = compiled.surface_scores(float(target_surface), _numeric_column(comparables, "sbati"))
+        return distance_scores, surface_scores
+
+    @staticmethod
+    def _type_lookup(compiled, target_type: str, comparables: ComparableSet) -> np.ndarray:
+        """Table score_type par code de libellé distinct (normalisation une fois par libellé)"""
+        labels = comparables.type_labels if comparables.type_codes is not None else []
+        return compiled.type_lookup(
+            target_type, [SimilarityScorer._normalize_property_type(label) for label in labels]
+        )
+
+    @staticmethod
+    def _type_recency_scores(
+        compiled,
+        target_type: str,
+        comparables: ComparableSet,
+        positions: np.ndarray,
+        reference_date: Optional[datetime],
+        type_lookup: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores type et ancienneté pour les lignes aux positions données"""
+        # Type - lookup par code de libellé distinct
+        if type_lookup is None:
+            type_lookup = SimilarityScorer._type_lookup(compiled, target_type, comparables)
+        if comparables.type_codes is not None:
+            codes = comparables.type_codes[positions]
+        else:
+            codes = np.full(len(positions), -1)
+        type_scores = type_lookup[codes]
+
+        # Ancienneté - lookup par âge en jours
+        if "datemut" in comparables:
+            jours = _jours_ecoules(comparables["datemut"][positions], reference_date)
+        else:
+            jours = np.full(len(positions), np.nan)
+        return type_scores, compiled.recency_scores(jours)
+
+    @staticmethod
+    def haversine_distance_array(
+        lat1: float,
+        lon1: float,
+        lat2: np.ndarray,
+        lon2: np.ndarray
+    ) -> np.ndarray:
+        """Distance Haversine (km) entre un point et un tableau de points"""
+        return DistanceKernel(lat1, lon1).distances(lat2, lon2)
+
+    @staticmethod
+    def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        """Calcule la distance en km entre deux points (lat, lon) via Haversine (NaN si coordonnée manquante)"""
+        return DistanceKernel(lat1, lon1).distance(lat2, lon2)
 
 
 class EstimationEngine:
@@ -252,13 +471,35 @@ class EstimationEngine:
         Returns:
             Dict avec keys: prix_estime, prix_min, prix_max, nb_comparables_utilises
         """
-        # Filtrer les comparables par score minimum
-        valides = [
-            (c, s) for c, s in comparables_with_scores
-            if s >= EstimationEngine.MIN_COMPARABLE_SCORE
-        ]
+        scores, prix, _ = _scored_tuples_to_arrays(comparables_with_scores)
+        return EstimationEngine.calculate_estimation_arrays(scores, prix)
 
-        if not valides:
+    @staticmethod
+    def calculate_estimation_arrays(
+        scores: np.ndarray,
+        prix: np.ndarray
+    ) -> Dict:
+        """
+        Calcule l'estimation du prix à partir des colonnes scores / prix (valeurfonc).
+
+        Args:
+            scores: Scores de similarité des comparables
+            prix: Prix de vente des comparables (NaN si manquant)
+
+        Returns:
+            Dict avec keys: prix_estime, prix_min, prix_max, nb_comparables_utilises
+        """
+        return EstimationEngine.estimation_from_stats(compute_comparable_stats(scores, prix))
+
+    @staticmethod
+    def estimation_from_stats(stats: Dict) -> Dict:
+        """
+        Estimation à partir des statistiques de compute_comparable_stats.
+
+        Returns:
+            Dict avec keys: prix_estime, prix_min, prix_max, nb_comparables_utilises
+        """
+        if not stats["nb_valides"]:
             return {
                 "prix_estime": None,
                 "prix_min": None,
@@ -267,17 +508,7 @@ class EstimationEngine:
                 "erreur": f"Pas de comparables valides (score >= {EstimationEngine.MIN_COMPARABLE_SCORE})"
             }
 
-        # Extraction prix et scores
-        prix_list = []
-        scores_list = []
-
-        for comparable, score in valides:
-            prix = comparable.get("valeurfonc")
-            if prix and prix > 0:
-                prix_list.append(prix)
-                scores_list.append(score)
-
-        if not prix_list:
+        if not stats["nb_prix"]:
             return {
                 "prix_estime": None,
                 "prix_min": None,
@@ -286,19 +517,12 @@ class EstimationEngine:
                 "erreur": "Aucun prix valide dans les comparables"
             }
 
-        # Calcul moyenne pondérée
-        prix_array = np.array(prix_list)
-        scores_array = np.array(scores_list)
-
-        # Normaliser scores pour pondération
-        weights = scores_array / scores_array.sum()
-        prix_estime = np.sum(prix_array * weights)
-
+        # Moyenne pondérée par les scores, fourchette P25-P75
         return {
-            "prix_estime": round(prix_estime),
-            "prix_min": round(np.percentile(prix_array, 25)),
-            "prix_max": round(np.percentile(prix_array, 75)),
-            "nb_comparables_utilises": len(prix_list),
+            "prix_estime": round(stats["prix_pondere"]),
+            "prix_min": round(stats["prix_p25"]),
+            "prix_max": round(stats["prix_p75"]),
+            "nb_comparables_utilises": stats["nb_prix"],
             "erreur": None
         }
 
@@ -330,13 +554,36 @@ class ConfidenceCalculator:
         Returns:
             Dict avec keys: score_global, volume, similarite, dispersion, anciennete
         """
-        # Filtrer comparables valides
-        valides = [
-            (c, s) for c, s in comparables_with_scores
-            if s >= EstimationEngine.MIN_COMPARABLE_SCORE
-        ]
+        scores, prix, dates = _scored_tuples_to_arrays(comparables_with_scores)
+        return ConfidenceCalculator.calculate_confidence_arrays(scores, prix, dates)
 
-        if not valides:
+    @staticmethod
+    def calculate_confidence_arrays(
+        scores: np.ndarray,
+        prix: np.ndarray,
+        dates: Optional[np.ndarray],
+        reference_date: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Calcule les 4 scores de fiabilité à partir des colonnes scores / prix / datemut (datetime64).
+        reference_date: date de référence pour l'ancienneté (défaut = maintenant)
+
+        Returns:
+            Dict avec keys: score_global, volume, similarite, dispersion, anciennete
+        """
+        return ConfidenceCalculator.confidence_from_stats(
+            compute_comparable_stats(scores, prix, dates, reference_date)
+        )
+
+    @staticmethod
+    def confidence_from_stats(stats: Dict) -> Dict:
+        """
+        Barème des 4 composantes à partir des statistiques de compute_comparable_stats.
+
+        Returns:
+            Dict avec keys: score_global, volume, similarite, dispersion, anciennete
+        """
+        if not stats["nb_valides"]:
             return {
                 "score_global": 0,
                 "volume": 0,
@@ -346,9 +593,13 @@ class ConfidenceCalculator:
                 "details": "Pas de comparables valides"
             }
 
+        nb_comparables = stats["nb_valides"]
+        score_moyen = stats["score_moyen"]
+        coefficient_variation = stats["coefficient_variation"]
+        mois_moyen = stats["mois_moyen"]
+
         # 1. Score Volume (30%)
         # Excellent : 10+, Bon : 5-9, Moyen : 3-4, Faible : 1-2
-        nb_comparables = len(valides)
         if nb_comparables >= 10:
             score_volume = 30
         elif nb_comparables >= 5:
@@ -359,8 +610,6 @@ class ConfidenceCalculator:
             score_volume = 5
 
         # 2. Score Similarité (30%)
-        scores = [s for _, s in valides]
-        score_moyen = np.mean(scores)
         # Pondération : score ≥70 = bon, ≥80 = très bon
         if score_moyen >= 80:
             score_similarite = 30
@@ -373,9 +622,7 @@ class ConfidenceCalculator:
 
         # 3. Score Dispersion (25%)
         # Faible dispersion = bon score
-        prix_list = [c.get("valeurfonc", 0) for c, _ in valides if c.get("valeurfonc", 0) > 0]
-        if len(prix_list) > 1:
-            coefficient_variation = np.std(prix_list) / np.mean(prix_list)
+        if coefficient_variation is not None:
             # CV < 0.15 = excellent, < 0.25 = bon
             if coefficient_variation < 0.15:
                 score_dispersion = 25
@@ -389,19 +636,7 @@ class ConfidenceCalculator:
             score_dispersion = 10
 
         # 4. Score Ancienneté (15%)
-        dates_list = []
-        for c, _ in valides:
-            try:
-                date_mut = c.get("datemut")
-                if isinstance(date_mut, str):
-                    date_mut = pd.to_datetime(date_mut, dayfirst=True)
-                mois_ecoulis = (datetime.now() - date_mut).days / 30.44
-                dates_list.append(mois_ecoulis)
-            except:
-                pass
-
-        if dates_list:
-            mois_moyen = np.mean(dates_list)
+        if mois_moyen is not None:
             if mois_moyen <= 12:
                 score_anciennete = 15
             elif mois_moyen <= 24:
@@ -437,6 +672,148 @@ class ConfidenceCalculator:
         }
 
 
+class IncrementalEstimation:
+    """
+    État d'estimation conservé entre deux (dé)sélections de comparables.
+
+    Les scores sont calculés une seule fois; on maintient les sommes courantes
+    (poids, prix pondérés, moments des prix, ancienneté) sur la sélection active.
+    Cocher/décocher une ligne ne met à jour que les lignes modifiées, sans re-scoring.
+    """
+
+    def __init__(
+        self,
+        scores: np.ndarray,
+        prix: np.ndarray,
+        dates: Optional[np.ndarray] = None,
+        selection: Optional[np.ndarray] = None,
+        reference_date: Optional[datetime] = None
+    ):
+        self.scores = np.asarray(scores, dtype=float)
+        self.prix = np.asarray(prix, dtype=float)
+        n = len(self.scores)
+
+        self._valides = self.scores >= EstimationEngine.MIN_COMPARABLE_SCORE
+        self._avec_prix = self._valides & (self.prix > 0)
+        # Décalage des prix pour des moments numériquement stables
+        self._prix_ref = float(self.prix[self._avec_prix].mean()) if self._avec_prix.any() else 0.0
+
+        if dates is not None:
+            mois = _jours_ecoules(dates, reference_date) / 30.44
+        else:
+            mois = np.full(n, np.nan)
+        self._avec_date = self._valides & ~np.isnan(mois)
+        self._mois = np.nan_to_num(mois)
+
+        # Positions des comparables avec prix, triées par prix (quartiles sans re-tri)
+        positions = np.flatnonzero(self._avec_prix)
+        self._ordre_prix = positions[np.argsort(self.prix[positions], kind="stable")]
+
+        self.selection = np.zeros(n, dtype=bool)
+        self._nb_valides = 0
+        self._somme_scores = 0.0
+        self._nb_prix = 0
+        self._somme_poids = 0.0
+        self._somme_pondere = 0.0
+        self._somme_ecart = 0.0
+        self._somme_ecart2 = 0.0
+        self._nb_dates = 0
+        self._somme_mois = 0.0
+
+        self.set_selection(np.ones(n, dtype=bool) if selection is None else selection)
+
+    def _appliquer(self, positions: np.ndarray, signe: int) -> None:
+        """Ajoute (signe=1) ou retire (signe=-1) des lignes des sommes courantes"""
+        valides = positions[self._valides[positions]]
+        self._nb_valides += signe * len(valides)
+        self._somme_scores += signe * self.scores[valides].sum()
+
+        avec_prix = positions[self._avec_prix[positions]]
+        ecarts = self.prix[avec_prix] - self._prix_ref
+        self._nb_prix += signe * len(avec_prix)
+        self._somme_poids += signe * self.scores[avec_prix].sum()
+        self._somme_pondere += signe * (self.scores[avec_prix] * self.prix[avec_prix]).sum()
+        self._somme_ecart += signe * ecarts.sum()
+        self._somme_ecart2 += signe * (ecarts * ecarts).sum()
+
+        avec_date = positions[self._avec_date[positions]]
+        self._nb_dates += signe * len(avec_date)
+        self._somme_mois += signe * self._mois[avec_date].sum()
+
+    def set_selection(self, selection: np.ndarray) -> None:
+        """
+        Définit la sélection active (masque booléen ou positions des lignes retenues).
+        Seules les lignes qui changent d'état sont ajoutées/retirées des sommes.
+        """
+        selection = np.asarray(selection)
+        if selection.dtype != bool:
+            masque = np.zeros(len(self.scores), dtype=bool)
+            masque[selection.astype(int)] = True
+            selection = masque
+
+        self._appliquer(np.flatnonzero(selection & ~self.selection), 1)
+        self._appliquer(np.flatnonzero(self.selection & ~selection), -1)
+        self.selection = selection.copy()
+
+    def copy(self) -> "IncrementalEstimation":
+        """
+        Copie indépendante (sélection et sommes courantes); les tableaux de scores, prix
+        et dates, jamais modifiés, sont partagés.
+        """
+        clone = copy.copy(self)
+        clone.selection = self.selection.copy()
+        return clone
+
+    def toggle(self, position: int, selected: bool) -> None:
+        """Coche / décoche une seule ligne"""
+        if self.selection[position] != selected:
+            self._appliquer(np.array([position]), 1 if selected else -1)
+            self.selection[position] = selected
+
+    def _quartile(self, prix_tries: np.ndarray, q: float) -> float:
+        """Percentile (interpolation linéaire, comme np.percentile) d'un tableau déjà trié"""
+        rang = (len(prix_tries) - 1) * q
+        bas = int(np.floor(rang))
+        haut = min(bas + 1, len(prix_tries) - 1)
+        return prix_tries[bas] + (prix_tries[haut] - prix_tries[bas]) * (rang - bas)
+
+    def stats(self) -> Dict:
+        """Mêmes statistiques que compute_comparable_stats, lues dans les sommes courantes"""
+        stats = {
+            "nb_valides": self._nb_valides,
+            "nb_prix": self._nb_prix,
+            "prix_pondere": None,
+            "prix_p25": None,
+            "prix_p75": None,
+            "coefficient_variation": None,
+            "mois_moyen": None,
+            "score_moyen": None,
+            "score_min": None,
+            "score_max": None
+        }
+        if not self._nb_valides:
+            return stats
+
+        scores_valides = self.scores[self.selection & self._valides]
+        stats["score_moyen"] = self._somme_scores / self._nb_valides
+        stats["score_min"] = float(scores_valides.min())
+        stats["score_max"] = float(scores_valides.max())
+
+        if self._nb_prix:
+            prix_tries = self.prix[self._ordre_prix[self.selection[self._ordre_prix]]]
+            stats["prix_pondere"] = self._somme_pondere / self._somme_poids
+            stats["prix_p25"] = self._quartile(prix_tries, 0.25)
+            stats["prix_p75"] = self._quartile(prix_tries, 0.75)
+        if self._nb_prix > 1:
+            moyenne_ecart = self._somme_ecart / self._nb_prix
+            variance = max(self._somme_ecart2 / self._nb_prix - moyenne_ecart ** 2, 0.0)
+            stats["coefficient_variation"] = np.sqrt(variance) / (self._prix_ref + moyenne_ecart)
+        if self._nb_dates:
+            stats["mois_moyen"] = self._somme_mois / self._nb_dates
+
+        return stats
+
+
 class TemporalAdjuster:
     """Ajuste le prix pour l'inflation et la dynamique du marché Chablais"""
 
@@ -477,7 +854,9 @@ class TemporalAdjuster:
             date_reference = datetime.now()
 
         try:
-            if isinstance(date_comparable, str):
+            if isinstance(date_comparable, np.datetime64):
+                date_comparable = pd.Timestamp(date_comparable)
+            elif isinstance(date_comparable, str):
                 date_comparable = pd.to_datetime(date_comparable, dayfirst=True)
 
             # Calculer nombre d'années
@@ -505,6 +884,40 @@ class TemporalAdjuster:
             logger.error(f"Erreur ajustement prix: {e}")
             return prix_comparable
 
+    @staticmethod
+    def adjust_prix_array(
+        prix: np.ndarray,
+        dates: np.ndarray,
+        date_reference: Optional[datetime] = None
+    ) -> np.ndarray:
+        """
+        Version vectorisée de adjust_prix sur des colonnes prix / datemut (datetime64).
+        Les dates manquantes laissent le prix inchangé.
+        """
+        if date_reference is None:
+            date_reference = datetime.now()
+
+        prix = np.asarray(prix, dtype=float)
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        manquantes = np.isnat(dates)
+
+        annees = (np.datetime64(date_reference, "ns") - dates) / np.timedelta64(1, "D")
+        annees = np.floor(np.where(manquantes, 0, annees)) / 365.25
+        facteur_inflation = (1 + TemporalAdjuster.INFLATION_ANNUELLE) ** annees
+
+        # Facteur marché: lookup par année de transaction
+        annees_comparables = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+        facteur_nouveau = TemporalAdjuster.FACTEURS_MARCHE_CHABLAIS.get(date_reference.year, 1.0)
+        annees_distinctes, inverse = np.unique(annees_comparables, return_inverse=True)
+        facteur_ancien = np.array([
+            TemporalAdjuster.FACTEURS_MARCHE_CHABLAIS.get(int(annee), facteur_nouveau)
+            for annee in annees_distinctes
+        ])
+        facteur_marche = facteur_nouveau / facteur_ancien[inverse]
+
+        prix_ajuste = np.round(prix * facteur_inflation * facteur_marche)
+        return np.where(manquantes, prix, prix_ajuste)
+
 
 class EstimationAlgorithm:
     """
@@ -512,8 +925,14 @@ class EstimationAlgorithm:
     Combine scoring, estimation, fiabilité et ajustement temporel.
     """
 
-    def __init__(self):
-        """Initialise les composants"""
+    def __init__(self, profile: Union[str, ScoringProfile, None] = None):
+        """
+        Initialise les composants.
+
+        Args:
+            profile: Profil de scoring (nom enregistré ou ScoringProfile, défaut = barème historique)
+        """
+        self.profile = profile
         self.scorer = SimilarityScorer()
         self.engine = EstimationEngine()
         self.confidence = ConfidenceCalculator()
@@ -526,7 +945,9 @@ class EstimationAlgorithm:
         target_longitude: float,
         target_surface: float,
         target_type: str,
-        comparables: List[Dict]
+        comparables: Union[ComparableSet, pd.DataFrame, List[Dict]],
+        reference_date: Optional[datetime] = None,
+        top_k: Optional[int] = None
     ) -> Dict:
         """
         Effectue une estimation complète pour un bien.
@@ -536,29 +957,55 @@ class EstimationAlgorithm:
             target_longitude: Longitude du bien cible
             target_surface: Surface m² du bien cible
             target_type: Type du bien cible (Appartement, Maison, etc.)
-            comparables: Liste de comparables (dict avec keys: latitude, longitude, sbati, libtypbien, datemut, valeurfonc)
+            comparables: ComparableSet (ou DataFrame / liste de dicts) avec colonnes:
+                latitude, longitude, sbati, libtypbien, datemut, valeurfonc
+            reference_date: Date de référence unique pour l'ancienneté (défaut = maintenant)
+            top_k: Si renseigné, ne conserve que les K meilleurs comparables (score >= minimum),
+                triés par score décroissant; les autres ne sont pas entièrement scorés
+                (API uniquement: l'interface Streamlit et l'export PDF travaillent sur tous les comparables)
 
         Returns:
             Dict complet avec estimation, fiabilité, prix au m², etc.
+            "comparables_with_scores" est le ComparableSet d'entrée enrichi de la colonne score.
+            "incremental" conserve l'état pour reestimate() (sélection de comparables),
+            "parametres" la date de référence, le top_k et le profil de l'estimation.
         """
-        if not comparables:
+        comparables = ComparableSet.coerce(comparables)
+        if comparables.empty:
             return {
                 "success": False,
                 "erreur": "Aucun comparable fourni"
             }
 
+        # Une seule date de référence pour scoring, fiabilité et ajustements
+        if reference_date is None:
+            reference_date = datetime.now()
+
+        # Lignes invalides: un seul message agrégé par estimation
+        invalides = comparables.resume_invalides()
+        if invalides:
+            details = ", ".join(f"{motif}={nb}" for motif, nb in invalides.items())
+            logger.warning(f"{sum(invalides.values())} comparable(s) ignoré(s) sur {len(comparables)}: {details}")
+
         try:
-            # Étape 1 : Scorer les comparables
-            comparables_scored = []
-            for comparable in comparables:
-                score = self.scorer.calculate_comparable_score(
+            # Étape 1 : Scorer les comparables (vectorisé)
+            if top_k:
+                positions, scores = self.scorer.score_top_k(
+                    target_latitude, target_longitude, target_surface, target_type,
+                    comparables, top_k, reference_date, self.profile
+                )
+                comparables = comparables.take(positions)
+            else:
+                scores = self.scorer.score_batch(
                     target_latitude, target_longitude, target_surface, target_type,
-                    comparable
+                    comparables, reference_date, self.profile
                 )
-                comparables_scored.append((comparable, score))
+            prix = comparables.get("valeurfonc", np.full(len(comparables), np.nan))
+            dates = comparables.get("datemut")
 
-            # Étape 2 : Calculer l'estimation
-            estimation = self.engine.calculate_estimation(comparables_scored)
+            # Étape 2 : Statistiques en une passe (estimation, fiabilité, résumé)
+            stats = compute_comparable_stats(scores, prix, dates, reference_date)
+            estimation = self.engine.estimation_from_stats(stats)
 
             if estimation["erreur"]:
                 return {
@@ -566,41 +1013,14 @@ class EstimationAlgorithm:
                     "erreur": estimation["erreur"]
                 }
 
-            # Étape 3 : Calculer la fiabilité
-            confidence = self.confidence.calculate_confidence(comparables_scored)
+            comparables_scored = comparables.with_columns(score=scores)
+            incremental = IncrementalEstimation(scores, prix, dates, reference_date=reference_date)
+            parametres = {"reference_date": reference_date, "top_k": top_k, "profile": self.profile}
 
-            # Étape 4 : Ajouter prix au m²
-            if estimation["prix_estime"] and estimation["prix_estime"] > 0:
-                prix_au_m2 = self.engine.calculate_prix_au_m2(
-                    estimation["prix_estime"],
-                    target_surface
-                )
-            else:
-                prix_au_m2 = 0
-
-            # Résultat final
-            return {
-                "success": True,
-                "bien": {
-                    "latitude": target_latitude,
-                    "longitude": target_longitude,
-                    "surface_m2": target_surface,
-                    "type": target_type
-                },
-                "estimation": {
-                    "prix_estime_eur": estimation["prix_estime"],
-                    "prix_min_eur": estimation["prix_min"],
-                    "prix_max_eur": estimation["prix_max"],
-                    "prix_au_m2_eur": prix_au_m2
-                },
-                "fiabilite": confidence,
-                "nb_comparables_utilises": estimation["nb_comparables_utilises"],
-                "comparables_summary": self._comparables_summary(comparables_scored),
-                "comparables_with_scores": [
-                    {**c, "score": s} for c, s in comparables_scored
-                ],
-                "timestamp": datetime.now().isoformat()
-            }
+            return self._format_result(
+                target_latitude, target_longitude, target_surface, target_type,
+                stats, comparables_scored, incremental, parametres
+            )
         except Exception as e:
             logger.error(f"Erreur estimation: {e}")
             return {
@@ -608,20 +1028,107 @@ class EstimationAlgorithm:
                 "erreur": str(e)
             }
 
-    def _comparables_summary(self, comparables_scored: List[Tuple[Dict, float]]) -> Dict:
-        """Résumé statistique des comparables"""
-        try:
-            valides = [(c, s) for c, s in comparables_scored if s >= 40]
-            if not valides:
-                return {}
+    def reestimate(self, result: Dict, selection: np.ndarray) -> Dict:
+        """
+        Recalcule l'estimation sur une sélection de comparables sans re-scoring.
+        Le résultat précédent n'est pas modifié: le nouveau résultat porte sa propre
+        copie de l'état incrémental.
+
+        Args:
+            result: Résultat précédent de estimate() (contient "incremental")
+            selection: Masque booléen ou positions des comparables retenus
+                (positions dans result["comparables_with_scores"])
 
-            scores = [s for _, s in valides]
+        Returns:
+            Dict au même format que estimate()
+        """
+        incremental = result.get("incremental")
+        bien = result.get("bien", {})
+        parametres = result.get("parametres", {})
+        if incremental is None:
+            # Re-scoring complet avec les paramètres de l'estimation d'origine
+            profile = parametres.get("profile", self.profile)
+            algorithm = self if profile == self.profile else EstimationAlgorithm(profile=profile)
+            comparables = ComparableSet.coerce(result.get("comparables_with_scores"))
+            selection = np.asarray(selection)
+            return algorithm.estimate(
+                bien.get("latitude"), bien.get("longitude"), bien.get("surface_m2"), bien.get("type"),
+                comparables.filter(selection) if selection.dtype == bool else comparables.take(selection),
+                reference_date=parametres.get("reference_date"),
+                top_k=parametres.get("top_k")
+            )
 
+        incremental = incremental.copy()
+        incremental.set_selection(selection)
+        stats = incremental.stats()
+        estimation = self.engine.estimation_from_stats(stats)
+        if estimation["erreur"]:
             return {
-                "score_moyen": round(np.mean(scores), 1),
-                "score_min": round(np.min(scores), 1),
-                "score_max": round(np.max(scores), 1),
-                "nb_comparables_utilises": len(valides)
+                **result,
+                "success": False,
+                "erreur": estimation["erreur"]
             }
-        except:
+
+        return self._format_result(
+            bien["latitude"], bien["longitude"], bien["surface_m2"], bien["type"],
+            stats, result["comparables_with_scores"], incremental, parametres
+        )
+
+    def _format_result(
+        self,
+        target_latitude: float,
+        target_longitude: float,
+        target_surface: float,
+        target_type: str,
+        stats: Dict,
+        comparables_scored: ComparableSet,
+        incremental: IncrementalEstimation,
+        parametres: Dict
+    ) -> Dict:
+        """Assemble le dict résultat commun à estimate() et reestimate()"""
+        estimation = self.engine.estimation_from_stats(stats)
+
+        # Ajouter prix au m²
+        if estimation["prix_estime"] and estimation["prix_estime"] > 0:
+            prix_au_m2 = self.engine.calculate_prix_au_m2(
+                estimation["prix_estime"],
+                target_surface
+            )
+        else:
+            prix_au_m2 = 0
+
+        return {
+            "success": True,
+            "bien": {
+                "latitude": target_latitude,
+                "longitude": target_longitude,
+                "surface_m2": target_surface,
+                "type": target_type
+            },
+            "estimation": {
+                "prix_estime_eur": estimation["prix_estime"],
+                "prix_min_eur": estimation["prix_min"],
+                "prix_max_eur": estimation["prix_max"],
+                "prix_au_m2_eur": prix_au_m2
+            },
+            "fiabilite": self.confidence.confidence_from_stats(stats),
+            "nb_comparables_utilises": estimation["nb_comparables_utilises"],
+            "comparables_summary": self._comparables_summary(stats),
+            "comparables_with_scores": comparables_scored,
+            "selection": incremental.selection.copy(),
+            "incremental": incremental,
+            "parametres": parametres,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _comparables_summary(self, stats: Dict) -> Dict:
+        """Résumé statistique des comparables valides (score >= MIN_COMPARABLE_SCORE)"""
+        if not stats["nb_valides"]:
             return {}
+
+        return {
+            "score_moyen": round(stats["score_moyen"], 1),
+            "score_min": round(stats["score_min"], 1),
+            "score_max": round(stats["score_max"], 1),
+            "nb_comparables_utilises": stats["nb_valides"]
+        }
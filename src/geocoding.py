@@ -1,23 +1,26 @@
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
-import json
 from pathlib import Path
 import time
 
+from src.utils.geocoding_cache import MISS, get_geocoding_cache
+
+# Ancien cache JSON (repris une fois dans le cache de géocodage partagé, puis renommé en .migre)
 CACHE_FILE = Path("data/cache/geocoding_cache.json")
 
-def load_cache():
-    """Charge le cache de géocodage"""
-    if CACHE_FILE.exists():
-        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+_cache = None
+
 
-def save_cache(cache):
-    """Sauvegarde le cache"""
-    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cache, f, ensure_ascii=False, indent=2)
+def get_cache():
+    """Cache de géocodage Nominatim (LRU + SQLite), initialisé depuis l'ancien fichier JSON"""
+    global _cache
+    if _cache is None:
+        _cache = get_geocoding_cache("nominatim")
+        try:
+            _cache.import_json(str(CACHE_FILE))
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Reprise du cache JSON impossible: {e}")
+    return _cache
 
 def geocode_address(address):
     """
@@ -29,15 +32,13 @@ def geocode_address(address):
     Returns:
         dict: {'lat': float, 'lon': float, 'display_name': str} ou None
     """
-    # Normalisation
-    address_key = address.strip().lower()
-    
-    # Vérification cache
-    cache = load_cache()
-    if address_key in cache:
+    # Vérification cache (clé normalisée, "non trouvé" compris)
+    cache = get_cache()
+    cached = cache.get(address)
+    if cached is not MISS:
         print(f"📍 Adresse trouvée en cache")
-        return cache[address_key]
-    
+        return cached
+
     # Géocodage
     print(f"🔍 Géocodage de : {address}")
     try:
@@ -68,13 +69,13 @@ def geocode_address(address):
             }
             
             # Sauvegarde en cache
-            cache[address_key] = result
-            save_cache(cache)
+            cache.set(address, result)
             
             print(f"✅ Trouvé : {location.address}")
             return result
         else:
             print("❌ Adresse non trouvée")
+            cache.set(address, None)
             return None
             
     except GeocoderTimedOut:
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LocalDvfStore - Réplique locale DVF+ (SQLite + index R-tree)
+Même interface que SupabaseDataRetriever (get_comparables, get_market_stats) sur un
+instantané local du département, synchronisé de façon incrémentale par datemut.
+"""
+
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Optional, Union
+
+import pandas as pd
+
+from src.comparable_set import ComparableSet
+from src.comparables_cache import rank_comparables
+from src.supabase_data_retriever import TYPE_PATTERNS, SupabaseDataRetriever
+from src.utils.config import Config
+from src.utils.distance import DistanceKernel
+from src.utils.insee import load_insee_mapping
+
+logger = logging.getLogger(__name__)
+
+# Colonnes répliquées (mêmes noms que la table distante)
+COLONNES_TEXTE = ("idmutation", "datemut", "coddep", "codinsee", "libtypbien")
+COLONNES_NUMERIQUES = (
+    "valeurfonc", "sbati", "nblocmut",
+    "nbmai1pp", "nbmai2pp", "nbmai3pp", "nbmai4pp", "nbmai5pp",
+    "nbapt1pp", "nbapt2pp", "nbapt3pp", "nbapt4pp", "nbapt5pp",
+    "latitude", "longitude", "x_2154", "y_2154",
+)
+COLONNES = COLONNES_TEXTE + COLONNES_NUMERIQUES
+
+_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS mutations (
+        id INTEGER PRIMARY KEY,
+        idmutation TEXT NOT NULL UNIQUE,
+        datemut TEXT NOT NULL,
+        coddep TEXT,
+        codinsee TEXT,
+        libtypbien TEXT,
+        {", ".join(f"{col} REAL" for col in COLONNES_NUMERIQUES)}
+    );
+    CREATE INDEX IF NOT EXISTS idx_mutations_datemut ON mutations (datemut);
+    CREATE INDEX IF NOT EXISTS idx_mutations_coddep ON mutations (coddep);
+    -- Index spatial en Lambert 93 (mètres): une boîte de ±rayon autour du point cible
+    CREATE VIRTUAL TABLE IF NOT EXISTS mutations_rtree USING rtree (id, min_x, max_x, min_y, max_y);
+"""
+
+# Colonnes ajoutées après la création de répliques existantes (vides jusqu'à une synchronisation complète)
+_COLONNES_AJOUTEES = {"codinsee": "TEXT"}
+
+
+class LocalDvfStore:
+    """
+    Source de comparables locale (aucun aller-retour réseau à l'estimation).
+
+    Les mutations sont stockées dans un fichier SQLite avec un index R-tree sur les
+    coordonnées Lambert 93. La recherche par rayon lit la boîte englobante via l'index,
+    puis applique la distance exacte et le classement (ordre) en NumPy.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Fichier SQLite de la réplique (par défaut: Config.LOCAL_DVF_PATH)
+        """
+        self.path = path or Config.LOCAL_DVF_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            existantes = {row[1] for row in conn.execute("PRAGMA table_info(mutations)")}
+            for colonne, type_sql in _COLONNES_AJOUTEES.items():
+                if colonne not in existantes:
+                    conn.execute(f"ALTER TABLE mutations ADD COLUMN {colonne} {type_sql}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_mutations_codinsee ON mutations (codinsee)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ===================================
+    # SYNCHRONISATION
+    # ===================================
+
+    def last_datemut(self) -> Optional[str]:
+        """Date de mutation la plus récente de la réplique (ISO) ou None si vide"""
+        with self._connect() as conn:
+            return conn.execute("SELECT MAX(datemut) FROM mutations").fetchone()[0]
+
+    def upsert(self, df: pd.DataFrame) -> int:
+        """
+        Insère ou met à jour des mutations (clé idmutation) et leur entrée R-tree.
+
+        Returns:
+            Nombre de lignes écrites
+        """
+        if len(df) == 0:
+            return 0
+        df = df.dropna(subset=["x_2154", "y_2154"])
+        data = pd.DataFrame({col: df[col] if col in df.columns else None for col in COLONNES})
+        data["datemut"] = pd.to_datetime(data["datemut"]).dt.strftime("%Y-%m-%d")
+        data["idmutation"] = data["idmutation"].astype(str)
+        for col in COLONNES_NUMERIQUES:
+            data[col] = pd.to_numeric(data[col], errors="coerce")
+        rows = data.astype(object).where(data.notna(), None).itertuples(index=False, name=None)
+
+        colonnes = ", ".join(COLONNES)
+        valeurs = ", ".join("?" * len(COLONNES))
+        mises_a_jour = ", ".join(f"{col} = excluded.{col}" for col in COLONNES if col != "idmutation")
+        with self._connect() as conn:
+            # ON CONFLICT ... DO UPDATE conserve l'id (clé de l'entrée R-tree)
+            conn.executemany(
+                f"INSERT INTO mutations ({colonnes}) VALUES ({valeurs}) "
+                f"ON CONFLICT(idmutation) DO UPDATE SET {mises_a_jour}",
+                rows
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO mutations_rtree (id, min_x, max_x, min_y, max_y) "
+                "SELECT id, x_2154, x_2154, y_2154, y_2154 FROM mutations WHERE idmutation = ?",
+                ((idmutation,) for idmutation in data["idmutation"])
+            )
+        return len(data)
+
+    def sync(self, source: Optional[SupabaseDataRetriever] = None, coddep: str = "74", full: bool = False) -> int:
+        """
+        Synchronise la réplique depuis Supabase.
+        Incrémental: seules les mutations à partir de la dernière datemut locale (incluse) sont
+        relues; celles du dernier jour déjà présentes sont mises à jour.
+
+        Args:
+            source: Retriever Supabase (par défaut: nouvelle instance)
+            coddep: Département répliqué
+            full: Si True, relit tout l'historique
+
+        Returns:
+            Nombre de mutations écrites
+        """
+        source = source or SupabaseDataRetriever()
+        depuis = None if full else self.last_datemut()
+        logger.info(f"[INFO] Synchronisation DVF+ {coddep} depuis {depuis or 'le début'}")
+
+        total = 0
+        for chunk in source.iter_mutations(coddep=coddep, depuis=depuis):
+            total += self.upsert(chunk)
+            logger.info(f"[INFO] {total} mutations synchronisées")
+        return total
+
+    # ===================================
+    # INTERFACE RETRIEVER
+    # ===================================
+
+    def health_check(self) -> bool:
+        """True si la réplique contient des mutations"""
+        try:
+            with self._connect() as conn:
+                return conn.execute("SELECT 1 FROM mutations LIMIT 1").fetchone() is not None
+        except sqlite3.Error as e:
+            print(f"[ERROR] Erreur réplique locale: {e}")
+            return False
+
+    def test_connection(self) -> bool:
+        """Test la réplique locale"""
+        with self._connect() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM mutations").fetchone()[0]
+        print(f"[OK] Réplique locale {self.path} - {count} mutations")
+        return count > 0
+
+    def get_comparables(
+        self,
+        latitude: float,
+        longitude: float,
+        type_bien: str = "Appartement",
+        surface_min: float = 50,
+        surface_max: float = 150,
+        rayon_km: float = 10.0,
+        annees: int = 3,
+        limit: int = 30,
+        as_set: bool = False,
+        geometrie_sql: bool = True,
+        ordre: str = "hybride",
+        attendre_adresses: bool = False,
+        resoudre_adresses: bool = True
+    ) -> Union[pd.DataFrame, ComparableSet]:
+        """
+        Récupère les comparables depuis la réplique locale.
+        Mêmes paramètres et colonnes que SupabaseDataRetriever.get_comparables
+        (geometrie_sql est sans objet: les coordonnées WGS84 sont stockées).
+        """
+        if ordre not in ("recent", "distance", "hybride"):
+            raise ValueError(f"Ordre de comparables inconnu: {ordre} (attendu: recent, distance, hybride)")
+        params = SupabaseDataRetriever._comparables_params(
+            latitude, longitude, type_bien, surface_min, surface_max, rayon_km, annees, limit
+        )
+        rayon_m = params["rayon_m"]
+
+        try:
+            with self._connect() as conn:
+                df = pd.read_sql_query(
+                    f"""
+                    SELECT {", ".join(f"m.{col}" for col in COLONNES if col not in ("x_2154", "y_2154"))}
+                    FROM mutations_rtree r
+                    JOIN mutations m ON m.id = r.id
+                    WHERE r.min_x >= :x_min AND r.max_x <= :x_max
+                      AND r.min_y >= :y_min AND r.max_y <= :y_max
+                      AND m.sbati >= :surface_min
+                      AND m.sbati <= :surface_max
+                      AND m.valeurfonc > 0
+                      AND m.datemut >= date('now', :fenetre)
+                      AND (m.libtypbien LIKE :type_pattern OR m.libtypbien LIKE :type_pattern2)
+                    """,
+                    conn,
+                    params={
+                        "x_min": params["x_2154"] - rayon_m,
+                        "x_max": params["x_2154"] + rayon_m,
+                        "y_min": params["y_2154"] - rayon_m,
+                        "y_max": params["y_2154"] + rayon_m,
+                        "surface_min": surface_min,
+                        "surface_max": surface_max,
+                        "fenetre": f"-{int(annees * 365)} days",
+                        "type_pattern": params["type_pattern"],
+                        "type_pattern2": params["type_pattern2"],
+                    }
+                )
+
+            if len(df) > 0:
+                df["datemut"] = pd.to_datetime(df["datemut"])
+                distances = DistanceKernel(latitude, longitude).distances(
+                    df["latitude"].to_numpy(), df["longitude"].to_numpy()
+                )
+                df["distance_km"] = distances
+                df = df[distances <= rayon_km]
+
+                # Classement avant le LIMIT (mêmes critères que la requête SQL distante)
+                df = rank_comparables(df, ordre, rayon_km, annees, limit)
+
+            if len(df) > 0:
+                df["prix_m2"] = df["valeurfonc"] / df["sbati"]
+            if len(df) > 0 and resoudre_adresses:
+                df["adresse"] = SupabaseDataRetriever._adresses(df, attendre_adresses)
+
+            return ComparableSet.from_dataframe(df) if as_set else df
+
+        except Exception as e:
+            print(f"[ERROR] Erreur get_comparables (local): {e}")
+            return ComparableSet({}) if as_set else pd.DataFrame()
+
+    def get_market_stats(
+        self,
+        code_postal: str,
+        type_bien: Optional[str] = None,
+        annee_min: Optional[int] = None,
+        par_commune: bool = False
+    ) -> Dict:
+        """
+        Statistiques de marché pour un code postal.
+        Mêmes paramètres et format que SupabaseDataRetriever.get_market_stats: département
+        (2 premiers chiffres) par défaut, communes du code postal si par_commune.
+        """
+        type_pattern, type_pattern2 = TYPE_PATTERNS.get(type_bien, ("%", "%"))
+        codes_insee = []
+        if par_commune:
+            mapping = load_insee_mapping()
+            codes_insee = mapping.loc[mapping["postal_code"] == code_postal, "insee_code"].tolist()
+        # Communes du code postal (par_commune) ou tout le département
+        filtre_communes = f" AND codinsee IN ({', '.join('?' * len(codes_insee))})" if codes_insee else ""
+        try:
+            with self._connect() as conn:
+                df = pd.read_sql_query(
+                    "SELECT valeurfonc, sbati, datemut FROM mutations "
+                    "WHERE coddep LIKE ? AND (libtypbien LIKE ? OR libtypbien LIKE ?) AND datemut >= ?"
+                    + filtre_communes,
+                    conn,
+                    params=(
+                        code_postal[:2] + "%", type_pattern, type_pattern2, f"{annee_min or 1900:04d}-01-01",
+                        *codes_insee
+                    )
+                )
+
+            if len(df) == 0:
+                return {}
+            return {
+                'nb_transactions': int(len(df)),
+                'prix_moyen': float(df['valeurfonc'].mean()),
+                'prix_median': float(df['valeurfonc'].median()),
+                'mediane_approchee': False,
+                'surface_moyenne': float(df['sbati'].mean()),
+                'date_premiere_vente': str(df['datemut'].min()),
+                'date_derniere_vente': str(df['datemut'].max())
+            }
+
+        except Exception as e:
+            print(f"[ERROR] Erreur get_market_stats (local): {e}")
+            return {}
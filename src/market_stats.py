@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MarketStats - Statistiques de marché pré-agrégées
+Agrégats par commune (code INSEE), type de bien, année et tranche de surface,
+matérialisés dans une table SQL (rafraîchie après chaque import DVF+) puis servis
+depuis la mémoire.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from src.supabase_data_retriever import FILTRE_STATS_MARCHE, TYPE_PATTERNS
+from src.utils.insee import load_insee_mapping
+
+logger = logging.getLogger(__name__)
+
+TABLE_STATS = "dvf_plus_2025_2.market_stats"
+# Années couvertes par les agrégats, par département
+TABLE_COUVERTURE = "dvf_plus_2025_2.market_stats_couverture"
+TABLE_MUTATIONS = "dvf_plus_2025_2.dvf_plus_mutation"
+
+# Bornes des tranches de surface (m²): [0, 30[, [30, 50[, ... [150, +inf[
+BORNES_SURFACE = (30, 50, 70, 90, 120, 150)
+
+
+def tranche_surface(surface: float) -> str:
+    """Libellé de tranche pour une surface (ex: '50-70', '150+')"""
+    bornes = (0,) + BORNES_SURFACE
+    index = int(np.searchsorted(BORNES_SURFACE, surface, side="right"))
+    if index == len(BORNES_SURFACE):
+        return f"{BORNES_SURFACE[-1]}+"
+    return f"{bornes[index]}-{bornes[index + 1]}"
+
+
+def _tranche_sql() -> str:
+    bornes = (0,) + BORNES_SURFACE
+    cas = [f"WHEN COALESCE(sbati, 0) < {haut} THEN '{bas}-{haut}'" for bas, haut in zip(bornes, bornes[1:])]
+    return f"CASE {' '.join(cas)} ELSE '{BORNES_SURFACE[-1]}+' END"
+
+
+def _type_sql() -> str:
+    cas = [
+        f"WHEN libtypbien LIKE '{motif1}' OR libtypbien LIKE '{motif2}' THEN '{type_bien}'"
+        for type_bien, (motif1, motif2) in TYPE_PATTERNS.items()
+    ]
+    return f"CASE {' '.join(cas)} ELSE 'Autre' END"
+
+
+_CREATE_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_STATS} (
+        codinsee varchar(5) NOT NULL,
+        type_bien varchar(20) NOT NULL,
+        annee integer NOT NULL,
+        tranche_surface varchar(10) NOT NULL,
+        nb_transactions integer NOT NULL,
+        somme_prix double precision NOT NULL,
+        somme_surface double precision NOT NULL,
+        prix_median double precision,
+        prix_m2_median double precision,
+        prix_m2_p25 double precision,
+        prix_m2_p75 double precision,
+        date_min date,
+        date_max date,
+        refreshed_at timestamp DEFAULT now(),
+        PRIMARY KEY (codinsee, type_bien, annee, tranche_surface)
+    )
+"""
+
+_REFRESH = f"""
+    INSERT INTO {TABLE_STATS} (
+        codinsee, type_bien, annee, tranche_surface, nb_transactions, somme_prix, somme_surface,
+        prix_median, prix_m2_median, prix_m2_p25, prix_m2_p75, date_min, date_max
+    )
+    SELECT
+        l_codinsee[1] AS codinsee,
+        {_type_sql()} AS type_bien,
+        EXTRACT(YEAR FROM datemut)::integer AS annee,
+        {_tranche_sql()} AS tranche_surface,
+        COUNT(*),
+        SUM(valeurfonc)::float8,
+        SUM(COALESCE(sbati, 0))::float8,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY valeurfonc),
+        -- Prix au m² sur les seules ventes avec surface bâtie (NULL ignorés: terrains)
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY valeurfonc / NULLIF(sbati, 0)),
+        PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY valeurfonc / NULLIF(sbati, 0)),
+        PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY valeurfonc / NULLIF(sbati, 0)),
+        MIN(datemut),
+        MAX(datemut)
+    FROM {TABLE_MUTATIONS}
+    WHERE coddep = :coddep
+      AND datemut >= make_date(:depuis, 1, 1)
+      AND {FILTRE_STATS_MARCHE}
+    GROUP BY 1, 2, 3, 4
+"""
+
+_CREATE_COUVERTURE = f"""
+    CREATE TABLE IF NOT EXISTS {TABLE_COUVERTURE} (
+        coddep varchar(3) PRIMARY KEY,
+        annee_debut integer NOT NULL,
+        annee_donnees integer,
+        refreshed_at timestamp DEFAULT now()
+    )
+"""
+
+# annee_debut: première année agrégée (les années antérieures déjà agrégées sont conservées);
+# annee_donnees: première année présente dans les mutations du département
+_REFRESH_COUVERTURE = f"""
+    INSERT INTO {TABLE_COUVERTURE} AS c (coddep, annee_debut, annee_donnees, refreshed_at)
+    SELECT :coddep, :depuis, MIN(EXTRACT(YEAR FROM datemut))::integer, now()
+    FROM {TABLE_MUTATIONS}
+    WHERE coddep = :coddep
+    ON CONFLICT (coddep) DO UPDATE SET
+        annee_debut = LEAST(c.annee_debut, EXCLUDED.annee_debut),
+        annee_donnees = EXCLUDED.annee_donnees,
+        refreshed_at = EXCLUDED.refreshed_at
+"""
+
+
+def refresh_market_stats(engine, depuis_annee: int, coddep: str = "74") -> int:
+    """
+    Recalcule les agrégats des années >= depuis_annee (les années antérieures sont conservées).
+    À lancer après chaque import DVF+ (une transaction: la table n'est jamais vue à moitié).
+
+    Returns:
+        Nombre de groupes écrits
+    """
+    with engine.begin() as conn:
+        conn.execute(text(_CREATE_TABLE))
+        conn.execute(text(_CREATE_COUVERTURE))
+        conn.execute(
+            text(f"DELETE FROM {TABLE_STATS} WHERE annee >= :depuis AND codinsee LIKE :coddep"),
+            {"depuis": depuis_annee, "coddep": f"{coddep}%"}
+        )
+        result = conn.execute(text(_REFRESH), {"depuis": depuis_annee, "coddep": coddep})
+        conn.execute(text(_REFRESH_COUVERTURE), {"depuis": depuis_annee, "coddep": coddep})
+        return result.rowcount
+
+
+class MarketStats:
+    """
+    Agrégats de marché en mémoire (quelques milliers de lignes).
+
+    Les statistiques de plusieurs groupes (communes d'un code postal, plusieurs années...)
+    sont combinées sans retour à la base: moyennes exactes (sommes), médiane approchée
+    par la médiane des médianes de groupe pondérée par le nombre de transactions
+    (résultats marqués 'mediane_approchee': True).
+    """
+
+    def __init__(
+        self,
+        table: pd.DataFrame,
+        mapping: Optional[pd.DataFrame] = None,
+        couverture: Optional[Dict[str, Tuple[int, Optional[int]]]] = None
+    ):
+        """
+        Args:
+            table: Agrégats (colonnes de TABLE_STATS)
+            mapping: Référentiel INSEE (par défaut: insee_mapping.csv)
+            couverture: département -> (annee_debut, annee_donnees) (TABLE_COUVERTURE);
+                None: la table est considérée complète
+        """
+        self.table = table.reset_index(drop=True)
+        self.mapping = mapping if mapping is not None else load_insee_mapping()
+        self.couverture = couverture
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls, engine, mapping: Optional[pd.DataFrame] = None) -> "MarketStats":
+        """Charge la table des agrégats et leur couverture en mémoire"""
+        with engine.connect() as conn:
+            table = pd.read_sql_query(text(f"SELECT * FROM {TABLE_STATS}"), conn)
+            rows = conn.execute(text(f"SELECT coddep, annee_debut, annee_donnees FROM {TABLE_COUVERTURE}"))
+            couverture = {row[0]: (row[1], row[2]) for row in rows}
+        logger.info(f"[OK] {len(table)} agrégats de marché chargés")
+        return cls(table, mapping, couverture)
+
+    def covers(self, code_postal: str, annee_min: Optional[int] = None) -> bool:
+        """
+        True si les agrégats couvrent toutes les années demandées pour le département
+        du code postal (sinon: statistiques partielles, passer par la requête directe).
+        """
+        if self.couverture is None:
+            return True
+        couverture = self.couverture.get(code_postal[:2])
+        if couverture is None:
+            return False
+        annee_debut, annee_donnees = couverture
+        return annee_debut <= max(annee_min or 0, annee_donnees or 0)
+
+    def communes(self, code_postal: str) -> List[str]:
+        """Codes INSEE des communes d'un code postal"""
+        return self.mapping.loc[self.mapping["postal_code"] == code_postal, "insee_code"].tolist()
+
+    def _filter(
+        self,
+        codes_insee: Optional[Sequence[str]] = None,
+        type_bien: Optional[str] = None,
+        annee_min: Optional[int] = None,
+        annee_max: Optional[int] = None,
+        tranche: Optional[str] = None
+    ) -> pd.DataFrame:
+        mask = np.ones(len(self.table), dtype=bool)
+        if codes_insee is not None:
+            mask &= self.table["codinsee"].isin(list(codes_insee)).to_numpy()
+        if type_bien is not None:
+            mask &= (self.table["type_bien"] == type_bien).to_numpy()
+        if annee_min is not None:
+            mask &= (self.table["annee"] >= annee_min).to_numpy()
+        if annee_max is not None:
+            mask &= (self.table["annee"] <= annee_max).to_numpy()
+        if tranche is not None:
+            mask &= (self.table["tranche_surface"] == tranche).to_numpy()
+        return self.table[mask]
+
+    @staticmethod
+    def _combine(groups: pd.DataFrame) -> Dict:
+        """Combine des groupes en une statistique (format get_market_stats)"""
+        n = int(groups["nb_transactions"].sum())
+        if n == 0:
+            return {}
+
+        def weighted_median(column: str) -> float:
+            values = groups[column].to_numpy(dtype=float)
+            weights = groups["nb_transactions"].to_numpy(dtype=float)
+            order = np.argsort(values)
+            cumulative = np.cumsum(weights[order])
+            return float(values[order][np.searchsorted(cumulative, cumulative[-1] / 2)])
+
+        return {
+            'nb_transactions': n,
+            'prix_moyen': float(groups["somme_prix"].sum() / n),
+            'prix_median': weighted_median("prix_median"),
+            'mediane_approchee': True,
+            'prix_m2_median': weighted_median("prix_m2_median"),
+            'surface_moyenne': float(groups["somme_surface"].sum() / n),
+            'date_premiere_vente': str(groups["date_min"].min()),
+            'date_derniere_vente': str(groups["date_max"].max())
+        }
+
+    def query(self, **filters) -> Dict:
+        """
+        Statistique combinée des groupes filtrés.
+
+        Args:
+            codes_insee, type_bien, annee_min, annee_max, tranche: filtres optionnels
+
+        Returns:
+            Dict: nb_transactions, prix_moyen, prix_median, prix_m2_median, surface_moyenne,
+            date_premiere_vente, date_derniere_vente (vide si aucun groupe)
+        """
+        return self._combine(self._filter(**filters))
+
+    def for_department(self, code_postal: str, **filters) -> Dict:
+        """Statistique des communes du département d'un code postal (2 premiers chiffres)"""
+        codes = self.table.loc[self.table["codinsee"].str.startswith(code_postal[:2]), "codinsee"].unique()
+        return self.query(codes_insee=codes, **filters)
+
+    def for_postal_code(self, code_postal: str, **filters) -> Dict:
+        """
+        Statistique des communes d'un code postal (insee_mapping.csv).
+        Code postal absent du référentiel: communes du département (2 premiers chiffres).
+        """
+        codes = self.communes(code_postal)
+        if not codes:
+            return self.for_department(code_postal, **filters)
+        return self.query(codes_insee=codes, **filters)
+
+    def breakdown(self, by: Sequence[str] = ("annee",), **filters) -> pd.DataFrame:
+        """Statistiques combinées par clé (ex: par année, par tranche de surface)"""
+        groups = self._filter(**filters)
+        if len(groups) == 0:
+            return pd.DataFrame()
+        rows = []
+        for key, group in groups.groupby(list(by), sort=True):
+            key = key if isinstance(key, tuple) else (key,)
+            rows.append({**dict(zip(by, key)), **self._combine(group)})
+        return pd.DataFrame(rows)
@@ -9,13 +9,21 @@ import httpx
 import json
 import logging
 import asyncio
+import threading
+import time
 import pandas as pd
-from typing import Optional, Dict, List
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional, Dict, List, Tuple
 from pydantic import BaseModel, Field, field_validator
 from enum import Enum
 
 from .utils.config import Config
+from .utils.distance import DistanceKernel
 from .utils.geocoding import get_coordinates
+from .utils.geocoding_cache import normalize_address
+from .utils.insee import load_insee_mapping
+from .utils.rate_limiter import TokenBucket, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
@@ -76,9 +84,30 @@ class PerplexityRetriever:
     MAX_RETRIES = 3
     RETRY_DELAY = 1  # secondes
     REQUEST_TIMEOUT = 30  # secondes
+    MAX_GEOCODING_CONCURRENCY = 8  # requêtes de géocodage simultanées
+    REQUESTS_PER_MINUTE = 50  # débit maximal des appels Perplexity
+    BURST = 5  # appels Perplexity pouvant partir ensemble
+
+    def __init__(self, cache_ttl: Optional[float] = None, cache_maxsize: int = 256):
+        """
+        Initialise le service Perplexity
+
+        Args:
+            cache_ttl: Durée de conservation des résultats d'une recherche en secondes
+                (par défaut: Config.PERPLEXITY_CACHE_TTL, 0 = pas de cache)
+            cache_maxsize: Nombre maximal de recherches en cache (éviction LRU)
+        """
+        self.cache_ttl = Config.PERPLEXITY_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.cache_maxsize = cache_maxsize
+        # Résultats par recherche normalisée (LRU + TTL): clé -> (résultats, expiration)
+        self._cache: "OrderedDict[Tuple, Tuple[List[Dict], float]]" = OrderedDict()
+        # Recherches en cours: les appels identiques simultanés attendent le même résultat
+        # (Future thread-safe: les sessions Streamlit ont chacune leur boucle asyncio)
+        self._en_cours: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        # Débit des appels API (partagé par toutes les recherches de l'instance)
+        self.rate_limiter = TokenBucket(self.REQUESTS_PER_MINUTE / 60, self.BURST)
 
-    def __init__(self):
-        """Initialise le service Perplexity"""
         self.api_key = Config.PERPLEXITY_API_KEY
         if not self.api_key:
             logger.error("[ERROR] PERPLEXITY_API_KEY non configurée")
@@ -96,6 +125,8 @@ class PerplexityRetriever:
     ) -> Optional[Dict]:
         """
         Effectue un appel à l'API Perplexity avec retries exponentiels.
+        Chaque tentative attend un jeton du limiteur de débit; une réponse 429
+        suspend tous les appels pendant Retry-After (ou le délai exponentiel).
 
         Args:
             prompt: Le prompt à envoyer à Perplexity
@@ -106,6 +137,7 @@ class PerplexityRetriever:
         """
         for attempt in range(max_retries):
             try:
+                await self.rate_limiter.acquire()
                 response = await self.client.post(
                     self.BASE_URL,
                     json={
@@ -134,10 +166,12 @@ class PerplexityRetriever:
 
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 429:  # Rate limit
-                    logger.warning(f"[WARNING] Rate limit Perplexity, attente...")
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(self.RETRY_DELAY * (2 ** attempt))
-                    else:
+                    retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                    delay = retry_after if retry_after is not None else self.RETRY_DELAY * (2 ** attempt)
+                    logger.warning(f"[WARNING] Rate limit Perplexity, attente {delay:.1f}s...")
+                    # Attente portée par le limiteur: les autres recherches en cours attendent aussi
+                    self.rate_limiter.pause(delay)
+                    if attempt >= max_retries - 1:
                         logger.error("[ERROR] Rate limit persistant")
                         return None
                 else:
@@ -201,6 +235,25 @@ Retourne SEULEMENT le JSON valide sans texte supplémentaire. Si pas de résulta
 """
         return prompt
 
+    @staticmethod
+    def _cache_key(
+        city: str,
+        postal_code: str,
+        property_type: str,
+        price_min: Optional[float],
+        price_max: Optional[float],
+        radius_km: int
+    ) -> Tuple:
+        """Clé normalisée d'une recherche (mêmes critères → même prompt)"""
+        return (
+            normalize_address(city),
+            (postal_code or "").strip(),
+            (property_type or "all").lower(),
+            float(price_min) if price_min else None,
+            float(price_max) if price_max else None,
+            float(radius_km),
+        )
+
     async def search_properties_for_sale(
         self,
         city: str,
@@ -212,6 +265,8 @@ Retourne SEULEMENT le JSON valide sans texte supplémentaire. Si pas de résulta
     ) -> List[Dict]:
         """
         Recherche les biens en vente via Perplexity et enrichit les données.
+        Les résultats sont conservés cache_ttl secondes par recherche normalisée;
+        une recherche identique déjà en cours est attendue au lieu d'être relancée.
 
         Args:
             city: Ville de recherche
@@ -228,6 +283,53 @@ Retourne SEULEMENT le JSON valide sans texte supplémentaire. Si pas de résulta
             logger.error("[ERROR] Perplexity client non initialisé")
             return []
 
+        key = self._cache_key(city, postal_code, property_type, price_min, price_max, radius_km)
+        with self._lock:
+            self._purge_cache(time.time())
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                logger.info(f"[OK] Recherche Perplexity servie depuis le cache: {city} ({postal_code})")
+                return [dict(result) for result in cached[0]]
+
+            future = self._en_cours.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._en_cours[key] = future
+
+        if not leader:
+            logger.info(f"[INFO] Recherche Perplexity identique en cours, attente: {city} ({postal_code})")
+            results = await asyncio.wrap_future(future)
+            return [dict(result) for result in results or []]
+
+        results = None
+        try:
+            results = await self._search(city, postal_code, property_type, price_min, price_max, radius_km)
+            # Échecs (réponse absente ou invalide) non mis en cache
+            if results is not None and self.cache_ttl > 0:
+                with self._lock:
+                    self._cache[key] = ([dict(result) for result in results], time.time() + self.cache_ttl)
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.cache_maxsize:
+                        self._cache.popitem(last=False)
+        finally:
+            with self._lock:
+                self._en_cours.pop(key, None)
+            future.set_result(results)
+
+        return results or []
+
+    async def _search(
+        self,
+        city: str,
+        postal_code: str,
+        property_type: str,
+        price_min: Optional[float],
+        price_max: Optional[float],
+        radius_km: int,
+    ) -> Optional[List[Dict]]:
+        """Appel Perplexity + parsing + géocodage (None si la recherche a échoué)"""
         try:
             # Construire le prompt
             prompt = self._build_search_prompt(
@@ -239,7 +341,7 @@ Retourne SEULEMENT le JSON valide sans texte supplémentaire. Si pas de résulta
             response_data = await self._make_request_with_retry(prompt)
             if not response_data:
                 logger.error("[ERROR] Perplexity n'a pas retourné de réponse valide")
-                return []
+                return None
 
             # Parser la réponse
             perplexity_response = self._parse_perplexity_response(response_data)
@@ -251,7 +353,18 @@ Retourne SEULEMENT le JSON valide sans texte supplémentaire. Si pas de résulta
 
         except Exception as e:
             logger.error(f"[ERROR] Erreur lors de la recherche: {e}")
-            return []
+            return None
+
+    def _purge_cache(self, now: float) -> None:
+        """Supprime les recherches expirées (appelé sous self._lock)"""
+        expired = [key for key, (_, expires_at) in self._cache.items() if expires_at <= now]
+        for key in expired:
+            del self._cache[key]
+
+    def clear_cache(self) -> None:
+        """Vide le cache des recherches"""
+        with self._lock:
+            self._cache.clear()
 
     def _parse_perplexity_response(self, response_data: Dict) -> List[PerplexityProperty]:
         """
@@ -305,6 +418,9 @@ Retourne SEULEMENT le JSON valide sans texte supplémentaire. Si pas de résulta
     ) -> List[Dict]:
         """
         Enrichit les propriétés avec coordonnées géographiques.
+        Une seule requête par adresse distincte (clé normalisée), exécutées en parallèle
+        hors de la boucle asyncio (au plus MAX_GEOCODING_CONCURRENCY simultanées);
+        le cache de géocodage partagé évite les appels pour les adresses déjà vues.
 
         Args:
             properties: Liste des propriétés à enrichir
@@ -312,24 +428,166 @@ Retourne SEULEMENT le JSON valide sans texte supplémentaire. Si pas de résulta
         Returns:
             Liste de dictionnaires avec lat/lon ajoutées
         """
-        enriched = []
-        for prop in properties:
-            prop_dict = prop.model_dump()
-
-            # Si coordonnées manquantes, essayer de géocoder
-            if not prop_dict.get("latitude") or not prop_dict.get("longitude"):
-                coords = get_coordinates(prop_dict["address"])
-                if coords:
-                    prop_dict["latitude"] = coords[0]
-                    prop_dict["longitude"] = coords[1]
-                    logger.debug(f"[OK] Géocodage réussi: {prop_dict['address']}")
-                else:
-                    logger.warning(f"[WARNING] Géocodage échoué: {prop_dict['address']}")
-
-            enriched.append(prop_dict)
+        enriched = [prop.model_dump() for prop in properties]
+
+        # Si coordonnées manquantes, essayer de géocoder
+        a_geocoder = [
+            prop_dict for prop_dict in enriched
+            if not prop_dict.get("latitude") or not prop_dict.get("longitude")
+        ]
+        coordonnees = await self._geocode_many([prop_dict["address"] for prop_dict in a_geocoder])
+
+        for prop_dict in a_geocoder:
+            coords = coordonnees[normalize_address(prop_dict["address"])]
+            if coords:
+                prop_dict["latitude"] = coords[0]
+                prop_dict["longitude"] = coords[1]
+                logger.debug(f"[OK] Géocodage réussi: {prop_dict['address']}")
+            else:
+                logger.warning(f"[WARNING] Géocodage échoué: {prop_dict['address']}")
 
         return enriched
 
+    async def _geocode_many(self, addresses: List[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+        """
+        Géocode des adresses en parallèle (une requête par adresse distincte).
+
+        Returns:
+            Dict adresse normalisée -> (lat, lon) ou None
+        """
+        adresses: Dict[str, str] = {}
+        for address in addresses:
+            adresses.setdefault(normalize_address(address), address)
+
+        semaphore = asyncio.Semaphore(self.MAX_GEOCODING_CONCURRENCY)
+
+        async def geocode(address: str):
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(get_coordinates, address)
+                except Exception as e:
+                    logger.error(f"[ERROR] Erreur géocodage {address}: {e}")
+                    return None
+
+        cles = list(adresses)
+        resultats = await asyncio.gather(*(geocode(adresses[cle]) for cle in cles))
+        return dict(zip(cles, resultats))
+
+    # ===================================
+    # RECHERCHE MULTI-COMMUNES
+    # ===================================
+
+    async def select_communes(
+        self,
+        insee_codes: Optional[List[str]] = None,
+        center: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None
+    ) -> pd.DataFrame:
+        """
+        Communes de insee_mapping.csv retenues pour une recherche multi-communes.
+
+        Args:
+            insee_codes: Codes INSEE explicites
+            center: (lat, lon) du centre de la zone (avec radius_km)
+            radius_km: Rayon autour du centre; les communes sont localisées par le
+                géocodeur (cache partagé, index BAN)
+
+        Returns:
+            DataFrame insee_code, commune, postal_code (+ distance_km en mode rayon)
+        """
+        mapping = load_insee_mapping()
+        if insee_codes is not None:
+            mapping = mapping[mapping["insee_code"].isin([str(code) for code in insee_codes])]
+        # Une commune peut figurer sous plusieurs codes INSEE: un seul prompt par commune
+        mapping = mapping.drop_duplicates(subset=["commune", "postal_code"])
+        if center is None or radius_km is None:
+            return mapping.reset_index(drop=True)
+
+        libelles = [f"{row.commune}, {row.postal_code}" for row in mapping.itertuples()]
+        coordonnees = await self._geocode_many(libelles)
+        kernel = DistanceKernel(*center)
+        distances = []
+        for libelle in libelles:
+            coords = coordonnees[normalize_address(libelle)]
+            distances.append(kernel.distance(*coords) if coords else float("inf"))
+        mapping = mapping.assign(distance_km=distances)
+        return mapping[mapping["distance_km"] <= radius_km].sort_values("distance_km").reset_index(drop=True)
+
+    async def search_communes(
+        self,
+        insee_codes: Optional[List[str]] = None,
+        center: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+        property_type: str = "all",
+        price_min: Optional[float] = None,
+        price_max: Optional[float] = None,
+        commune_radius_km: int = 2,
+    ) -> List[Dict]:
+        """
+        Recherche les biens en vente sur plusieurs communes (un prompt par commune).
+        Les prompts partent en parallèle sous le limiteur de débit; chaque commune
+        profite du cache et du regroupement de search_properties_for_sale.
+
+        Args:
+            insee_codes: Codes INSEE des communes (insee_mapping.csv)
+            center: (lat, lon) du centre de la zone, avec radius_km
+            radius_km: Rayon de la zone; les biens géocodés hors du rayon sont écartés
+            property_type: Type de bien
+            price_min: Prix minimum
+            price_max: Prix maximum
+            commune_radius_km: Rayon de recherche de chaque prompt
+
+        Returns:
+            Biens fusionnés et dédoublonnés (colonnes de search_properties_for_sale
+            + insee_code, commune_recherche)
+        """
+        communes = await self.select_communes(insee_codes, center, radius_km)
+        if len(communes) == 0:
+            logger.warning("[WARNING] Aucune commune retenue pour la recherche")
+            return []
+        logger.info(f"[INFO] Recherche Perplexity sur {len(communes)} commune(s)")
+
+        resultats = await asyncio.gather(*(
+            self.search_properties_for_sale(
+                city=row.commune,
+                postal_code=row.postal_code,
+                property_type=property_type,
+                price_min=price_min,
+                price_max=price_max,
+                radius_km=commune_radius_km,
+            )
+            for row in communes.itertuples()
+        ))
+
+        kernel = DistanceKernel(*center) if center is not None and radius_km is not None else None
+        merged = []
+        vus = set()
+        for row, biens in zip(communes.itertuples(), resultats):
+            for bien in biens:
+                cle = self._listing_key(bien)
+                if cle in vus:
+                    continue
+                if kernel is not None and bien.get("latitude") and bien.get("longitude"):
+                    if kernel.distance(bien["latitude"], bien["longitude"]) > radius_km:
+                        continue
+                vus.add(cle)
+                merged.append({**bien, "insee_code": row.insee_code, "commune_recherche": row.commune})
+
+        logger.info(f"[OK] {len(merged)} bien(s) distinct(s) sur {sum(len(biens) for biens in resultats)} trouvé(s)")
+        return merged
+
+    @staticmethod
+    def _listing_key(bien: Dict) -> Tuple:
+        """
+        Clé de dédoublonnage: URL de l'annonce (sans paramètres ni / final), sinon
+        adresse normalisée + prix + surface (les adresses seules sont souvent au
+        niveau de la commune et désignent plusieurs biens).
+        """
+        url = (bien.get("listing_url") or "").strip().lower()
+        if url.startswith("http"):
+            return ("url", url.split("?")[0].split("#")[0].rstrip("/"))
+        return ("adresse", normalize_address(bien.get("address", "")), bien.get("price"), bien.get("surface"))
+
     async def close(self):
         """Ferme la connexion HTTP"""
         if self.client:
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PortfolioEstimator - Estimation en masse d'un portefeuille de biens
+Regroupe les biens par tuile spatiale, récupère les comparables une seule fois
+par tuile puis répartit le scoring sur un pool de processus.
+"""
+
+import argparse
+import logging
+import os
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.comparable_set import ComparableSet
+from src.comparables_cache import age_days, ranking_key
+from src.estimation_algorithm import EstimationAlgorithm
+from src.scoring_profiles import ScoringProfile, get_profile
+from src.utils.distance import DistanceKernel
+
+logger = logging.getLogger(__name__)
+
+# Colonnes attendues dans le fichier portefeuille
+REQUIRED_COLUMNS = ("latitude", "longitude", "surface", "type_bien")
+ID_COLUMN = "id"
+
+KM_PAR_DEGRE = 111.32
+
+# Instance par processus worker (créée au premier appel)
+_WORKER_ESTIMATOR: Optional[EstimationAlgorithm] = None
+
+
+def load_properties(path: str) -> pd.DataFrame:
+    """
+    Charge un portefeuille de biens depuis un fichier CSV ou Parquet.
+
+    Colonnes requises: latitude, longitude, surface, type_bien
+    Colonne optionnelle: id (sinon numéro de ligne)
+    """
+    if path.lower().endswith((".parquet", ".pq")):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes dans {path}: {', '.join(missing)}")
+
+    if ID_COLUMN not in df.columns:
+        df[ID_COLUMN] = np.arange(len(df))
+    return df
+
+
+def tile_keys(latitudes: np.ndarray, longitudes: np.ndarray, tile_km: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices (ligne, colonne) de la grille de tuiles d'environ tile_km de côté"""
+    tile_deg_lat = tile_km / KM_PAR_DEGRE
+    rows = np.floor(latitudes / tile_deg_lat).astype(np.int64)
+    # Largeur en longitude calculée au centre de la ligne de tuiles
+    center_lat = np.radians((rows + 0.5) * tile_deg_lat)
+    tile_deg_lon = tile_km / (KM_PAR_DEGRE * np.maximum(np.cos(center_lat), 1e-6))
+    cols = np.floor(longitudes / tile_deg_lon).astype(np.int64)
+    return rows, cols
+
+
+def _estimate_tile(targets: List[Dict], comparables: ComparableSet, params: Dict) -> List[Dict]:
+    """
+    Estime tous les biens d'une tuile à partir des comparables de la tuile.
+    Exécuté dans un processus worker (fonction module pour être sérialisable).
+    """
+    global _WORKER_ESTIMATOR
+    if _WORKER_ESTIMATOR is None or _WORKER_ESTIMATOR.profile != params["profile"]:
+        _WORKER_ESTIMATOR = EstimationAlgorithm(profile=params["profile"])
+
+    tolerance = params["surface_tolerance_pct"] / 100
+    latitudes = comparables.get("latitude", np.zeros(0))
+    longitudes = comparables.get("longitude", np.zeros(0))
+    surfaces = comparables.get("sbati", np.zeros(0))
+    if "datemut" in comparables:
+        ages = age_days(comparables["datemut"], params["reference_date"])
+    else:
+        ages = np.zeros(len(comparables))
+
+    results = []
+    for target in targets:
+        surface = float(target["surface"])
+        distances = DistanceKernel(target["latitude"], target["longitude"]).distances(latitudes, longitudes)
+        # Mêmes critères que la requête unitaire: rayon et fourchette de surface
+        mask = (
+            (distances <= params["rayon_km"]) &
+            (surfaces >= surface * (1 - tolerance)) &
+            (surfaces <= surface * (1 + tolerance))
+        )
+        # Même classement que la requête unitaire (ordre de get_comparables) avant le LIMIT,
+        # calculé avec les distances au bien (et non au centre de la tuile), puis tri par distance
+        candidats = np.flatnonzero(mask)
+        cle = ranking_key(params["ordre"], distances[candidats], ages[candidats], params["rayon_km"], params["annees"])
+        selection = candidats[np.argsort(cle, kind="stable")[:params["limit"]]]
+        selection = selection[np.argsort(distances[selection], kind="stable")]
+
+        estimation = _WORKER_ESTIMATOR.estimate(
+            target_latitude=target["latitude"],
+            target_longitude=target["longitude"],
+            target_surface=surface,
+            target_type=target["type_bien"],
+            comparables=comparables.take(selection),
+            reference_date=params["reference_date"]
+        )
+        results.append(_result_row(target, estimation))
+
+    return results
+
+
+def _result_row(target: Dict, estimation: Dict) -> Dict:
+    """Ligne de résultat à plat (une par bien)"""
+    row = {
+        ID_COLUMN: target[ID_COLUMN],
+        "success": bool(estimation.get("success")),
+        "prix_estime_eur": None,
+        "prix_min_eur": None,
+        "prix_max_eur": None,
+        "prix_au_m2_eur": None,
+        "fiabilite": None,
+        "nb_comparables_utilises": 0,
+        "erreur": estimation.get("erreur")
+    }
+    if row["success"]:
+        row.update(estimation["estimation"])
+        row["fiabilite"] = estimation["fiabilite"].get("score_global")
+        row["nb_comparables_utilises"] = estimation["nb_comparables_utilises"]
+    return row
+
+
+class PortfolioEstimator:
+    """
+    Estimation en masse (10k-50k lots) pour revalorisation de portefeuilles.
+
+    Les biens sont regroupés par tuile spatiale et type de bien: une seule requête
+    de comparables par groupe, puis scoring réparti sur un ProcessPoolExecutor.
+    Les résultats sont produits au fil de l'eau (générateur).
+    """
+
+    def __init__(
+        self,
+        retriever,
+        tile_km: float = 2.0,
+        rayon_km: float = 10.0,
+        annees: int = 3,
+        surface_tolerance_pct: float = 20,
+        limit: int = 50,
+        limit_par_tuile: int = 5000,
+        profile: Union[str, ScoringProfile, None] = None,
+        ordre: str = "hybride"
+    ):
+        """
+        Args:
+            retriever: Source de comparables (get_comparables(..., as_set=True, resoudre_adresses=False))
+            tile_km: Côté des tuiles de regroupement en km
+            rayon_km: Rayon de recherche autour de chaque bien
+            annees: Ancienneté maximale des mutations
+            surface_tolerance_pct: Tolérance de surface (± %)
+            limit: Nombre maximal de comparables par bien
+            limit_par_tuile: Nombre maximal de comparables récupérés par tuile
+            profile: Profil de scoring (nom ou ScoringProfile)
+            ordre: Sélection des comparables de chaque bien, comme get_comparables
+                ('hybride' par défaut, 'recent', 'distance')
+        """
+        self.retriever = retriever
+        self.tile_km = tile_km
+        self.rayon_km = rayon_km
+        self.annees = annees
+        self.surface_tolerance_pct = surface_tolerance_pct
+        self.limit = limit
+        self.limit_par_tuile = limit_par_tuile
+        self.profile = profile
+        self.ordre = ordre
+
+    def group_by_tile(self, properties: pd.DataFrame) -> List[pd.DataFrame]:
+        """Découpe le portefeuille en groupes (tuile, type de bien)"""
+        rows, cols = tile_keys(
+            properties["latitude"].to_numpy(dtype=float),
+            properties["longitude"].to_numpy(dtype=float),
+            self.tile_km
+        )
+        keys = properties.assign(_tile_row=rows, _tile_col=cols)
+        return [
+            group.drop(columns=["_tile_row", "_tile_col"])
+            for _, group in keys.groupby(["_tile_row", "_tile_col", "type_bien"], sort=False)
+        ]
+
+    def fetch_tile_comparables(self, group: pd.DataFrame) -> ComparableSet:
+        """Récupère en une requête les comparables couvrant tous les biens du groupe"""
+        latitudes = group["latitude"].to_numpy(dtype=float)
+        longitudes = group["longitude"].to_numpy(dtype=float)
+        surfaces = group["surface"].to_numpy(dtype=float)
+        center_lat = float(latitudes.mean())
+        center_lon = float(longitudes.mean())
+
+        # Rayon élargi pour couvrir le disque de recherche de chaque bien
+        extension_km = DistanceKernel(center_lat, center_lon).distances(latitudes, longitudes).max()
+        tolerance = self.surface_tolerance_pct / 100
+
+        return self.retriever.get_comparables(
+            latitude=center_lat,
+            longitude=center_lon,
+            type_bien=group["type_bien"].iloc[0],
+            surface_min=float(surfaces.min()) * (1 - tolerance),
+            surface_max=float(surfaces.max()) * (1 + tolerance),
+            rayon_km=self.rayon_km + float(extension_km),
+            annees=self.annees,
+            limit=self.limit_par_tuile,
+            as_set=True,
+            # La sélection par bien (ordre de l'estimateur) se fait ensuite dans _estimate_tile;
+            # un classement par distance au centre de tuile favoriserait les biens centraux
+            ordre="recent",
+            # Adresses inutiles au portefeuille: pas de reverse geocoding (appels Google facturés)
+            resoudre_adresses=False
+        )
+
+    def _tile_params(self) -> Dict:
+        # Date de référence commune à tout le portefeuille
+        return {
+            "reference_date": datetime.now(),
+            "rayon_km": self.rayon_km,
+            "annees": self.annees,
+            "ordre": self.ordre,
+            "surface_tolerance_pct": self.surface_tolerance_pct,
+            "limit": self.limit,
+            "profile": self.profile
+        }
+
+    def estimate_many(
+        self,
+        properties: Union[pd.DataFrame, str],
+        workers: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """
+        Estime un portefeuille de biens.
+
+        Args:
+            properties: DataFrame ou chemin CSV/Parquet (latitude, longitude, surface, type_bien, id)
+            workers: Nombre de processus (None = nombre de CPU, 1 = exécution dans le processus courant)
+
+        Yields:
+            Un dict de résultat par bien (id, success, prix_estime_eur, fiabilite, ...),
+            dans l'ordre de fin de traitement des tuiles
+        """
+        if isinstance(properties, str):
+            properties = load_properties(properties)
+        elif ID_COLUMN not in properties.columns:
+            properties = properties.assign(**{ID_COLUMN: np.arange(len(properties))})
+
+        groups = self.group_by_tile(properties)
+        params = self._tile_params()
+        workers = workers or os.cpu_count() or 1
+        logger.info(f"Portefeuille: {len(properties)} biens, {len(groups)} tuiles, {workers} worker(s)")
+
+        if workers <= 1:
+            for group in groups:
+                comparables = self.fetch_tile_comparables(group)
+                yield from _estimate_tile(group.to_dict("records"), comparables, params)
+            return
+
+        # Nombre de tuiles en vol borné: la récupération (processus principal)
+        # avance en parallèle du scoring sans charger tout le portefeuille en mémoire
+        max_pending = workers * 2
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for group in groups:
+                comparables = self.fetch_tile_comparables(group)
+                pending.add(executor.submit(_estimate_tile, group.to_dict("records"), comparables, params))
+
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+
+def estimate_many(
+    properties: Union[pd.DataFrame, str],
+    retriever=None,
+    workers: Optional[int] = None,
+    **options
+) -> Iterator[Dict]:
+    """
+    Raccourci: estime un portefeuille (DataFrame ou fichier CSV/Parquet).
+    Sans retriever fourni, utilise SupabaseDataRetriever.
+    """
+    if retriever is None:
+        from src.supabase_data_retriever import SupabaseDataRetriever
+        retriever = SupabaseDataRetriever()
+    return PortfolioEstimator(retriever, **options).estimate_many(properties, workers=workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimation en masse d'un portefeuille (CSV/Parquet)")
+    parser.add_argument("input", help="Fichier portefeuille (latitude, longitude, surface, type_bien, id)")
+    parser.add_argument("output", help="Fichier résultats (CSV)")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus")
+    parser.add_argument("--tile-km", type=float, default=2.0, help="Côté des tuiles en km")
+    parser.add_argument("--rayon-km", type=float, default=10.0, help="Rayon de recherche en km")
+    parser.add_argument("--profile", default=None,
+                        help="Profil de scoring (nom du fichier SCORING_PROFILES_PATH, défaut: barème historique)")
+    args = parser.parse_args()
+    if args.profile:
+        # Nom inconnu: erreur avant de lancer les workers
+        get_profile(args.profile)
+
+    results = estimate_many(
+        args.input,
+        workers=args.workers,
+        tile_km=args.tile_km,
+        rayon_km=args.rayon_km,
+        profile=args.profile
+    )
+
+    # Écriture au fil de l'eau, par paquets
+    header = True
+    batch = []
+    count = 0
+    for row in results:
+        batch.append(row)
+        if len(batch) >= 1000:
+            pd.DataFrame(batch).to_csv(args.output, mode="w" if header else "a", header=header, index=False)
+            header = False
+            count += len(batch)
+            batch = []
+            print(f"[OK] {count} biens estimés")
+    if batch or header:
+        pd.DataFrame(batch).to_csv(args.output, mode="w" if header else "a", header=header, index=False)
+        count += len(batch)
+    print(f"[OK] {count} biens estimés -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
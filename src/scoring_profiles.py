@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Profils de scoring - Pondérations et barèmes de similarité configurables
+Un profil (par type de bien, marché ou client) est compilé une fois en tables
+de lookup: codes de type entiers, matrice de compatibilité, courbe d'ancienneté par jour.
+"""
+
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+JOURS_PAR_MOIS = 30.44
+
+
+@dataclass(frozen=True)
+class ScoringProfile:
+    """Paramètres d'un profil de scoring (valeurs par défaut = barème historique)"""
+
+    name: str = "defaut"
+
+    # Pondérations
+    distance_weight: float = 0.25
+    surface_weight: float = 0.25
+    type_weight: float = 0.25
+    anciennete_weight: float = 0.25
+
+    # Distance: 100 * exp(-decay * km), 0 au-delà de distance_max_km
+    distance_max_km: float = 15.0
+    distance_decay: float = 0.3
+
+    # Surface: linéaire dans ±tolérance
+    surface_tolerance_pct: float = 0.20
+
+    # Type: score identique / compatible
+    type_match_score: float = 100
+    type_compatible_score: float = 50
+    compatible_pairs: Tuple[Tuple[str, str], ...] = (
+        ("maison", "appartement"),
+        ("studio", "apartement"),
+    )
+
+    # Ancienneté: segments linéaires (mois_max, score_debut, score_fin), 0 au-delà
+    anciennete_segments: Tuple[Tuple[float, float, float], ...] = (
+        (12, 100, 100),
+        (24, 80, 50),
+        (36, 50, 0),
+    )
+    anciennete_inconnue_score: float = 50
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ScoringProfile":
+        """Construit un profil depuis un dict (JSON), les clés absentes gardent leur défaut"""
+        data = dict(data)
+        if "compatible_pairs" in data:
+            data["compatible_pairs"] = tuple(tuple(pair) for pair in data["compatible_pairs"])
+        if "anciennete_segments" in data:
+            data["anciennete_segments"] = tuple(tuple(segment) for segment in data["anciennete_segments"])
+        return cls(**data)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class CompiledScoringProfile:
+    """
+    Profil compilé en tables prêtes pour le scoring vectorisé.
+
+    - type_codes: libellé normalisé (minuscules) → code entier
+    - compatibility: matrice (codes x codes) des scores de type
+    - recency_by_day: score d'ancienneté indexé par l'âge en jours
+    """
+
+    def __init__(self, profile: ScoringProfile):
+        self.profile = profile
+        self.weights = np.array([
+            profile.distance_weight,
+            profile.surface_weight,
+            profile.type_weight,
+            profile.anciennete_weight
+        ], dtype=float)
+
+        # Types connus du profil (ceux cités dans les paires de compatibilité)
+        names: List[str] = []
+        for pair in profile.compatible_pairs:
+            for name in pair:
+                if name.lower() not in names:
+                    names.append(name.lower())
+        self.type_codes: Dict[str, int] = {name: code for code, name in enumerate(names)}
+
+        matrix = np.zeros((len(names), len(names)))
+        np.fill_diagonal(matrix, profile.type_match_score)
+        for a, b in profile.compatible_pairs:
+            i, j = self.type_codes[a.lower()], self.type_codes[b.lower()]
+            if i != j:
+                matrix[i, j] = matrix[j, i] = profile.type_compatible_score
+        self.compatibility = matrix
+
+        # Courbe d'ancienneté échantillonnée par jour entier
+        max_mois = max((segment[0] for segment in profile.anciennete_segments), default=0)
+        jours = np.arange(int(np.floor(max_mois * JOURS_PAR_MOIS)) + 1)
+        mois = jours / JOURS_PAR_MOIS
+        conditions, valeurs = [], []
+        debut = 0.0
+        for mois_max, score_debut, score_fin in profile.anciennete_segments:
+            conditions.append(mois <= mois_max)
+            pente = (score_fin - score_debut) / (mois_max - debut) if mois_max > debut else 0.0
+            valeurs.append(score_debut + (mois - debut) * pente)
+            debut = mois_max
+        self.recency_by_day = np.select(conditions, valeurs, 0.0)
+
+    def type_score(self, type_target: str, type_comparable: str) -> float:
+        """Score de type pour une paire de libellés"""
+        target, comparable = type_target.lower(), type_comparable.lower()
+        if target == comparable:
+            return self.profile.type_match_score
+        i, j = self.type_codes.get(target), self.type_codes.get(comparable)
+        if i is None or j is None:
+            return 0
+        return self.compatibility[i, j]
+
+    def type_lookup(self, type_target: str, labels: Sequence[str]) -> np.ndarray:
+        """
+        Table score_type par code de libellé (une entrée par libellé distinct,
+        la dernière pour les libellés manquants, normalisés en "Inconnu").
+        Les libellés doivent être déjà normalisés (Appartement, Maison...).
+        """
+        return np.array(
+            [self.type_score(type_target, label) for label in labels] +
+            [self.type_score(type_target, "Inconnu")],
+            dtype=float
+        )
+
+    def distance_scores(self, distances_km: np.ndarray) -> np.ndarray:
+        return np.where(
+            (distances_km < 0) | (distances_km >= self.profile.distance_max_km),
+            0.0,
+            100 * np.exp(-self.profile.distance_decay * distances_km)
+        )
+
+    def surface_scores(self, target_surface: float, surfaces: np.ndarray) -> np.ndarray:
+        if target_surface <= 0:
+            return np.zeros(len(surfaces))
+        ratios = surfaces / target_surface
+        tolerance = self.profile.surface_tolerance_pct
+        return np.where(
+            (surfaces > 0) & (ratios >= 1 - tolerance) & (ratios <= 1 + tolerance),
+            np.maximum(0.0, 100 * (1 - np.abs(ratios - 1) / tolerance)),
+            0.0
+        )
+
+    def recency_scores(self, jours: np.ndarray) -> np.ndarray:
+        """Score d'ancienneté par lookup sur l'âge en jours (NaN = date inconnue)"""
+        inconnues = np.isnan(jours)
+        index = np.clip(np.nan_to_num(jours), 0, None).astype(np.int64)
+        dans_courbe = index < len(self.recency_by_day)
+        scores = np.where(dans_courbe, self.recency_by_day[np.minimum(index, len(self.recency_by_day) - 1)], 0.0)
+        return np.where(inconnues, self.profile.anciennete_inconnue_score, scores)
+
+    def recency_score(self, jours: int) -> float:
+        """Score d'ancienneté pour un âge en jours"""
+        return float(self.recency_scores(np.array([jours], dtype=float))[0])
+
+
+DEFAULT_PROFILE = ScoringProfile()
+
+# Registre des profils nommés (par type de bien, marché ou client)
+_PROFILES: Dict[str, ScoringProfile] = {DEFAULT_PROFILE.name: DEFAULT_PROFILE}
+# Fichier Config.SCORING_PROFILES_PATH déjà lu par ce processus
+_configured_loaded = False
+
+
+def register_profile(profile: ScoringProfile) -> None:
+    """Ajoute ou remplace un profil nommé"""
+    _PROFILES[profile.name] = profile
+
+
+def load_profiles(path: str) -> List[str]:
+    """
+    Charge des profils depuis un fichier JSON: liste de dicts (ou dict nom → paramètres).
+
+    Returns:
+        Noms des profils chargés
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        data = [{**params, "name": name} for name, params in data.items()]
+
+    names = []
+    for params in data:
+        profile = ScoringProfile.from_dict(params)
+        register_profile(profile)
+        names.append(profile.name)
+    return names
+
+
+def load_configured_profiles() -> List[str]:
+    """
+    Charge une fois par processus les profils de Config.SCORING_PROFILES_PATH
+    (appelé au démarrage de l'app et au premier get_profile, y compris dans les workers).
+    Fichier absent: seul le profil par défaut est disponible.
+
+    Returns:
+        Noms des profils chargés (vide si déjà chargés, fichier absent ou invalide)
+    """
+    global _configured_loaded
+    if _configured_loaded:
+        return []
+    _configured_loaded = True
+
+    path = Config.SCORING_PROFILES_PATH
+    if not path or not os.path.exists(path):
+        return []
+    try:
+        names = load_profiles(path)
+    except (OSError, ValueError, TypeError) as e:
+        logger.error(f"[ERROR] Profils de scoring {path} illisibles: {e}")
+        return []
+    logger.info(f"[OK] Profils de scoring chargés depuis {path}: {', '.join(names)}")
+    return names
+
+
+def get_profile(name: str) -> ScoringProfile:
+    """Profil nommé (ValueError si inconnu)"""
+    load_configured_profiles()
+    if name not in _PROFILES:
+        raise ValueError(f"Profil de scoring inconnu: {name} (disponibles: {', '.join(sorted(_PROFILES))})")
+    return _PROFILES[name]
+
+
+def compile_profile(profile: Union[str, ScoringProfile, None] = None) -> CompiledScoringProfile:
+    """Profil compilé (mis en cache: chaque profil n'est compilé qu'une fois)"""
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    elif isinstance(profile, str):
+        profile = get_profile(profile)
+    return _compile(profile)
+
+
+@lru_cache(maxsize=32)
+def _compile(profile: ScoringProfile) -> CompiledScoringProfile:
+    return CompiledScoringProfile(profile)
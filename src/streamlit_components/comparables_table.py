@@ -7,11 +7,32 @@ US3 - Filtrer comparables manuellement
 
 import streamlit as st
 import pandas as pd
-from typing import Optional
+from typing import Optional, Union
+
+from src.comparable_set import ComparableSet
+from src.utils.reverse_geocoding import get_reverse_geocoder
+
+
+# Intervalle de vérification des adresses en cours de résolution (secondes)
+ADRESSES_POLL_S = 1.5
+
+
+def _suivi_adresses() -> None:
+    """
+    Suivi du reverse geocoding en arrière-plan: relancé toutes les ADRESSES_POLL_S
+    secondes, il re-rend la page dès que de nouvelles adresses sont arrivées dans le cache.
+    """
+    en_cours = get_reverse_geocoder().pending()
+    precedent = st.session_state.get('_adresses_en_cours', en_cours)
+    st.session_state['_adresses_en_cours'] = en_cours
+    if en_cours < precedent:
+        st.rerun()
+    if en_cours:
+        st.caption(f"⏳ {en_cours} adresse(s) en cours de résolution")
 
 
 def render_comparables_table(
-    comparables_df: pd.DataFrame,
+    comparables: Union[ComparableSet, pd.DataFrame],
     estimation_callback: callable,
     bien_params: dict,
     show_adjusted_price: bool = False
@@ -20,16 +41,38 @@ def render_comparables_table(
     Affiche tableau interactif des comparables avec filtres et recalcul.
 
     Args:
-        comparables_df: DataFrame avec colonnes: idmutation, datemut, valeurfonc, sbati, distance_km, score
-        estimation_callback: Fonction callback pour recalcul estimation avec comparables filtrés
+        comparables: ComparableSet (ou DataFrame) avec colonnes: idmutation, datemut, valeurfonc, sbati, distance_km, score
+        estimation_callback: Fonction callback pour recalcul estimation avec comparables filtrés (ComparableSet)
+            et positions des lignes retenues (selection_indices)
         bien_params: Dict paramètres bien (pour recalcul)
         show_adjusted_price: Si True, affiche la colonne 'prix_ajuste'
     """
 
-    if comparables_df is None or len(comparables_df) == 0:
+    if comparables is None or len(comparables) == 0:
         st.warning("⚠️ Aucun comparable disponible")
         return
 
+    # Vue DataFrame pour l'affichage (index = position dans l'ensemble source)
+    if isinstance(comparables, ComparableSet):
+        comparables_df = comparables.to_dataframe()
+    else:
+        comparables_df = comparables.copy()
+
+    # Adresses provisoires "(lat, lon)": compléter avec celles résolues depuis en arrière-plan
+    if {'adresse', 'latitude', 'longitude'}.issubset(comparables_df.columns):
+        geocoder = get_reverse_geocoder()
+        comparables_df['adresse'] = geocoder.refresh(
+            comparables_df['idmutation'].tolist() if 'idmutation' in comparables_df.columns else None,
+            comparables_df['latitude'].to_numpy(dtype=float),
+            comparables_df['longitude'].to_numpy(dtype=float),
+            comparables_df['adresse'].to_numpy()
+        )
+        en_cours = geocoder.pending()
+        if en_cours:
+            st.session_state['_adresses_en_cours'] = en_cours
+            # Fragment relancé toutes les ADRESSES_POLL_S secondes (hors du reste de la page)
+            st.fragment(_suivi_adresses, run_every=ADRESSES_POLL_S)()
+
     # === SECTION 1 : FILTRES ===
     with st.expander("🔍 Filtres avancés", expanded=False):
         col1, col2, col3 = st.columns(3)
@@ -84,7 +127,7 @@ def render_comparables_table(
             )
 
     # === SECTION 2 : APPLICATION FILTRES ===
-    df_filtered = comparables_df.copy()
+    df_filtered = comparables_df
 
     # Appliquer filtres
     if 'score' in df_filtered.columns:
@@ -99,6 +142,10 @@ def render_comparables_table(
             (df_filtered['valeurfonc'] <= prix_max_filter)
         ]
 
+    # Copie unique après filtrage: les colonnes ajoutées ci-dessous ne modifient
+    # ni le DataFrame de l'appelant (session_state) ni une vue filtrée
+    df_filtered = df_filtered.copy()
+
     # === SECTION 3 : AFFICHAGE TABLEAU (DATA EDITOR) ===
     
     # Ajouter colonne de sélection par défaut True
@@ -190,7 +237,10 @@ def render_comparables_table(
     if 'libtypbien' in df_display.columns:
         col_config['libtypbien'] = st.column_config.TextColumn("Type", width="medium")
     if 'datemut' in df_display.columns:
-        col_config['datemut'] = st.column_config.TextColumn("Date vente", width="small")
+        if pd.api.types.is_datetime64_any_dtype(df_display['datemut']):
+            col_config['datemut'] = st.column_config.DateColumn("Date vente", format="DD/MM/YYYY", width="small")
+        else:
+            col_config['datemut'] = st.column_config.TextColumn("Date vente", width="small")
     if 'valeurfonc' in df_display.columns:
         col_config['valeurfonc'] = st.column_config.NumberColumn(
             "Prix vente",
@@ -345,17 +395,22 @@ def render_comparables_table(
     with col2:
         if st.button("🚀 Recalculer", use_container_width=True):
             if len(df_final_selection) > 0:
-                # Convertir filtrés en list de dicts pour estimation_callback
-                comparables_list = df_final_selection.to_dict('records')
-
-                # Appeler callback
+                # Positions des lignes retenues dans l'ensemble source
+                positions = comparables_df.index.get_indexer(df_final_selection.index)
+                if isinstance(comparables, ComparableSet):
+                    selection = comparables.take(positions)
+                else:
+                    selection = ComparableSet.from_dataframe(df_final_selection.drop(columns=['selection']))
+
+                # Appeler callback (selection_indices permet un recalcul incrémental)
                 estimation_callback(
                     latitude=bien_params['latitude'],
                     longitude=bien_params['longitude'],
                     surface=bien_params['surface'],
                     type_bien=bien_params['type_bien'],
-                    comparables=comparables_list,
-                    filtered=True
+                    comparables=selection,
+                    filtered=True,
+                    selection_indices=positions
                 )
                 st.rerun()
             else:
@@ -14,12 +14,27 @@ from reportlab.lib.units import inch, cm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib import colors
 from io import BytesIO
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
+import numpy as np
+
+from src.comparable_set import ComparableSet, format_date_fr
+
+
+def _top_comparables(comparables: Union[ComparableSet, pd.DataFrame], n: int = 5) -> pd.DataFrame:
+    """Top n comparables par score (ou par prix si pas de score)"""
+    if isinstance(comparables, ComparableSet):
+        key = 'score' if 'score' in comparables else 'valeurfonc'
+        order = np.argsort(-np.nan_to_num(comparables[key].astype(float), nan=-np.inf), kind='stable')
+        return comparables.take(order[:n]).to_dataframe()
+
+    if 'score' in comparables.columns:
+        return comparables.sort_values('score', ascending=False).head(n)
+    return comparables.sort_values('valeurfonc', ascending=False).head(n)
 
 
 def generate_pdf_report(
     estimation_result: Dict,
-    comparables_df: pd.DataFrame,
+    comparables_df: Union[ComparableSet, pd.DataFrame],
     bien_address: Optional[str] = None
 ) -> bytes:
     """
@@ -27,7 +42,7 @@ def generate_pdf_report(
 
     Args:
         estimation_result: Dict retourné par EstimationAlgorithm.estimate()
-        comparables_df: DataFrame des comparables
+        comparables_df: ComparableSet (ou DataFrame) des comparables
         bien_address: Adresse du bien (optionnel)
 
     Returns:
@@ -196,10 +211,7 @@ def generate_pdf_report(
         elements.append(Paragraph("TOP COMPARABLES", heading_style))
 
         # Top 5 par score (si existe) ou par prix
-        if 'score' in comparables_df.columns:
-            df_sorted = comparables_df.sort_values('score', ascending=False).head(5)
-        else:
-            df_sorted = comparables_df.sort_values('valeurfonc', ascending=False).head(5)
+        df_sorted = _top_comparables(comparables_df, 5)
 
         comp_data = [["Prix (€)", "Surface (m²)", "Distance (km)", "Score", "Date"]]
 
@@ -209,7 +221,7 @@ def generate_pdf_report(
                 f"{row.get('sbati', 0):.0f}",
                 f"{row.get('distance_km', 0):.1f}",
                 f"{row.get('score', 0):.0f}",
-                str(row.get('datemut', 'N/A'))[:10],
+                format_date_fr(row.get('datemut'))[:10],
             ])
 
         comp_table = Table(comp_data, colWidths=[1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch])
@@ -246,7 +258,7 @@ def generate_pdf_report(
 
 def render_pdf_export(
     estimation_result: Dict,
-    comparables_df: pd.DataFrame,
+    comparables_df: Union[ComparableSet, pd.DataFrame],
     bien_address: Optional[str] = None
 ) -> None:
     """
@@ -254,7 +266,7 @@ def render_pdf_export(
 
     Args:
         estimation_result: Dict estimation
-        comparables_df: DataFrame comparables
+        comparables_df: ComparableSet (ou DataFrame) comparables
         bien_address: Adresse bien (optionnel)
     """
 
@@ -2,12 +2,15 @@ import streamlit as st
 import pandas as pd
 import logging
 from src.supabase_data_retriever import SupabaseDataRetriever
+from src.local_dvf_store import LocalDvfStore
+from src.utils.config import Config
 from src.estimation_algorithm import EstimationAlgorithm
 from src.streamlit_components.form_input import render_form_input
 from src.streamlit_components.comparables_table import render_comparables_table
 from src.streamlit_components.map_viewer import render_map_viewer
 from src.streamlit_components.pdf_export import render_pdf_export
-from src.utils.finance import calculate_adjusted_price
+from src.utils.finance import calculate_adjusted_prices
+from src.comparable_set import ComparableSet
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -19,10 +22,14 @@ logger = logging.getLogger(__name__)
 @st.cache_resource(show_spinner=False)
 def init_supabase_retriever():
     """Initialiser connexion Supabase (cache)"""
+    if Config.DVF_BACKEND == "local":
+        store = LocalDvfStore()
+        if store.health_check():
+            return store
     try:
         retriever = SupabaseDataRetriever()
-        if retriever.test_connection():
-            return retriever
+        if retriever.health_check():
+            retriever.prewarm(2)
         return retriever
     except Exception as e:
         logger.error(f"[ERROR] Exception Supabase: {e}")
@@ -112,7 +119,8 @@ def render():
                             surface_max=bien_params['surface'] * (1 + surface_tolerance_pct / 100),
                             rayon_km=rayon_km,
                             annees=anciennete_max_ans,
-                            limit=100
+                            limit=100,
+                            as_set=True
                         )
                         st.session_state['comparables_df'] = comparables_df
                         st.session_state['last_dvf_params'] = current_params
@@ -124,19 +132,18 @@ def render():
                 if not comparables_df.empty:
                     with st.spinner("Calcul du scoring et de l'estimation..."):
                         try:
-                            comparables_list = comparables_df.to_dict('records')
                             estimation_result = estimator.estimate(
                                 target_latitude=bien_params['latitude'],
                                 target_longitude=bien_params['longitude'],
                                 target_surface=bien_params['surface'],
                                 target_type=bien_params['type_bien'],
-                                comparables=comparables_list
+                                comparables=comparables_df
                             )
                             st.session_state['estimation_result'] = estimation_result
                             
-                            # Mise à jour DF avec scores (CRITIQUE pour affichage colonne Score)
-                            if estimation_result.get('success') and estimation_result.get('comparables_with_scores'):
-                                st.session_state['comparables_df'] = pd.DataFrame(estimation_result['comparables_with_scores'])
+                            # Mise à jour avec scores (CRITIQUE pour affichage colonne Score)
+                            if estimation_result.get('success') and estimation_result.get('comparables_with_scores') is not None:
+                                st.session_state['comparables_df'] = estimation_result['comparables_with_scores']
                             
                         except Exception as e:
                             st.error(f"Erreur calcul estimation: {e}")
@@ -146,7 +153,7 @@ def render():
                     st.session_state['estimation_result'] = None
             
             # Récupérer le DF du state (soit frais, soit existant)
-            comparables_df = st.session_state.get('comparables_df', pd.DataFrame())
+            comparables_df = st.session_state.get('comparables_df', ComparableSet({}))
 
             # 3. Affichage Résultats
             if st.session_state.get('estimation_result') and st.session_state['estimation_result'].get('success'):
@@ -158,22 +165,27 @@ def render():
                     help="Ajuste les prix de vente historiques en fonction de l'évolution des taux d'emprunt (Source: Banque de France)"
                 )
 
-                # Préparation Dataframe Comparables
-                df_comparables = st.session_state['comparables_df'].copy()
+                # Préparation Comparables
+                df_comparables = ComparableSet.coerce(st.session_state['comparables_df'])
                 
-                # Calcul Prix Ajusté
+                # Calcul Prix Ajusté (vectorisé sur les colonnes)
                 if not df_comparables.empty:
-                    df_comparables['prix_ajuste'] = df_comparables.apply(
-                        lambda row: calculate_adjusted_price(
-                            row['valeurfonc'],
-                            pd.to_datetime(row['datemut'], dayfirst=True)
-                        ),
-                        axis=1
+                    df_comparables = df_comparables.with_columns(
+                        prix_ajuste=calculate_adjusted_prices(
+                            df_comparables['valeurfonc'],
+                            df_comparables['datemut']
+                        )
                     )
 
                 # Callback pour recalcul (si filtrage dans le tableau)
-                def recalculate_callback(latitude, longitude, surface, type_bien, comparables, filtered=False):
-                    new_est = estimator.estimate(latitude, longitude, surface, type_bien, comparables)
+                def recalculate_callback(latitude, longitude, surface, type_bien, comparables, filtered=False,
+                                         selection_indices=None):
+                    previous = st.session_state.get('estimation_result') or {}
+                    if selection_indices is not None and previous.get('incremental') is not None:
+                        # Scores déjà calculés : mise à jour incrémentale sur la sélection
+                        new_est = estimator.reestimate(previous, selection_indices)
+                    else:
+                        new_est = estimator.estimate(latitude, longitude, surface, type_bien, comparables)
                     st.session_state['estimation_result'] = new_est
                 
                 # Layout: Carte d'abord, puis Tableau
@@ -182,8 +194,8 @@ def render():
                 st.subheader("📍 Carte des Comparables")
                 
                 # Utiliser les comparables filtrés/scorés pour la carte si disponibles
-                if st.session_state.get('estimation_result') and st.session_state['estimation_result'].get('comparables_with_scores'):
-                    df_map = pd.DataFrame(st.session_state['estimation_result']['comparables_with_scores'])
+                if st.session_state.get('estimation_result') and st.session_state['estimation_result'].get('comparables_with_scores') is not None:
+                    df_map = st.session_state['estimation_result']['comparables_with_scores']
                 else:
                     df_map = df_comparables
 
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Géocodeur local BAN (Base Adresse Nationale) - département 74
+Index compact chargé en mémoire: libellés normalisés triés (recherche par préfixe)
+et tableaux de coordonnées. Sert les suggestions du formulaire sans appel réseau;
+GeocodingService ne passe par Google que si l'index ne trouve rien.
+
+Index construit par scripts/maintenance/build_ban_index.py depuis l'extrait CSV BAN.
+"""
+
+import bisect
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .config import Config
+from .geocoding_cache import normalize_address
+
+logger = logging.getLogger(__name__)
+
+# Colonnes utiles de l'extrait BAN (adresses-74.csv.gz, séparateur ";")
+COLONNES_BAN = ("id", "numero", "rep", "nom_voie", "code_postal", "nom_commune", "lon", "lat")
+
+_CODE_POSTAL_RE = re.compile(r"^\d{5}$")
+
+# Mots ignorés en fin de requête ("..., Haute-Savoie, France")
+_MOTS_IGNORES = ("france", "haute savoie")
+
+
+class PackedStrings(Sequence):
+    """
+    Chaînes UTF-8 stockées dans un seul tampon d'octets + offsets
+    (quelques dizaines d'octets par adresse au lieu d'un objet str chacune).
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+        self._bytes = blob.tobytes()
+
+    @classmethod
+    def from_strings(cls, strings: Sequence[str]) -> "PackedStrings":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(e) for e in encoded])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> bytes:
+        return self._bytes[self.offsets[index]:self.offsets[index + 1]]
+
+    def text(self, index: int) -> str:
+        return self[index].decode("utf-8")
+
+
+class BanGeocoder:
+    """
+    Recherche d'adresses par préfixe sur un index BAN local.
+
+    Trois niveaux d'entrées, toutes dans le même index trié:
+    - adresses: "12 avenue de geneve thonon les bains"
+    - voies (centroïde): "avenue de geneve thonon les bains"
+    - communes (centroïde): "thonon les bains"
+    """
+
+    def __init__(
+        self,
+        keys: PackedStrings,
+        labels: PackedStrings,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        postal_codes: np.ndarray,
+        ids: PackedStrings
+    ):
+        self.keys = keys
+        self.labels = labels
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.postal_codes = postal_codes
+        self.ids = ids
+
+    # ===================================
+    # CONSTRUCTION
+    # ===================================
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "BanGeocoder":
+        """Construit l'index depuis un DataFrame aux colonnes BAN (COLONNES_BAN)"""
+        df = df.dropna(subset=["nom_voie", "nom_commune", "lat", "lon"]).copy()
+        df["lat"] = df["lat"].astype(float)
+        df["lon"] = df["lon"].astype(float)
+        df["code_postal"] = df["code_postal"].fillna("").astype(str)
+        numero = df["numero"].fillna("").astype(str) + df["rep"].fillna("").astype(str)
+        commune_label = (df["code_postal"] + " " + df["nom_commune"]).str.strip()
+
+        adresses = pd.DataFrame({
+            "label": numero + " " + df["nom_voie"] + ", " + commune_label,
+            "key": numero + " " + df["nom_voie"] + " " + df["nom_commune"],
+            "lat": df["lat"], "lon": df["lon"],
+            "code_postal": df["code_postal"], "id": df["id"].fillna("").astype(str),
+        })
+
+        # Voies et communes: centroïde des adresses
+        voies = df.groupby(["nom_voie", "code_postal", "nom_commune"], as_index=False)[["lat", "lon"]].mean()
+        voies = pd.DataFrame({
+            "label": voies["nom_voie"] + ", " + (voies["code_postal"] + " " + voies["nom_commune"]).str.strip(),
+            "key": voies["nom_voie"] + " " + voies["nom_commune"],
+            "lat": voies["lat"], "lon": voies["lon"],
+            "code_postal": voies["code_postal"], "id": "",
+        })
+        communes = df.groupby(["code_postal", "nom_commune"], as_index=False)[["lat", "lon"]].mean()
+        communes = pd.DataFrame({
+            "label": (communes["code_postal"] + " " + communes["nom_commune"]).str.strip(),
+            "key": communes["nom_commune"],
+            "lat": communes["lat"], "lon": communes["lon"],
+            "code_postal": communes["code_postal"], "id": "",
+        })
+
+        entries = pd.concat([adresses, voies, communes], ignore_index=True)
+        entries["key"] = [normalize_address(key) for key in entries["key"]]
+        # Tri par octets: même ordre que bisect sur PackedStrings
+        entries = entries.iloc[np.argsort(entries["key"].str.encode("utf-8").to_numpy(), kind="stable")]
+
+        return cls(
+            keys=PackedStrings.from_strings(entries["key"].tolist()),
+            labels=PackedStrings.from_strings(entries["label"].tolist()),
+            latitudes=entries["lat"].to_numpy(dtype=np.float64),
+            longitudes=entries["lon"].to_numpy(dtype=np.float64),
+            postal_codes=pd.to_numeric(entries["code_postal"], errors="coerce").fillna(0).to_numpy(dtype=np.int32),
+            ids=PackedStrings.from_strings(entries["id"].tolist())
+        )
+
+    @classmethod
+    def from_csv(cls, path: str) -> "BanGeocoder":
+        """Construit l'index depuis un extrait CSV BAN (fichier local ou URL, .csv ou .csv.gz)"""
+        df = pd.read_csv(path, sep=";", dtype=str, usecols=list(COLONNES_BAN))
+        return cls.from_dataframe(df)
+
+    def save(self, path: str) -> None:
+        """Enregistre l'index (npz compressé)"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        arrays = {"latitudes": self.latitudes, "longitudes": self.longitudes, "postal_codes": self.postal_codes}
+        for name in ("keys", "labels", "ids"):
+            packed = getattr(self, name)
+            arrays[f"{name}_blob"] = packed.blob
+            arrays[f"{name}_offsets"] = packed.offsets
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "BanGeocoder":
+        """Charge un index enregistré par save()"""
+        with np.load(path) as data:
+            packed = {
+                name: PackedStrings(data[f"{name}_blob"], data[f"{name}_offsets"])
+                for name in ("keys", "labels", "ids")
+            }
+            return cls(
+                latitudes=data["latitudes"],
+                longitudes=data["longitudes"],
+                postal_codes=data["postal_codes"],
+                **packed
+            )
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # ===================================
+    # RECHERCHE
+    # ===================================
+
+    @staticmethod
+    def _parse_query(address: str):
+        """Requête normalisée → (préfixe, codes postaux cités)"""
+        texte = normalize_address(address)
+        for mot in _MOTS_IGNORES:
+            texte = re.sub(rf"\b{mot}\b", " ", texte)
+        # "3 bis" → "3bis" (forme des libellés BAN)
+        texte = re.sub(r"\b(\d+) (bis|ter|quater)\b", r"\1\2", texte)
+        mots = texte.split()
+        codes = [int(mot) for mot in mots if _CODE_POSTAL_RE.match(mot)]
+        prefixe = " ".join(mot for mot in mots if not _CODE_POSTAL_RE.match(mot))
+        return prefixe, codes
+
+    def search(self, address: str, limit: int = 5) -> List[Dict]:
+        """
+        Suggestions pour une adresse (même format que GeocodingService.geocode_address).
+        Libellé exact en premier, puis libellés commençant par la requête (ordre de l'index);
+        un code postal cité dans la requête filtre les résultats.
+        """
+        prefixe, codes = self._parse_query(address)
+        if not prefixe:
+            return []
+        debut = prefixe.encode("utf-8")
+        lo = bisect.bisect_left(self.keys, debut)
+        hi = bisect.bisect_left(self.keys, debut + b"\xff", lo)
+        if lo == hi:
+            return []
+
+        # Filtre code postal sur toute la plage (vectorisé) avant de borner le parcours
+        candidats = np.arange(lo, hi)
+        if codes:
+            candidats = candidats[np.isin(self.postal_codes[lo:hi], codes)]
+        # Borne de parcours (préfixes très courts: "1", "rue"...); les libellés exacts
+        # sont en tête de plage (ordre de l'index)
+        candidats = candidats[:limit * 50]
+        exacts = [i for i in candidats if self.keys[i] == debut]
+        ordre = exacts + [i for i in candidats if self.keys[i] != debut]
+
+        return [
+            {
+                "formatted_address": self.labels.text(i),
+                "latitude": float(self.latitudes[i]),
+                "longitude": float(self.longitudes[i]),
+                "place_id": f"ban:{self.ids.text(i)}" if len(self.ids[i]) else "",
+            }
+            for i in ordre[:limit]
+        ]
+
+
+# Instance globale (index chargé une fois par processus)
+_ban_geocoder: Optional[BanGeocoder] = None
+_ban_geocoder_loaded = False
+
+
+def get_ban_geocoder() -> Optional[BanGeocoder]:
+    """Retourne instance singleton BanGeocoder, ou None si l'index n'est pas construit"""
+    global _ban_geocoder, _ban_geocoder_loaded
+    if not _ban_geocoder_loaded:
+        _ban_geocoder_loaded = True
+        path = Config.BAN_INDEX_PATH
+        if os.path.exists(path):
+            try:
+                _ban_geocoder = BanGeocoder.load(path)
+                logger.info(f"[OK] Index BAN chargé: {len(_ban_geocoder)} entrées")
+            except Exception as e:
+                logger.error(f"[ERROR] Chargement index BAN {path}: {e}")
+        else:
+            logger.info(f"[INFO] Index BAN absent ({path}): géocodage Google uniquement")
+    return _ban_geocoder
@@ -25,8 +25,26 @@ class Config:
     # Google Maps
     GOOGLE_MAPS_API_KEY: str = os.getenv("GOOGLE_MAPS_API_KEY", "")
 
+    # Cache persistant des adresses (reverse geocoding des comparables)
+    ADDRESS_CACHE_PATH: str = os.getenv("ADDRESS_CACHE_PATH", ".cache/adresses.sqlite")
+
+    # Cache persistant du géocodage d'adresses (GeocodingService, src/geocoding.py)
+    GEOCODING_CACHE_PATH: str = os.getenv("GEOCODING_CACHE_PATH", ".cache/geocodage.sqlite")
+
+    # Index BAN local (géocodage hors ligne, voir scripts/maintenance/build_ban_index.py)
+    BAN_INDEX_PATH: str = os.getenv("BAN_INDEX_PATH", ".cache/ban_74.npz")
+
+    # Réplique locale DVF+ (LocalDvfStore): DVF_BACKEND=local pour l'utiliser dans l'app
+    DVF_BACKEND: str = os.getenv("DVF_BACKEND", "supabase")
+    LOCAL_DVF_PATH: str = os.getenv("LOCAL_DVF_PATH", ".cache/dvf_local.sqlite")
+
+    # Profils de scoring nommés (JSON, voir src/scoring_profiles.py), chargés au démarrage s'il existe
+    SCORING_PROFILES_PATH: str = os.getenv("SCORING_PROFILES_PATH", "config/scoring_profiles.json")
+
     # Perplexity API
     PERPLEXITY_API_KEY: str = os.getenv("PERPLEXITY_API_KEY", "")
+    # Durée de conservation des résultats d'une recherche Perplexity (secondes, 0 = pas de cache)
+    PERPLEXITY_CACHE_TTL: float = float(os.getenv("PERPLEXITY_CACHE_TTL", str(6 * 3600)))
 
     # Streamlit
     STREAMLIT_SERVER_PORT: int = int(os.getenv("STREAMLIT_SERVER_PORT", "8501"))
@@ -0,0 +1,55 @@
+"""
+DistanceKernel - Distances entre un point cible fixe et des tableaux de points GPS
+Les termes trigonométriques du point cible sont calculés une seule fois.
+"""
+
+import math
+from typing import Union
+
+import numpy as np
+
+RAYON_TERRE_KM = 6371
+
+ArrayLike = Union[float, np.ndarray]
+
+
+class DistanceKernel:
+    """
+    Noyau de distance lié à un point cible (lat, lon en degrés WGS84).
+
+    Modes:
+    - "haversine" : distance orthodromique exacte (sphère)
+    - "equirectangular" : projection plane locale, plus rapide; erreur relative
+      < 0.5% jusqu'à ~20 km en France métropolitaine (suffisant pour nos rayons)
+    """
+
+    MODES = ("haversine", "equirectangular")
+
+    def __init__(self, latitude: float, longitude: float, mode: str = "haversine"):
+        if mode not in self.MODES:
+            raise ValueError(f"Mode de distance inconnu: {mode} (attendu: {', '.join(self.MODES)})")
+        self.latitude = float(latitude)
+        self.longitude = float(longitude)
+        self.mode = mode
+
+        # Termes du point cible, calculés une fois
+        self._lat_rad = math.radians(self.latitude)
+        self._lon_rad = math.radians(self.longitude)
+        self._cos_lat = math.cos(self._lat_rad)
+
+    def distances(self, latitudes: ArrayLike, longitudes: ArrayLike) -> np.ndarray:
+        """Distances (km) du point cible vers chaque point, en un appel vectorisé"""
+        lat_rad = np.radians(np.asarray(latitudes, dtype=float))
+        delta_lat = lat_rad - self._lat_rad
+        delta_lon = np.radians(np.asarray(longitudes, dtype=float)) - self._lon_rad
+
+        if self.mode == "equirectangular":
+            x = delta_lon * self._cos_lat
+            return RAYON_TERRE_KM * np.sqrt(x * x + delta_lat * delta_lat)
+
+        a = np.sin(delta_lat / 2) ** 2 + self._cos_lat * np.cos(lat_rad) * np.sin(delta_lon / 2) ** 2
+        return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def distance(self, latitude: float, longitude: float) -> float:
+        """Distance (km) du point cible vers un seul point"""
+        return float(self.distances(latitude, longitude))
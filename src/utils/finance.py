@@ -1,4 +1,5 @@
 from datetime import datetime
+import numpy as np
 
 # Taux d'emprunt moyens historiques (approx. Banque de France)
 # Pour une implémentation réelle, ces données devraient venir d'une DB ou API
@@ -37,3 +38,23 @@ def calculate_adjusted_price(price: float, date_transaction: datetime) -> float:
     adjustment_coeff = 1 - (delta_rate * 0.10)
     
     return price * adjustment_coeff
+
+def calculate_adjusted_prices(prices: np.ndarray, dates: np.ndarray) -> np.ndarray:
+    """
+    Version vectorisée de calculate_adjusted_price (colonne de prix + colonne datetime64).
+    Les dates manquantes (NaT) donnent NaN.
+    """
+    dates = dates.astype("datetime64[ns]")
+    years = dates.astype("datetime64[Y]").astype(int) + 1970
+    known_years = np.array(sorted(HISTORICAL_RATES.keys()))
+    known_rates = np.array([HISTORICAL_RATES[year] for year in known_years])
+
+    positions = np.clip(np.searchsorted(known_years, years), 0, len(known_years) - 1)
+    historical_rates = np.where(
+        known_years[positions] == years,
+        known_rates[positions],
+        np.where(years < known_years[0], known_rates[0], CURRENT_RATE)
+    )
+
+    adjustment_coeff = 1 - ((CURRENT_RATE - historical_rates) * 0.10)
+    return np.where(np.isnat(dates), np.nan, prices * adjustment_coeff)
@@ -9,7 +9,9 @@ from typing import List, Dict, Optional, Tuple
 import googlemaps
 import logging
 
+from .ban_geocoder import BanGeocoder, get_ban_geocoder
 from .config import Config
+from .geocoding_cache import MISS, GeocodingCache, get_geocoding_cache
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +19,23 @@ logger = logging.getLogger(__name__)
 class GeocodingService:
     """Service de géocodage avec wrapper Google Maps"""
 
-    def __init__(self):
-        """Initialise le client Google Maps"""
+    def __init__(
+        self,
+        cache: Optional[GeocodingCache] = None,
+        local_geocoder: Optional[BanGeocoder] = None,
+        use_local: bool = True
+    ):
+        """
+        Initialise le client Google Maps
+
+        Args:
+            cache: Cache de géocodage (par défaut: cache partagé "google", voir geocoding_cache)
+            local_geocoder: Géocodeur local consulté avant Google (par défaut: index BAN
+                Config.BAN_INDEX_PATH s'il existe, voir ban_geocoder)
+            use_local: Si False, aucun géocodeur local
+        """
+        self.cache = cache or get_geocoding_cache("google")
+        self.local_geocoder = (local_geocoder or get_ban_geocoder()) if use_local else None
         if not Config.GOOGLE_MAPS_API_KEY:
             logger.error("[ERROR] GOOGLE_MAPS_API_KEY non configurée")
             self.client = None
@@ -29,6 +46,9 @@ class GeocodingService:
     def geocode_address(self, address: str) -> List[Dict]:
         """
         Géocode une adresse et retourne liste de suggestions.
+        L'index BAN local est consulté d'abord; Google seulement s'il ne trouve rien.
+        Les adresses déjà vues (clé normalisée) sont servies depuis le cache,
+        y compris les "non trouvé"; les erreurs API ne sont pas mises en cache.
 
         Args:
             address: Adresse à géocoder (ex: "Thonon-les-Bains, 74200")
@@ -40,31 +60,21 @@ class GeocodingService:
             - 'longitude': Longitude WGS84
             - 'place_id': Google Place ID
         """
+        if self.local_geocoder is not None:
+            suggestions = self.local_geocoder.search(address)
+            if suggestions:
+                return suggestions
+
+        suggestions = self.cache.get(address)
+        if suggestions is not MISS:
+            return [dict(suggestion) for suggestion in suggestions or []]
+
         if not self.client:
             logger.error("[ERROR] Client Google Maps non initialisé")
             return []
 
         try:
-            results = self.client.geocode(address=address)
-
-            if not results:
-                logger.warning(f"[WARNING] Aucun résultat pour: {address}")
-                return []
-
-            suggestions = []
-            for result in results:
-                location = result['geometry']['location']
-                suggestion = {
-                    'formatted_address': result['formatted_address'],
-                    'latitude': location['lat'],
-                    'longitude': location['lng'],
-                    'place_id': result.get('place_id', ''),
-                }
-                suggestions.append(suggestion)
-
-            logger.info(f"[OK] {len(suggestions)} suggestion(s) trouvee(s) pour: {address}")
-            return suggestions
-
+            suggestions = self._geocode_google(address)
         except googlemaps.exceptions.ApiError as e:
             logger.error(f"[ERROR] Erreur API Google Maps: {e}")
             return []
@@ -72,6 +82,31 @@ class GeocodingService:
             logger.error(f"[ERROR] Erreur geocodage: {e}")
             return []
 
+        self.cache.set(address, suggestions)
+        return [dict(suggestion) for suggestion in suggestions]
+
+    def _geocode_google(self, address: str) -> List[Dict]:
+        """Appel Google Maps Geocoding (lève une exception en cas d'erreur)"""
+        results = self.client.geocode(address=address)
+
+        if not results:
+            logger.warning(f"[WARNING] Aucun résultat pour: {address}")
+            return []
+
+        suggestions = []
+        for result in results:
+            location = result['geometry']['location']
+            suggestion = {
+                'formatted_address': result['formatted_address'],
+                'latitude': location['lat'],
+                'longitude': location['lng'],
+                'place_id': result.get('place_id', ''),
+            }
+            suggestions.append(suggestion)
+
+        logger.info(f"[OK] {len(suggestions)} suggestion(s) trouvee(s) pour: {address}")
+        return suggestions
+
     def get_coordinates(self, address: str) -> Optional[Tuple[float, float]]:
         """
         Retourne coordonnées (lat, lon) pour une adresse.
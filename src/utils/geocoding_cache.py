@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de géocodage à trois niveaux
+- clés normalisées (casse, accents, ponctuation, abréviations courantes)
+- LRU en mémoire du processus
+- stockage SQLite partagé sur disque (survit aux redémarrages, commun aux workers)
+Avec TTL, mise en cache des "non trouvé" (TTL plus court) et compteurs hits/misses.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Abréviations usuelles des voies et communes (après normalisation)
+_ABREVIATIONS = {
+    "av": "avenue",
+    "ave": "avenue",
+    "bd": "boulevard",
+    "bld": "boulevard",
+    "ch": "chemin",
+    "chem": "chemin",
+    "imp": "impasse",
+    "pl": "place",
+    "rte": "route",
+    "st": "saint",
+    "ste": "sainte",
+}
+
+_PONCTUATION_RE = re.compile(r"[^a-z0-9]+")
+
+# Absent du cache (distinct d'un "non trouvé" mis en cache, stocké comme None)
+MISS = object()
+
+
+def normalize_address(address: str) -> str:
+    """
+    Clé normalisée d'une adresse: minuscules, sans accents ni ponctuation,
+    abréviations développées ("12 Av. de Genève" → "12 avenue de geneve").
+    """
+    texte = unicodedata.normalize("NFKD", address or "")
+    texte = "".join(c for c in texte if not unicodedata.combining(c)).lower()
+    mots = _PONCTUATION_RE.sub(" ", texte).split()
+    return " ".join(_ABREVIATIONS.get(mot, mot) for mot in mots)
+
+
+class SqliteStore:
+    """
+    Base SQLite partagée par les caches persistants (une connexion par opération:
+    utilisable depuis plusieurs threads; ":memory:" garde une connexion unique).
+    """
+
+    def __init__(self, path: str, schema: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._memory_conn = None
+        if self.path == ":memory:":
+            self._memory_conn = sqlite3.connect(":memory:", check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._session() as conn:
+            conn.executescript(schema)
+
+    @contextmanager
+    def _session(self):
+        """Connexion SQLite dans une transaction (commit en sortie)"""
+        with self._lock:
+            conn = self._memory_conn or sqlite3.connect(self.path, timeout=10)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                if conn is not self._memory_conn:
+                    conn.close()
+
+
+class GeocodingCache(SqliteStore):
+    """
+    Cache de résultats de géocodage (valeurs sérialisables en JSON).
+
+    Lecture: LRU mémoire → SQLite (remonté dans le LRU) → MISS.
+    Un résultat vide (None, liste vide) est un "non trouvé": mis en cache avec negative_ttl.
+    Les clés sont préfixées par un espace de noms (un par fournisseur/format de résultat).
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: Optional[str] = None,
+        maxsize: int = 2048,
+        ttl: float = 90 * 86400,
+        negative_ttl: float = 86400
+    ):
+        """
+        Args:
+            namespace: Espace de noms des clés (ex: "google", "nominatim")
+            path: Fichier SQLite (par défaut: Config.GEOCODING_CACHE_PATH)
+            maxsize: Nombre maximal d'entrées du LRU mémoire
+            ttl: Durée de vie d'un résultat en secondes
+            negative_ttl: Durée de vie d'un "non trouvé" en secondes
+        """
+        super().__init__(
+            path or Config.GEOCODING_CACHE_PATH,
+            "CREATE TABLE IF NOT EXISTS geocodage ("
+            "cle TEXT PRIMARY KEY, valeur TEXT, expire_le REAL NOT NULL)"
+        )
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def key(self, address: str) -> str:
+        return f"{self.namespace}:{normalize_address(address)}"
+
+    def get(self, address: str) -> Any:
+        """Résultat en cache (None pour un "non trouvé") ou MISS"""
+        key = self.key(address)
+        now = time.time()
+
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                if not entry[0]:
+                    self.negative_hits += 1
+                return entry[0]
+
+        with self._session() as conn:
+            row = conn.execute(
+                "SELECT valeur, expire_le FROM geocodage WHERE cle = ? AND expire_le > ?", (key, now)
+            ).fetchone()
+
+        with self._memory_lock:
+            if row is None:
+                self._memory.pop(key, None)
+                self.misses += 1
+                return MISS
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            self.disk_hits += 1
+            if not value:
+                self.negative_hits += 1
+            return value
+
+    def set(self, address: str, value: Any) -> None:
+        """Enregistre un résultat (valeur vide = "non trouvé", TTL négatif)"""
+        key = self.key(address)
+        expires_at = time.time() + (self.ttl if value else self.negative_ttl)
+        with self._session() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocodage (cle, valeur, expire_le) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+        with self._memory_lock:
+            self._remember(key, value, expires_at)
+
+    def import_json(self, json_path: str) -> int:
+        """
+        Reprend un ancien cache JSON {adresse: résultat} sans écraser les entrées existantes.
+        Le fichier est ensuite renommé en <fichier>.migre: la reprise n'a lieu qu'une fois.
+
+        Returns:
+            Nombre d'adresses reprises (0 si le fichier n'existe pas)
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        imported = 0
+        for address, result in entries.items():
+            if self.get(address) is MISS:
+                self.set(address, result)
+                imported += 1
+        os.replace(json_path, f"{json_path}.migre")
+        logger.info(f"[OK] Cache JSON repris ({imported} adresses): {json_path}")
+        return imported
+
+    def get_or_compute(self, address: str, compute: Callable[[str], Any]) -> Any:
+        """
+        Résultat en cache ou calculé par compute(address) puis mis en cache.
+        Une exception de compute (réseau, quota...) n'est pas mise en cache.
+        """
+        value = self.get(address)
+        if value is MISS:
+            value = compute(address)
+            self.set(address, value)
+        return value
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        """Supprime les entrées expirées du fichier (retourne le nombre supprimé)"""
+        with self._session() as conn:
+            return conn.execute("DELETE FROM geocodage WHERE expire_le <= ?", (time.time(),)).rowcount
+
+    def clear_memory(self) -> None:
+        with self._memory_lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict:
+        """Compteurs d'utilisation"""
+        with self._memory_lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0
+            }
+
+
+# Instances globales (une par espace de noms, partagées par le processus)
+_geocoding_caches: Dict[str, GeocodingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_geocoding_cache(namespace: str) -> GeocodingCache:
+    """Retourne instance singleton GeocodingCache pour un espace de noms"""
+    with _caches_lock:
+        if namespace not in _geocoding_caches:
+            _geocoding_caches[namespace] = GeocodingCache(namespace)
+        return _geocoding_caches[namespace]
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Référentiel des communes (insee_mapping.csv): code INSEE, commune, code postal
+"""
+
+import os
+
+import pandas as pd
+
+INSEE_MAPPING_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "insee_mapping.csv"
+)
+
+
+def load_insee_mapping(path: str = INSEE_MAPPING_PATH) -> pd.DataFrame:
+    """Table code INSEE / commune / code postal (codes en texte)"""
+    return pd.read_csv(path, dtype=str)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Limiteur de débit (token bucket) pour les API externes
+Partageable entre boucles asyncio et threads (sessions Streamlit); une réponse 429
+suspend toutes les requêtes pendant la durée indiquée par Retry-After.
+"""
+
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """
+    Délai d'un en-tête Retry-After en secondes (nombre de secondes ou date HTTP).
+
+    Returns:
+        Délai (>= 0) ou None si l'en-tête est absent ou illisible
+    """
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket: `rate` requêtes par seconde en régime établi, rafales de `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Args:
+            rate: Jetons ajoutés par seconde
+            capacity: Nombre maximal de jetons (taille des rafales)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _try_acquire(self) -> float:
+        """Prend un jeton si possible (retourne 0), sinon le délai d'attente en secondes"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """Attend un jeton (sans bloquer la boucle asyncio)"""
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Suspend toutes les requêtes pendant `seconds` (Retry-After d'une réponse 429)"""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            # Reprise en douceur: pas de rafale à la fin de la pause
+            self._tokens = 0.0
+            self._updated_at = self._paused_until
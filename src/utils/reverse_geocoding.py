@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reverse geocoding des comparables - Cache persistant + résolution asynchrone
+Les adresses DVF ne changent pas: elles sont stockées dans un cache SQLite
+(clé idmutation et coordonnées arrondies). Les lignes absentes du cache reçoivent
+une adresse provisoire "(lat, lon)" et sont résolues en arrière-plan.
+Les échecs sont mémorisés pour une durée courte (pas de nouvel appel à chaque recherche).
+"""
+
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import Config
+from .geocoding_cache import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+# Précision des clés coordonnées (5 décimales ≈ 1 m)
+DECIMALES_CLE = 5
+
+_PROVISOIRE_RE = re.compile(r"^\(-?\d+\.\d+, -?\d+\.\d+\)$")
+
+
+def placeholder_address(latitude: float, longitude: float) -> str:
+    """Adresse provisoire affichée tant que le reverse geocoding n'a pas abouti"""
+    return f"({latitude:.4f}, {longitude:.4f})"
+
+
+def is_placeholder(address) -> bool:
+    """True si l'adresse est une adresse provisoire (coordonnées)"""
+    return not isinstance(address, str) or bool(_PROVISOIRE_RE.match(address))
+
+
+def cache_keys(idmutation, latitude: float, longitude: float) -> Tuple[Optional[str], str]:
+    """Clés de cache d'une mutation: (clé idmutation ou None, clé coordonnées arrondies)"""
+    manquant = idmutation is None or (isinstance(idmutation, float) and np.isnan(idmutation))
+    cle_id = None if manquant else f"mut:{idmutation}"
+    cle_gps = f"gps:{latitude:.{DECIMALES_CLE}f},{longitude:.{DECIMALES_CLE}f}"
+    return cle_id, cle_gps
+
+
+class AddressCache(SqliteStore):
+    """
+    Cache d'adresses persistant (SQLite, une connexion par opération: utilisable
+    depuis plusieurs threads), avec les échecs récents (coordonnées sans adresse).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(
+            path or Config.ADDRESS_CACHE_PATH,
+            "CREATE TABLE IF NOT EXISTS adresses (cle TEXT PRIMARY KEY, adresse TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS echecs (cle TEXT PRIMARY KEY, expire_le REAL NOT NULL)"
+        )
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Adresses connues pour les clés données (clés absentes omises)"""
+        keys = list(dict.fromkeys(key for key in keys if key))
+        found = {}
+        # Requêtes par paquets (limite de variables SQLite)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._session() as conn:
+                rows = conn.execute(
+                    f"SELECT cle, adresse FROM adresses WHERE cle IN ({placeholders})", chunk
+                ).fetchall()
+            found.update(rows)
+        return found
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        """Enregistre (ou remplace) des adresses"""
+        if not items:
+            return
+        with self._session() as conn:
+            conn.executemany("INSERT OR REPLACE INTO adresses (cle, adresse) VALUES (?, ?)", items.items())
+
+    def recent_failures(self, keys: Iterable[str]) -> set:
+        """Clés dont le dernier reverse geocoding a échoué et n'a pas expiré"""
+        keys = list(dict.fromkeys(key for key in keys if key))
+        now = time.time()
+        failed = set()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._session() as conn:
+                rows = conn.execute(
+                    f"SELECT cle FROM echecs WHERE cle IN ({placeholders}) AND expire_le > ?", (*chunk, now)
+                ).fetchall()
+            failed.update(row[0] for row in rows)
+        return failed
+
+    def set_failed(self, key: str, ttl: float) -> None:
+        """Mémorise un échec pendant ttl secondes"""
+        with self._session() as conn:
+            conn.execute("INSERT OR REPLACE INTO echecs (cle, expire_le) VALUES (?, ?)", (key, time.time() + ttl))
+
+
+class ReverseGeocoder:
+    """
+    Reverse geocoding par lots: lecture du cache, adresses provisoires pour les
+    lignes manquantes, résolution en arrière-plan. Un pool de max_concurrency threads
+    partagé par tous les lots borne le nombre de requêtes Google simultanées.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[AddressCache] = None,
+        max_concurrency: int = 8,
+        geocode_fn: Optional[Callable[[float, float], Optional[str]]] = None,
+        negative_ttl: float = 900
+    ):
+        """
+        Args:
+            cache: Cache persistant (par défaut: SQLite Config.ADDRESS_CACHE_PATH)
+            max_concurrency: Nombre maximal de requêtes Google simultanées (tous lots confondus)
+            geocode_fn: Fonction (lat, lon) -> adresse (par défaut: reverse_geocode Google Maps)
+            negative_ttl: Durée en secondes pendant laquelle un échec n'est pas redemandé
+        """
+        self.cache = cache or AddressCache()
+        self.max_concurrency = max_concurrency
+        self.negative_ttl = negative_ttl
+        self._geocode_fn = geocode_fn
+        # Une requête par tâche, hors du rendu Streamlit
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="reverse-geocoding")
+        # Coordonnées en cours de résolution: clé coordonnées -> Future de la requête
+        self._en_cours: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def geocode_fn(self) -> Callable[[float, float], Optional[str]]:
+        if self._geocode_fn is None:
+            from .geocoding import reverse_geocode
+            self._geocode_fn = reverse_geocode
+        return self._geocode_fn
+
+    def lookup(
+        self,
+        idmutations: Optional[Sequence],
+        latitudes: Sequence[float],
+        longitudes: Sequence[float]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Adresses depuis le cache (une requête SQLite par lot).
+
+        Returns:
+            (adresses: tableau objet avec adresses provisoires pour les absentes,
+             positions des lignes absentes du cache)
+        """
+        n = len(latitudes)
+        if idmutations is None:
+            idmutations = [None] * n
+        keys = [cache_keys(i, lat, lon) for i, lat, lon in zip(idmutations, latitudes, longitudes)]
+        known = self.cache.get_many(key for pair in keys for key in pair)
+
+        adresses = np.empty(n, dtype=object)
+        manquantes = []
+        for position, ((cle_id, cle_gps), lat, lon) in enumerate(zip(keys, latitudes, longitudes)):
+            adresse = known.get(cle_id) or known.get(cle_gps)
+            if adresse is None:
+                adresse = placeholder_address(lat, lon)
+                manquantes.append(position)
+            adresses[position] = adresse
+        return adresses, np.asarray(manquantes, dtype=int)
+
+    def resolve_one(self, cle_id: Optional[str], cle_gps: str, lat: float, lon: float) -> Optional[str]:
+        """
+        Résout une adresse et l'enregistre dans le cache (échec: mémorisé negative_ttl secondes).
+
+        Returns:
+            Adresse obtenue ou None
+        """
+        try:
+            adresse = self.geocode_fn(lat, lon)
+        except Exception as e:
+            logger.error(f"[ERROR] Reverse geocoding ({lat}, {lon}): {e}")
+            adresse = None
+        if adresse:
+            self.cache.set_many({key: adresse for key in (cle_id, cle_gps) if key})
+        elif self.negative_ttl > 0:
+            self.cache.set_failed(cle_gps, self.negative_ttl)
+        return adresse
+
+    def submit(
+        self,
+        idmutations: Optional[Sequence],
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        on_result: Optional[Callable[[str, str], None]] = None
+    ) -> Future:
+        """
+        Lance la résolution en arrière-plan (retour immédiat).
+        Les coordonnées déjà en cours de résolution (voir wait() pour attendre aussi
+        celles-ci) ou en échec récent ne sont pas redemandées.
+
+        Args:
+            on_result: Rappel (clé coordonnées, adresse) à chaque adresse obtenue
+
+        Returns:
+            Future du lot: dict clé coordonnées -> adresse (adresses obtenues uniquement)
+        """
+        if idmutations is None:
+            idmutations = [None] * len(latitudes)
+        keys = [cache_keys(i, lat, lon) for i, lat, lon in zip(idmutations, latitudes, longitudes)]
+        echecs = self.cache.recent_failures(cle_gps for _, cle_gps in keys)
+
+        lot: Future = Future()
+        resolved: Dict[str, str] = {}
+        taches = []
+        with self._lock:
+            for (cle_id, cle_gps), lat, lon in zip(keys, latitudes, longitudes):
+                if cle_gps in self._en_cours or cle_gps in echecs:
+                    continue
+                tache = self._executor.submit(self.resolve_one, cle_id, cle_gps, float(lat), float(lon))
+                self._en_cours[cle_gps] = tache
+                taches.append((cle_gps, tache))
+
+        if not taches:
+            lot.set_result({})
+            return lot
+
+        restantes = [len(taches)]
+
+        def termine(cle_gps: str, tache: Future) -> None:
+            adresse = tache.result()
+            if adresse and on_result is not None:
+                on_result(cle_gps, adresse)
+            with self._lock:
+                if adresse:
+                    resolved[cle_gps] = adresse
+                if self._en_cours.get(cle_gps) is tache:
+                    del self._en_cours[cle_gps]
+                restantes[0] -= 1
+                fini = restantes[0] == 0
+            if fini:
+                lot.set_result(resolved)
+
+        # Rappels ajoutés hors du verrou (exécutés tout de suite si la tâche est déjà finie)
+        for cle_gps, tache in taches:
+            tache.add_done_callback(lambda tache, cle_gps=cle_gps: termine(cle_gps, tache))
+        return lot
+
+    def wait(self, latitudes: Sequence[float], longitudes: Sequence[float], timeout: Optional[float] = None) -> None:
+        """Attend la fin de la résolution en cours de ces coordonnées (quel que soit le lot)"""
+        with self._lock:
+            futures = {
+                self._en_cours[cle_gps]
+                for cle_gps in (cache_keys(None, lat, lon)[1] for lat, lon in zip(latitudes, longitudes))
+                if cle_gps in self._en_cours
+            }
+        wait_futures(futures, timeout=timeout)
+
+    def pending(self) -> int:
+        """Nombre d'adresses en cours de résolution"""
+        with self._lock:
+            return len(self._en_cours)
+
+    def refresh(self, idmutations: Optional[Sequence], latitudes, longitudes, adresses: Sequence) -> np.ndarray:
+        """Remplace les adresses provisoires par celles arrivées depuis dans le cache"""
+        adresses = np.array(adresses, dtype=object)
+        provisoires = np.flatnonzero([is_placeholder(adresse) for adresse in adresses])
+        if len(provisoires) == 0:
+            return adresses
+        ids = None if idmutations is None else [idmutations[i] for i in provisoires]
+        nouvelles, _ = self.lookup(ids, [latitudes[i] for i in provisoires], [longitudes[i] for i in provisoires])
+        adresses[provisoires] = nouvelles
+        return adresses
+
+
+# Instance globale (cache partagé par le processus)
+_reverse_geocoder: Optional[ReverseGeocoder] = None
+
+
+def get_reverse_geocoder() -> ReverseGeocoder:
+    """Retourne instance singleton ReverseGeocoder"""
+    global _reverse_geocoder
+    if _reverse_geocoder is None:
+        _reverse_geocoder = ReverseGeocoder()
+    return _reverse_geocoder
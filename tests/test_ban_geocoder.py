@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests du géocodeur local BAN (index par préfixe, repli Google)
+"""
+
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from src.utils.ban_geocoder import BanGeocoder
+from src.utils.geocoding import GeocodingService
+from src.utils.geocoding_cache import GeocodingCache
+
+
+def make_ban():
+    """Extrait BAN minimal (colonnes COLONNES_BAN)"""
+    rows = [
+        ("74281_0100_00012", "12", None, "Avenue de Genève", "74200", "Thonon-les-Bains", "6.4800", "46.3750"),
+        ("74281_0100_00014", "14", None, "Avenue de Genève", "74200", "Thonon-les-Bains", "6.4810", "46.3760"),
+        ("74281_0200_00003", "3", "bis", "Rue Saint-Sébastien", "74200", "Thonon-les-Bains", "6.4790", "46.3710"),
+        ("74012_0100_00012", "12", None, "Avenue de Genève", "74100", "Annemasse", "6.2400", "46.1940"),
+        ("74119_0300_00001", "1", None, "Place Charles de Gaulle", "74500", "Évian-les-Bains", "6.5900", "46.4010"),
+    ]
+    return pd.DataFrame(rows, columns=["id", "numero", "rep", "nom_voie", "code_postal", "nom_commune", "lon", "lat"])
+
+
+class FailingClient:
+    def __init__(self):
+        self.calls = []
+
+    def geocode(self, address):
+        self.calls.append(address)
+        return []
+
+
+class TestBanGeocoder(unittest.TestCase):
+
+    def setUp(self):
+        self.geocoder = BanGeocoder.from_dataframe(make_ban())
+
+    def test_full_address(self):
+        suggestions = self.geocoder.search("12 av. de Genève, 74200 Thonon-les-Bains, France")
+        self.assertEqual(suggestions[0]["formatted_address"], "12 Avenue de Genève, 74200 Thonon-les-Bains")
+        self.assertAlmostEqual(suggestions[0]["latitude"], 46.375)
+        self.assertEqual(suggestions[0]["place_id"], "ban:74281_0100_00012")
+
+    def test_prefix_and_postal_code_filter(self):
+        both = self.geocoder.search("12 avenue de geneve")
+        self.assertEqual(len(both), 2)
+        annemasse = self.geocoder.search("12 avenue de geneve 74100")
+        self.assertEqual([s["formatted_address"] for s in annemasse], ["12 Avenue de Genève, 74100 Annemasse"])
+
+    def test_postal_code_filter_beyond_scan_bound(self):
+        # 300 voies "rue ..." à Thonon triées avant l'unique "rue ..." d'Évian
+        rows = [
+            (f"74281_{i:04d}_00001", "1", None, f"Rue A{i:03d}", "74200", "Thonon-les-Bains", "6.48", "46.37")
+            for i in range(300)
+        ]
+        rows.append(("74119_0400_00001", "1", None, "Rue Z", "74500", "Évian-les-Bains", "6.59", "46.40"))
+        geocoder = BanGeocoder.from_dataframe(pd.DataFrame(rows, columns=make_ban().columns))
+        evian = geocoder.search("rue 74500", limit=5)
+        self.assertEqual([s["formatted_address"] for s in evian], ["Rue Z, 74500 Évian-les-Bains"])
+
+    def test_street_and_commune_centroids(self):
+        rue = self.geocoder.search("3 bis rue st sebastien")
+        self.assertEqual(rue[0]["formatted_address"], "3bis Rue Saint-Sébastien, 74200 Thonon-les-Bains")
+        voie = self.geocoder.search("avenue de geneve thonon")
+        self.assertAlmostEqual(voie[0]["latitude"], 46.3755)
+        commune = self.geocoder.search("Evian les Bains, 74500")
+        self.assertEqual(commune[0]["formatted_address"], "74500 Évian-les-Bains")
+        self.assertEqual(self.geocoder.search("Paris"), [])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "ban.npz")
+            self.geocoder.save(path)
+            loaded = BanGeocoder.load(path)
+        self.assertEqual(len(loaded), len(self.geocoder))
+        self.assertEqual(loaded.search("1 place charles de gaulle"), self.geocoder.search("1 place charles de gaulle"))
+
+    def test_geocoding_service_falls_back_to_google_on_miss(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = GeocodingCache("google", path=os.path.join(tmpdir, "geocodage.sqlite"))
+            service = GeocodingService(cache=cache, local_geocoder=self.geocoder)
+            service.client = FailingClient()
+            self.assertEqual(len(service.geocode_address("14 avenue de Genève Thonon")), 1)
+            self.assertEqual(service.client.calls, [])
+            self.assertEqual(service.geocode_address("10 rue de Rivoli, Paris"), [])
+            self.assertEqual(service.client.calls, ["10 rue de Rivoli, Paris"])
+
+
+if __name__ == '__main__':
+    unittest.main()
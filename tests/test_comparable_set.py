@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test suite for ComparableSet (columnar comparables)
+"""
+
+import unittest
+import warnings
+import numpy as np
+import pandas as pd
+
+from src.comparable_set import ComparableSet, format_date_fr, parse_dates
+from src.estimation_algorithm import EstimationAlgorithm
+
+
+class TestComparableSet(unittest.TestCase):
+    """Test construction, typing and row/column operations"""
+
+    def setUp(self):
+        self.records = [
+            {'idmutation': 1, 'datemut': '15/03/2024', 'valeurfonc': '280000',
+             'sbati': 95, 'libtypbien': 'UN APPARTEMENT', 'latitude': 46.38, 'longitude': 6.48},
+            {'idmutation': 2, 'datemut': '2023-11-02', 'valeurfonc': 310000,
+             'sbati': None, 'libtypbien': 'UNE MAISON', 'latitude': 46.39, 'longitude': 6.49},
+            {'idmutation': 3, 'datemut': 'inconnue', 'valeurfonc': None,
+             'sbati': 102, 'libtypbien': None, 'latitude': 46.37, 'longitude': 6.47},
+        ]
+        self.comparables = ComparableSet.from_records(self.records)
+
+    def test_typed_columns(self):
+        """Core columns are converted once to typed arrays"""
+        self.assertEqual(len(self.comparables), 3)
+        self.assertEqual(self.comparables['valeurfonc'].dtype, np.float64)
+        self.assertTrue(np.isnan(self.comparables['valeurfonc'][2]))
+        self.assertTrue(np.isnan(self.comparables['sbati'][1]))
+        self.assertEqual(self.comparables['datemut'].dtype, np.dtype('datetime64[ns]'))
+        self.assertTrue(pd.isna(self.comparables['datemut'][2]))
+        self.assertEqual(list(self.comparables['libtypbien']), ['UN APPARTEMENT', 'UNE MAISON', None])
+
+    def test_take_and_with_columns(self):
+        """Row selection and column addition keep order and share arrays"""
+        scored = self.comparables.with_columns(score=[10.0, 20.0, 30.0])
+        self.assertIs(scored['latitude'], self.comparables['latitude'])
+
+        subset = scored.take([2, 0])
+        self.assertEqual(list(subset['idmutation']), [3, 1])
+        self.assertEqual(list(subset['score']), [30.0, 10.0])
+        self.assertEqual(list(subset['libtypbien']), [None, 'UN APPARTEMENT'])
+
+        df = subset.to_dataframe()
+        self.assertEqual(list(df.columns)[:len(self.records[0])], list(self.records[0].keys()))
+
+    def test_format_date_fr(self):
+        """Dates are formatted for display only"""
+        self.assertEqual(format_date_fr(self.comparables['datemut'][0]), '15/03/2024')
+        self.assertEqual(format_date_fr(self.comparables['datemut'][2]), 'N/A')
+
+    def test_parse_dates_iso_and_french(self):
+        """ISO dates are parsed as ISO 8601 without warnings, others day-first"""
+        values = pd.Series(['2024-03-04', '04/03/2024', '2024-03-04 10:30:00', None], index=[5, 6, 7, 8])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            parsed = parse_dates(values)
+        self.assertEqual(list(parsed.index), [5, 6, 7, 8])
+        self.assertEqual(parsed[5], pd.Timestamp('2024-03-04'))
+        self.assertEqual(parsed[6], pd.Timestamp('2024-03-04'))
+        self.assertEqual(parsed[7], pd.Timestamp('2024-03-04 10:30:00'))
+        self.assertTrue(pd.isna(parsed[8]))
+
+    def test_estimate_returns_scored_set(self):
+        """Estimation keeps the columnar form and adds scores"""
+        result = EstimationAlgorithm().estimate(46.38, 6.48, 100, 'Appartement', self.comparables)
+        self.assertTrue(result['success'])
+        scored = result['comparables_with_scores']
+        self.assertIsInstance(scored, ComparableSet)
+        self.assertEqual(len(scored['score']), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
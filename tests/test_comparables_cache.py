@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests du cache de comparables (clé normalisée, TTL, LRU, service depuis un sur-ensemble)
+"""
+
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.comparables_cache import ComparablesCache
+from src.utils.distance import DistanceKernel
+
+CENTER = (46.3787, 6.4812)
+
+
+def make_comparables(n=40, seed=0):
+    """Comparables répartis dans ~10 km autour du centre, triés par distance"""
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp.today().normalize()
+    df = pd.DataFrame({
+        "idmutation": [f"M{i}" for i in range(n)],
+        "latitude": CENTER[0] + rng.uniform(-0.08, 0.08, n),
+        "longitude": CENTER[1] + rng.uniform(-0.11, 0.11, n),
+        "sbati": rng.uniform(40, 160, n),
+        "valeurfonc": rng.uniform(150000, 600000, n),
+        "datemut": today - pd.to_timedelta(rng.integers(0, 3 * 365, n), unit="D"),
+    })
+    df["distance_km"] = DistanceKernel(*CENTER).distances(df["latitude"], df["longitude"])
+    return df.sort_values("distance_km").reset_index(drop=True)
+
+
+def search(lat=CENTER[0], lon=CENTER[1], type_bien="Appartement", smin=40, smax=160, rayon=10.0, annees=3,
+           limit=100, ordre="hybride"):
+    return (lat, lon, type_bien, smin, smax, rayon, annees, limit, ordre)
+
+
+class TestComparablesCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ComparablesCache(maxsize=4, ttl=60)
+        full = make_comparables()
+        self.wide = full[full["distance_km"] <= 10.0].reset_index(drop=True)
+
+    def test_exact_hit_and_miss(self):
+        self.assertIsNone(self.cache.get(*search()))
+        self.cache.put(*search(), self.wide)
+        result = self.cache.get(*search())
+        self.assertEqual(list(result["idmutation"]), list(self.wide["idmutation"]))
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+        # Copie: modifier le résultat ne touche pas le cache
+        result["adresse"] = "x"
+        self.assertNotIn("adresse", self.cache.get(*search()).columns)
+
+    def test_narrower_search_served_from_complete_superset(self):
+        self.cache.put(*search(), self.wide)
+        narrower = self.cache.get(*search(smin=60, smax=120, rayon=5.0, annees=2))
+        self.assertIsNotNone(narrower)
+        self.assertEqual(self.cache.stats()["superset_hits"], 1)
+
+        expected = self.wide[
+            (self.wide["distance_km"] <= 5.0) &
+            (self.wide["sbati"] >= 60) & (self.wide["sbati"] <= 120) &
+            (self.wide["datemut"] >= pd.Timestamp.today().normalize() - pd.Timedelta(days=730))
+        ]
+        self.assertEqual(sorted(narrower["idmutation"]), sorted(expected["idmutation"]))
+        self.assertTrue((np.diff(narrower["distance_km"]) >= 0).all())
+
+    def test_shifted_center_requires_geometric_coverage(self):
+        self.cache.put(*search(), self.wide)
+        # ~1.1 km au nord: disque de 5 km inclus, disque de 9.5 km non inclus
+        shifted = CENTER[0] + 0.01
+        served = self.cache.get(*search(lat=shifted, rayon=5.0))
+        self.assertIsNotNone(served)
+        self.assertTrue((served["distance_km"] <= 5.0).all())
+        self.assertIsNone(self.cache.get(*search(lat=shifted, rayon=9.5)))
+
+    def test_truncated_result_is_not_a_superset(self):
+        truncated = self.wide.head(10)
+        self.cache.put(*search(limit=10), truncated)
+        self.assertIsNone(self.cache.get(*search(rayon=5.0)))
+        # Même recherche avec un LIMIT plus petit: servie
+        self.assertEqual(len(self.cache.get(*search(limit=5))), 5)
+
+    def test_ttl_expiry(self):
+        cache = ComparablesCache(ttl=0.01)
+        cache.put(*search(), self.wide)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get(*search()))
+
+    def test_lru_eviction(self):
+        for i in range(5):
+            self.cache.put(*search(lat=45.0 + i), self.wide)
+        self.assertEqual(self.cache.stats()["entries"], 4)
+        self.assertIsNone(self.cache.get(*search(lat=45.0)))
+        self.assertIsNotNone(self.cache.get(*search(lat=49.0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,7 +10,12 @@ from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 
-from src.estimation_algorithm import SimilarityScorer, EstimationAlgorithm
+from src.comparable_set import ComparableSet
+from src.utils.distance import DistanceKernel
+from src.estimation_algorithm import (
+    SimilarityScorer, EstimationAlgorithm, EstimationEngine, TemporalAdjuster, compute_comparable_stats
+)
+from src.scoring_profiles import ScoringProfile
 
 
 class TestSimilarityScorer(unittest.TestCase):
@@ -66,6 +71,24 @@ class TestSimilarityScorer(unittest.TestCase):
         self.assertGreater(distance, 0)
         self.assertLess(distance, 1)
 
+    def test_distance_kernel_modes(self):
+        """Kernel matches scalar Haversine; equirectangular stays within 0.5% under 20 km"""
+        kernel = DistanceKernel(46.3787, 6.4812)
+        latitudes = np.array([46.3800, 46.2000, 46.5000, 46.3787])
+        longitudes = np.array([6.4800, 6.3000, 6.7000, 6.4812])
+
+        exact = kernel.distances(latitudes, longitudes)
+        scalar = [SimilarityScorer.haversine_distance(46.3787, 6.4812, lat, lon)
+                  for lat, lon in zip(latitudes, longitudes)]
+        np.testing.assert_allclose(exact, scalar, atol=1e-9)
+
+        fast = DistanceKernel(46.3787, 6.4812, mode="equirectangular").distances(latitudes, longitudes)
+        np.testing.assert_allclose(fast[:3], exact[:3], rtol=5e-3)
+        self.assertEqual(fast[3], 0)
+
+        with self.assertRaises(ValueError):
+            DistanceKernel(0, 0, mode="manhattan")
+
     def test_score_anciennete(self):
         """Test age/recency scoring"""
         today = datetime.now()
@@ -80,6 +103,127 @@ class TestSimilarityScorer(unittest.TestCase):
         score_very_old = SimilarityScorer.score_anciennete(date_very_old)
         self.assertEqual(score_very_old, 0)
 
+    def test_score_batch_matches_scalar_scores(self):
+        """Test vectorized scoring gives the same scores as per-row scoring"""
+        today = datetime.now()
+        comparables = [
+            {'latitude': 46.3800, 'longitude': 6.4850, 'sbati': 100,
+             'libtypbien': 'UN APPARTEMENT', 'datemut': today - timedelta(days=90)},
+            {'latitude': 46.4200, 'longitude': 6.5500, 'sbati': 112,
+             'libtypbien': 'UNE MAISON', 'datemut': (today - timedelta(days=500)).strftime('%d/%m/%Y')},
+            {'latitude': 46.3700, 'longitude': 6.4700, 'sbati': 150,
+             'libtypbien': 'APPARTEMENT INDETERMINE', 'datemut': today - timedelta(days=1000)},
+            {'latitude': 46.3790, 'longitude': 6.4815, 'sbati': 95,
+             'libtypbien': None, 'datemut': 'pas une date'},
+        ]
+
+        batch = SimilarityScorer.score_batch(46.3787, 6.4812, 100, "Appartement", pd.DataFrame(comparables))
+        scalar = [
+            SimilarityScorer.calculate_comparable_score(46.3787, 6.4812, 100, "Appartement", c)
+            for c in comparables
+        ]
+
+        self.assertEqual(len(batch), len(comparables))
+        np.testing.assert_allclose(batch, scalar, atol=1e-6)
+
+    def test_reference_date_fixes_recency(self):
+        """Recency is computed against the given reference date"""
+        dates = pd.DataFrame({
+            'latitude': [0.0, 0.0], 'longitude': [0.0, 0.0], 'sbati': [100, 100],
+            'datemut': pd.to_datetime(['2022-01-15', '2023-06-01'])
+        })
+        scores_2022 = SimilarityScorer.score_batch(0, 0, 100, "Appartement", dates, datetime(2022, 6, 1))
+        scores_2026 = SimilarityScorer.score_batch(0, 0, 100, "Appartement", dates, datetime(2026, 6, 1))
+
+        # Only the recency weight differs (100 vs 0)
+        np.testing.assert_allclose(scores_2022 - scores_2026, [25.0, 25.0])
+        self.assertEqual(SimilarityScorer.score_anciennete(np.datetime64('2022-01-15'), datetime(2022, 6, 1)), 100)
+
+    def test_adjust_prix_array_matches_scalar(self):
+        """Vectorized temporal adjustment gives the same prices as adjust_prix"""
+        reference = datetime(2024, 6, 1)
+        dates = pd.to_datetime(['2019-03-01', '2022-12-31', '2018-05-05', None]).to_numpy()
+        prix = np.array([200000.0, 300000.0, 250000.0, 100000.0])
+
+        adjusted = TemporalAdjuster.adjust_prix_array(prix, dates, reference)
+        expected = [TemporalAdjuster.adjust_prix(p, pd.Timestamp(d).to_pydatetime(), reference)
+                    for p, d in zip(prix[:3], dates[:3])]
+
+        np.testing.assert_allclose(adjusted[:3], expected)
+        self.assertEqual(adjusted[3], 100000.0)
+
+    def test_score_top_k_matches_full_scoring(self):
+        """Top-K with pruning returns the same rows as sorting all scores"""
+        rng = np.random.default_rng(1)
+        n = 500
+        comparables = pd.DataFrame({
+            'latitude': 46.3787 + rng.uniform(-0.15, 0.15, n),
+            'longitude': 6.4812 + rng.uniform(-0.15, 0.15, n),
+            'sbati': rng.uniform(50, 150, n),
+            'libtypbien': rng.choice(['UN APPARTEMENT', 'UNE MAISON'], n),
+            'datemut': [datetime(2024, 1, 1) - timedelta(days=int(d)) for d in rng.integers(0, 1500, n)]
+        })
+        reference = datetime(2024, 6, 1)
+
+        full = SimilarityScorer.score_batch(46.3787, 6.4812, 100, "Appartement", comparables, reference)
+        positions, scores = SimilarityScorer.score_top_k(
+            46.3787, 6.4812, 100, "Appartement", comparables, 20, reference
+        )
+
+        expected = np.sort(full[full >= 40])[::-1][:20]
+        np.testing.assert_allclose(scores, expected)
+        np.testing.assert_allclose(full[positions], scores)
+
+    def test_score_top_k_with_compatible_score_above_match(self):
+        """Pruning bound holds when a compatible type scores higher than an exact match"""
+        rng = np.random.default_rng(2)
+        n = 300
+        comparables = pd.DataFrame({
+            'latitude': 46.3787 + rng.uniform(-0.1, 0.1, n),
+            'longitude': 6.4812 + rng.uniform(-0.1, 0.1, n),
+            'sbati': rng.uniform(80, 120, n),
+            'libtypbien': rng.choice(['UN APPARTEMENT', 'UNE MAISON'], n, p=[0.1, 0.9]),
+            'datemut': [datetime(2024, 1, 1) - timedelta(days=int(d)) for d in rng.integers(0, 700, n)]
+        })
+        profile = ScoringProfile(
+            name="compatible_fort", distance_weight=0.1, surface_weight=0.1, type_weight=0.7,
+            anciennete_weight=0.1, type_match_score=10, type_compatible_score=100
+        )
+        reference = datetime(2024, 6, 1)
+
+        full = SimilarityScorer.score_batch(46.3787, 6.4812, 100, "Appartement", comparables, reference, profile)
+        positions, scores = SimilarityScorer.score_top_k(
+            46.3787, 6.4812, 100, "Appartement", comparables, 10, reference, profile
+        )
+        np.testing.assert_allclose(scores, np.sort(full[full >= 40])[::-1][:10])
+
+    def test_invalid_rows_are_tagged_and_scored_zero(self):
+        """Rows with missing coordinates, surface or date get a reason code and score 0"""
+        comparables = ComparableSet.from_records([
+            {'latitude': 46.38, 'longitude': 6.48, 'sbati': 100, 'datemut': '2024-01-15'},
+            {'latitude': None, 'longitude': 6.48, 'sbati': 100, 'datemut': '2024-01-15'},
+            {'latitude': 46.38, 'longitude': 6.48, 'sbati': 0, 'datemut': '2024-01-15'},
+            {'latitude': 46.38, 'longitude': 6.48, 'sbati': 100, 'datemut': 'inconnue'},
+        ])
+        self.assertEqual(list(comparables.motifs_invalides()), [0, 1, 2, 3])
+        self.assertEqual(
+            comparables.resume_invalides(),
+            {'coordonnees_manquantes': 1, 'surface_invalide': 1, 'date_invalide': 1}
+        )
+
+        scores = SimilarityScorer.score_batch(46.38, 6.48, 100, "Appartement", comparables)
+        self.assertGreater(scores[0], 0)
+        np.testing.assert_array_equal(scores[1:], 0)
+
+        with self.assertLogs('src.estimation_algorithm', level='WARNING') as logs:
+            EstimationAlgorithm().estimate(46.38, 6.48, 100, "Appartement", comparables)
+        self.assertEqual(len(logs.records), 1)
+
+    def test_score_batch_empty(self):
+        """Test vectorized scoring on an empty frame"""
+        scores = SimilarityScorer.score_batch(46.3787, 6.4812, 100, "Appartement", pd.DataFrame())
+        self.assertEqual(len(scores), 0)
+
 
 class TestEstimationAlgorithm(unittest.TestCase):
     """Test estimation and reliability calculations"""
@@ -208,6 +352,115 @@ class TestEstimationAlgorithm(unittest.TestCase):
             self.skipTest(f"Confidence calculation failed: {str(e)}")
 
 
+class TestIncrementalEstimation(unittest.TestCase):
+    """Test incremental re-estimation when comparables are (de)selected"""
+
+    def setUp(self):
+        self.estimator = EstimationAlgorithm()
+        rng = np.random.default_rng(0)
+        n = 30
+        self.comparables = pd.DataFrame({
+            'latitude': 46.3787 + rng.uniform(-0.01, 0.01, n),
+            'longitude': 6.4812 + rng.uniform(-0.01, 0.01, n),
+            'sbati': rng.uniform(85, 115, n),
+            'valeurfonc': rng.uniform(250000, 350000, n),
+            'libtypbien': ['UN APPARTEMENT'] * n,
+            'datemut': [datetime.now() - timedelta(days=int(d)) for d in rng.integers(10, 900, n)]
+        })
+        self.result = self.estimator.estimate(46.3787, 6.4812, 100, "Appartement", self.comparables)
+
+    def test_estimate_top_k(self):
+        """Top-K mode keeps the best K comparables sorted by score"""
+        result = self.estimator.estimate(46.3787, 6.4812, 100, "Appartement", self.comparables, top_k=5)
+        scores = result['comparables_with_scores']['score']
+        self.assertEqual(len(scores), 5)
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_reestimate_matches_full_estimate(self):
+        """Incremental update gives the same figures as a full re-estimation"""
+        selection = np.ones(len(self.comparables), dtype=bool)
+        selection[[1, 4, 7, 20]] = False
+
+        incremental = self.estimator.reestimate(self.result, selection)
+        full = self.estimator.estimate(
+            46.3787, 6.4812, 100, "Appartement", self.comparables[selection].reset_index(drop=True)
+        )
+
+        self.assertTrue(incremental['success'])
+        self.assertEqual(incremental['estimation'], full['estimation'])
+        self.assertEqual(incremental['fiabilite'], full['fiabilite'])
+        self.assertEqual(incremental['nb_comparables_utilises'], full['nb_comparables_utilises'])
+
+    def test_reselect_restores_initial_result(self):
+        """Deselecting then reselecting rows returns to the initial estimate"""
+        initial = dict(self.result['estimation'])
+        self.estimator.reestimate(self.result, [0, 1, 2])
+        restored = self.estimator.reestimate(self.result, np.arange(len(self.comparables)))
+        self.assertEqual(restored['estimation'], initial)
+
+    def test_reestimate_leaves_previous_results_unchanged(self):
+        """Each result owns its selection: re-estimating one does not alter another"""
+        first = self.estimator.reestimate(self.result, [0, 1, 2, 3, 4])
+        estimation = dict(first['estimation'])
+        self.estimator.reestimate(first, np.arange(len(self.comparables)))
+
+        self.assertEqual(first['incremental'].selection.sum(), 5)
+        self.assertEqual(self.estimator.reestimate(first, first['selection'])['estimation'], estimation)
+        self.assertTrue(self.result['incremental'].selection.all())
+
+    def test_fallback_keeps_original_parameters(self):
+        """Without incremental state, re-estimation reuses reference date and top-K"""
+        reference = datetime.now() + timedelta(days=365)
+        result = self.estimator.estimate(
+            46.3787, 6.4812, 100, "Appartement", self.comparables, reference_date=reference, top_k=10
+        )
+        selection = np.ones(10, dtype=bool)
+        selection[[2, 5]] = False
+        incremental = self.estimator.reestimate(result, selection)
+        fallback = self.estimator.reestimate({**result, 'incremental': None}, selection)
+        self.assertEqual(fallback['estimation'], incremental['estimation'])
+        self.assertEqual(fallback['fiabilite'], incremental['fiabilite'])
+        self.assertEqual(fallback['parametres']['reference_date'], reference)
+
+    def test_empty_selection(self):
+        """Deselecting every row reports an error"""
+        result = self.estimator.reestimate(self.result, np.zeros(len(self.comparables), dtype=bool))
+        self.assertFalse(result['success'])
+
+
+class TestComparableStats(unittest.TestCase):
+    """Test the single-pass statistics kernel"""
+
+    def test_stats_match_numpy(self):
+        """Weighted mean, quartiles and CV are computed on valid priced rows only"""
+        scores = np.array([90.0, 60.0, 30.0, 80.0])
+        prix = np.array([300000.0, 200000.0, 900000.0, np.nan])
+        stats = compute_comparable_stats(scores, prix)
+
+        self.assertEqual(stats['nb_valides'], 3)
+        self.assertEqual(stats['nb_prix'], 2)
+        self.assertAlmostEqual(stats['prix_pondere'], (300000 * 90 + 200000 * 60) / 150)
+        self.assertAlmostEqual(stats['prix_p25'], 225000)
+        self.assertAlmostEqual(stats['coefficient_variation'], np.std([300000, 200000]) / 250000)
+        self.assertEqual((stats['score_min'], stats['score_max']), (60.0, 90.0))
+        self.assertIsNone(stats['mois_moyen'])
+
+    def test_summary_uses_min_comparable_score(self):
+        """The comparables summary follows EstimationEngine.MIN_COMPARABLE_SCORE"""
+        stats = compute_comparable_stats(np.array([45.0, 55.0]), np.array([1.0, 1.0]))
+        summary = EstimationAlgorithm()._comparables_summary(stats)
+        self.assertEqual(summary['nb_comparables_utilises'], 2)
+
+        original = EstimationEngine.MIN_COMPARABLE_SCORE
+        EstimationEngine.MIN_COMPARABLE_SCORE = 50
+        try:
+            stats = compute_comparable_stats(np.array([45.0, 55.0]), np.array([1.0, 1.0]))
+            summary = EstimationAlgorithm()._comparables_summary(stats)
+            self.assertEqual(summary['nb_comparables_utilises'], 1)
+        finally:
+            EstimationEngine.MIN_COMPARABLE_SCORE = original
+
+
 class TestEstimationDataValidation(unittest.TestCase):
     """Test data validation in estimation process"""
 
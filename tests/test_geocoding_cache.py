@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests du cache de géocodage (clés normalisées, LRU + SQLite, TTL, "non trouvé")
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from src.utils.geocoding import GeocodingService
+from src.utils.geocoding_cache import MISS, GeocodingCache, normalize_address
+
+
+class FakeClient:
+    """Client Google Maps factice (compte les appels)"""
+
+    def __init__(self, results=None, error=None):
+        self.results = results or {}
+        self.error = error
+        self.calls = []
+
+    def geocode(self, address):
+        self.calls.append(address)
+        if self.error:
+            raise self.error
+        return self.results.get(address, [])
+
+
+def google_result(address, lat, lon):
+    return {"formatted_address": address, "geometry": {"location": {"lat": lat, "lng": lon}}, "place_id": "p1"}
+
+
+class TestGeocodingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "geocodage.sqlite")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_normalize_address(self):
+        self.assertEqual(normalize_address("  12, Av. de Genève "), "12 avenue de geneve")
+        self.assertEqual(normalize_address("St-Gingolph"), normalize_address("saint gingolph"))
+
+    def test_memory_then_disk_tiers(self):
+        cache = GeocodingCache("test", path=self.path)
+        self.assertIs(cache.get("Thonon"), MISS)
+        cache.set("Thonon", {"lat": 46.37})
+        self.assertEqual(cache.get("THONON"), {"lat": 46.37})
+
+        # Nouveau processus: servi depuis SQLite puis depuis la mémoire
+        reloaded = GeocodingCache("test", path=self.path)
+        self.assertEqual(reloaded.get("thonon"), {"lat": 46.37})
+        self.assertEqual(reloaded.get("thonon"), {"lat": 46.37})
+        stats = reloaded.stats()
+        self.assertEqual((stats["disk_hits"], stats["memory_hits"], stats["misses"]), (1, 1, 0))
+
+        # Espaces de noms séparés
+        self.assertIs(GeocodingCache("autre", path=self.path).get("thonon"), MISS)
+
+    def test_negative_entries_and_ttl(self):
+        cache = GeocodingCache("test", path=self.path, ttl=60, negative_ttl=0.01)
+        cache.set("Nulle part", None)
+        self.assertIsNone(cache.get("nulle part"))
+        self.assertEqual(cache.stats()["negative_hits"], 1)
+        time.sleep(0.02)
+        self.assertIs(cache.get("nulle part"), MISS)
+        self.assertEqual(cache.purge_expired(), 1)
+
+    def test_lru_eviction_falls_back_to_disk(self):
+        cache = GeocodingCache("test", path=self.path, maxsize=2)
+        for name in ("a", "b", "c"):
+            cache.set(name, [name])
+        self.assertEqual(cache.stats()["memory_entries"], 2)
+        self.assertEqual(cache.get("a"), ["a"])
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+
+    def test_legacy_json_is_imported_once(self):
+        json_path = os.path.join(self.tmpdir.name, "geocoding_cache.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"Thonon": {"lat": 46.37}, "Evian": {"lat": 46.40}}, f)
+        cache = GeocodingCache("test", path=self.path)
+        cache.set("evian", {"lat": 46.401})
+
+        self.assertEqual(cache.import_json(json_path), 1)
+        self.assertEqual(cache.get("thonon"), {"lat": 46.37})
+        self.assertEqual(cache.get("evian"), {"lat": 46.401})
+
+        # Redémarrage: fichier renommé, pas de nouvelle reprise
+        self.assertFalse(os.path.exists(json_path))
+        self.assertTrue(os.path.exists(json_path + ".migre"))
+        self.assertEqual(GeocodingCache("test", path=self.path).import_json(json_path), 0)
+
+
+class TestGeocodingServiceCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = GeocodingCache("google", path=os.path.join(self.tmpdir.name, "geocodage.sqlite"))
+        self.service = GeocodingService(cache=self.cache, use_local=False)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_repeat_address_skips_google(self):
+        self.service.client = FakeClient({"Évian-les-Bains": [google_result("74500 Évian", 46.40, 6.59)]})
+        first = self.service.geocode_address("Évian-les-Bains")
+        second = self.service.geocode_address("evian les bains")
+        self.assertEqual(first, second)
+        self.assertEqual(second[0]["latitude"], 46.40)
+        self.assertEqual(len(self.service.client.calls), 1)
+
+    def test_not_found_is_cached_but_errors_are_not(self):
+        self.service.client = FakeClient()
+        self.assertEqual(self.service.geocode_address("adresse inconnue"), [])
+        self.assertEqual(self.service.geocode_address("adresse inconnue"), [])
+        self.assertEqual(len(self.service.client.calls), 1)
+
+        self.service.client = FakeClient(error=RuntimeError("quota"))
+        self.assertEqual(self.service.geocode_address("Annemasse"), [])
+        self.assertIs(self.cache.get("Annemasse"), MISS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests de la réplique locale DVF+ (SQLite + R-tree)
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from src.comparable_set import ComparableSet
+from src.local_dvf_store import LocalDvfStore
+from src.supabase_data_retriever import SupabaseDataRetriever
+
+TARGET = (46.3787, 6.4812)
+
+
+def make_mutations(rows):
+    """DataFrame au format de SupabaseDataRetriever.iter_mutations"""
+    df = pd.DataFrame(rows, columns=["idmutation", "datemut", "latitude", "longitude", "sbati", "valeurfonc", "libtypbien"])
+    x, y = zip(*(SupabaseDataRetriever._point_lambert93(lat, lon) for lat, lon in zip(df["latitude"], df["longitude"])))
+    # Thonon-les-Bains (74200) au nord de 46.2, Amancy (74800) au sud
+    codinsee = np.where(df["latitude"] > 46.2, "74281", "74012")
+    return df.assign(coddep="74", codinsee=codinsee, x_2154=x, y_2154=y)
+
+
+class FakeSource:
+    """Source distante: retourne les mutations postérieures à `depuis`"""
+
+    def __init__(self, mutations):
+        self.mutations = mutations
+        self.depuis = []
+
+    def iter_mutations(self, coddep="74", depuis=None):
+        self.depuis.append(depuis)
+        df = self.mutations
+        if depuis is not None:
+            df = df[pd.to_datetime(df["datemut"]) >= pd.Timestamp(depuis)]
+        yield df
+
+
+class TestLocalDvfStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = LocalDvfStore(os.path.join(self.tmpdir.name, "dvf.sqlite"))
+        today = pd.Timestamp.today().normalize()
+        self.mutations = make_mutations([
+            ("M1", today - pd.Timedelta(days=30), 46.3790, 6.4815, 70, 300000, "UN APPARTEMENT"),
+            ("M2", today - pd.Timedelta(days=400), 46.3850, 6.4900, 80, 320000, "UN APPARTEMENT"),
+            ("M3", today - pd.Timedelta(days=60), 46.3800, 6.4820, 75, 500000, "UNE MAISON"),
+            # Hors rayon (~30 km)
+            ("M4", today - pd.Timedelta(days=10), 46.1000, 6.4800, 70, 250000, "UN APPARTEMENT"),
+            # Trop ancienne
+            ("M5", today - pd.Timedelta(days=3000), 46.3788, 6.4813, 70, 200000, "UN APPARTEMENT"),
+        ])
+        self.store.sync(FakeSource(self.mutations))
+
+        # Pas de reverse geocoding (Google) dans les tests
+        patcher = patch.object(
+            SupabaseDataRetriever, "_adresses",
+            staticmethod(lambda df, attendre=False: np.array(["adresse"] * len(df), dtype=object))
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_comparables_filtered_by_radius_type_and_age(self):
+        df = self.store.get_comparables(*TARGET, type_bien="Appartement", surface_min=50, surface_max=100, rayon_km=5)
+        self.assertEqual(list(df["idmutation"]), ["M1", "M2"])
+        self.assertTrue((np.diff(df["distance_km"]) >= 0).all())
+        self.assertIn("prix_m2", df.columns)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["datemut"]))
+
+    def test_limit_applies_ranking(self):
+        recent = self.store.get_comparables(*TARGET, rayon_km=5, limit=1, ordre="recent")
+        self.assertEqual(list(recent["idmutation"]), ["M1"])
+        proche = self.store.get_comparables(*TARGET, rayon_km=5, limit=1, ordre="distance")
+        self.assertEqual(list(proche["idmutation"]), ["M1"])
+
+    def test_as_set(self):
+        comparables = self.store.get_comparables(*TARGET, rayon_km=5, as_set=True)
+        self.assertIsInstance(comparables, ComparableSet)
+        self.assertEqual(len(comparables), 2)
+
+    def test_incremental_sync_updates_without_duplicates(self):
+        last = self.store.last_datemut()
+        updated = self.mutations.copy()
+        updated.loc[updated["idmutation"] == "M4", "valeurfonc"] = 260000
+        source = FakeSource(updated)
+        self.store.sync(source)
+        self.assertEqual(source.depuis, [last])
+
+        stats = self.store.get_market_stats("74200")
+        self.assertEqual(stats["nb_transactions"], 5)
+        self.assertEqual(stats["prix_median"], 300000)
+
+    def test_market_stats_par_commune(self):
+        self.assertEqual(self.store.get_market_stats("74200")["nb_transactions"], 5)
+        self.assertEqual(self.store.get_market_stats("74200", par_commune=True)["nb_transactions"], 4)
+        self.assertEqual(self.store.get_market_stats("74800", par_commune=True)["nb_transactions"], 1)
+        # Code postal absent du référentiel: département
+        self.assertEqual(self.store.get_market_stats("74999", par_commune=True)["nb_transactions"], 5)
+
+    def test_existing_replica_gets_new_columns(self):
+        path = os.path.join(self.tmpdir.name, "ancienne.sqlite")
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE mutations (id INTEGER PRIMARY KEY, idmutation TEXT NOT NULL UNIQUE, "
+                         "datemut TEXT NOT NULL, coddep TEXT, libtypbien TEXT)")
+        LocalDvfStore(path)
+        with sqlite3.connect(path) as conn:
+            self.assertIn("codinsee", {row[1] for row in conn.execute("PRAGMA table_info(mutations)")})
+
+
+if __name__ == '__main__':
+    unittest.main()
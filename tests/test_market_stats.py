@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests des statistiques de marché pré-agrégées (MarketStats)
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from src.market_stats import _REFRESH, MarketStats, load_insee_mapping, tranche_surface
+from src.supabase_data_retriever import FILTRE_STATS_MARCHE, SupabaseDataRetriever
+
+
+def make_table():
+    """Agrégats: Thonon (74281) et Anthy (74020), code postal 74200"""
+    rows = [
+        # codinsee, type_bien, annee, tranche, nb, somme_prix, somme_surface, prix_median, prix_m2_median
+        ("74281", "Appartement", 2023, "50-70", 10, 3000000, 600, 290000, 4800),
+        ("74281", "Appartement", 2024, "50-70", 30, 9600000, 1800, 310000, 5200),
+        ("74020", "Appartement", 2024, "50-70", 5, 1750000, 300, 350000, 5800),
+        ("74281", "Maison", 2024, "120-150", 4, 2400000, 540, 600000, 4400),
+        ("74010", "Maison", 2024, "90-120", 2, 1000000, 200, 500000, 5000),
+    ]
+    table = pd.DataFrame(rows, columns=[
+        "codinsee", "type_bien", "annee", "tranche_surface", "nb_transactions",
+        "somme_prix", "somme_surface", "prix_median", "prix_m2_median"
+    ])
+    table["date_min"] = pd.to_datetime(table["annee"].astype(str) + "-01-15").dt.date
+    table["date_max"] = pd.to_datetime(table["annee"].astype(str) + "-11-30").dt.date
+    return table
+
+
+class TestMarketStats(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = MarketStats(make_table(), load_insee_mapping())
+
+    def test_tranche_surface(self):
+        self.assertEqual(tranche_surface(20), "0-30")
+        self.assertEqual(tranche_surface(50), "50-70")
+        self.assertEqual(tranche_surface(149.9), "120-150")
+        self.assertEqual(tranche_surface(300), "150+")
+
+    def test_postal_code_uses_insee_mapping(self):
+        self.assertIn("74281", self.stats.communes("74200"))
+        stats = self.stats.for_postal_code("74200", type_bien="Appartement")
+        self.assertEqual(stats["nb_transactions"], 45)
+        self.assertAlmostEqual(stats["prix_moyen"], 14350000 / 45)
+        self.assertAlmostEqual(stats["surface_moyenne"], 2700 / 45)
+        # Médiane pondérée des médianes de groupe (30 ventes à 310k sur 45)
+        self.assertEqual(stats["prix_median"], 310000)
+        self.assertEqual(stats["date_premiere_vente"], "2023-01-15")
+
+    def test_filters(self):
+        stats = self.stats.query(codes_insee=["74281"], annee_min=2024)
+        self.assertEqual(stats["nb_transactions"], 34)
+        self.assertEqual(self.stats.query(type_bien="Terrain"), {})
+
+    def test_unknown_postal_code_falls_back_to_department(self):
+        stats = self.stats.for_postal_code("74999")
+        self.assertEqual(stats["nb_transactions"], 51)
+
+    def test_coverage(self):
+        stats = MarketStats(make_table(), load_insee_mapping(), {"74": (2023, 2014)})
+        self.assertFalse(stats.covers("74200"))
+        self.assertTrue(stats.covers("74200", annee_min=2023))
+        self.assertFalse(stats.covers("01000", annee_min=2023))
+        self.assertTrue(MarketStats(make_table(), load_insee_mapping(), {"74": (2014, 2014)}).covers("74200"))
+
+    def test_department_scope(self):
+        self.assertEqual(self.stats.for_department("74200")["nb_transactions"], 51)
+
+    def test_breakdown_by_year(self):
+        table = self.stats.breakdown(by=("annee",), type_bien="Appartement")
+        self.assertEqual(list(table["annee"]), [2023, 2024])
+        self.assertEqual(list(table["nb_transactions"]), [10, 35])
+
+
+class TestRetrieverMarketStats(unittest.TestCase):
+
+    def setUp(self):
+        self.retriever = SupabaseDataRetriever(cache_comparables=False)
+        self.retriever._market_stats = lambda: MarketStats(make_table(), load_insee_mapping())
+        # Requête directe: une ligne d'agrégats factice
+        self.retriever.engine = MagicMock()
+        conn = self.retriever.engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.fetchone.return_value = (3, 400000, 390000, 80, "2030-02-01", "2030-03-01")
+        self.conn = conn
+
+    def test_department_scope_by_default(self):
+        stats = self.retriever.get_market_stats("74200")
+        self.assertEqual(stats["nb_transactions"], 51)
+        stats = self.retriever.get_market_stats("74200", par_commune=True)
+        self.assertEqual(stats["nb_transactions"], 49)
+        self.conn.execute.assert_not_called()
+
+    def test_live_query_when_aggregates_have_no_rows(self):
+        stats = self.retriever.get_market_stats("74200", annee_min=2030, par_commune=True)
+        self.assertEqual(stats["nb_transactions"], 3)
+        params = self.conn.execute.call_args[0][1]
+        self.assertIn("74281", params["codes_insee"])
+
+    def test_partial_coverage_uses_live_query(self):
+        # Agrégats rafraîchis depuis 2023, mutations depuis 2014: années antérieures absentes
+        self.retriever._market_stats = lambda: MarketStats(make_table(), load_insee_mapping(), {"74": (2023, 2014)})
+        stats = self.retriever.get_market_stats("74200")
+        self.assertEqual(stats["nb_transactions"], 3)
+        self.assertFalse(stats["mediane_approchee"])
+
+        stats = self.retriever.get_market_stats("74200", annee_min=2023)
+        self.assertEqual(stats["nb_transactions"], 51)
+        self.assertTrue(stats["mediane_approchee"])
+        self.assertEqual(self.conn.execute.call_count, 1)
+
+    def test_live_query_and_refresh_share_filters(self):
+        self.retriever.get_market_stats("74200", annee_min=2030)
+        self.assertIn(FILTRE_STATS_MARCHE, str(self.conn.execute.call_args[0][0]))
+        self.assertIn(FILTRE_STATS_MARCHE, _REFRESH)
+        # Terrains (sbati = 0) agrégés comme dans la requête directe
+        self.assertNotIn("sbati > 0", _REFRESH)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test suite for PortfolioEstimator (bulk estimation)
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from src.comparable_set import ComparableSet
+from src.comparables_cache import rank_comparables
+from src.estimation_algorithm import EstimationAlgorithm
+from src.portfolio_estimator import PortfolioEstimator, _estimate_tile, load_properties
+from src.utils.distance import DistanceKernel
+
+
+class FakeRetriever:
+    """Returns the same comparables around Thonon and records each call"""
+
+    def __init__(self):
+        self.calls = []
+        today = datetime.now()
+        self.comparables = ComparableSet.from_records([
+            {'idmutation': i, 'latitude': 46.3787 + i * 0.001, 'longitude': 6.4812 + i * 0.001,
+             'sbati': 90 + i * 3, 'valeurfonc': 270000 + i * 5000,
+             'libtypbien': 'UN APPARTEMENT', 'datemut': today - timedelta(days=30 * (i + 1))}
+            for i in range(8)
+        ])
+
+    def get_comparables(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.comparables
+
+
+class TestPortfolioEstimator(unittest.TestCase):
+    """Test tiling, single fetch per tile and result streaming"""
+
+    def setUp(self):
+        self.properties = pd.DataFrame({
+            'id': ['a', 'b', 'c'],
+            'latitude': [46.3790, 46.3800, 45.9000],
+            'longitude': [6.4815, 6.4830, 6.1200],
+            'surface': [100, 95, 100],
+            'type_bien': ['Appartement', 'Appartement', 'Appartement']
+        })
+
+    def test_one_fetch_per_tile(self):
+        """Nearby properties share one comparables query"""
+        retriever = FakeRetriever()
+        results = list(PortfolioEstimator(retriever).estimate_many(self.properties, workers=1))
+
+        self.assertEqual(len(retriever.calls), 2)
+        self.assertEqual(sorted(r['id'] for r in results), ['a', 'b', 'c'])
+        by_id = {r['id']: r for r in results}
+        self.assertTrue(by_id['a']['success'])
+        self.assertGreater(by_id['a']['prix_estime_eur'], 0)
+        # Property 'c' is far from every comparable
+        self.assertFalse(by_id['c']['success'])
+
+    def test_process_pool_matches_inline(self):
+        """Process pool gives the same results as inline execution"""
+        inline = list(PortfolioEstimator(FakeRetriever()).estimate_many(self.properties, workers=1))
+        pooled = list(PortfolioEstimator(FakeRetriever()).estimate_many(self.properties, workers=2))
+
+        key = lambda r: r['id']
+        self.assertEqual(
+            [r['prix_estime_eur'] for r in sorted(inline, key=key)],
+            [r['prix_estime_eur'] for r in sorted(pooled, key=key)]
+        )
+
+    def test_selection_matches_single_query_ranking(self):
+        """Per-property selection uses the get_comparables ranking (hybrid by default)"""
+        comparables = FakeRetriever().comparables
+        target = {'id': 'a', 'latitude': 46.3830, 'longitude': 6.4855, 'surface': 100, 'type_bien': 'Appartement'}
+        estimator = PortfolioEstimator(FakeRetriever(), rayon_km=3, limit=3)
+        selected = []
+
+        def capture(**kwargs):
+            selected.append(list(kwargs['comparables']['idmutation']))
+            return {'success': False}
+
+        for ordre in ('hybride', 'recent', 'distance'):
+            estimator.ordre = ordre
+            with patch.object(EstimationAlgorithm, 'estimate', side_effect=capture):
+                _estimate_tile([target], comparables, estimator._tile_params())
+
+            df = pd.DataFrame({col: comparables[col] for col in ('idmutation', 'latitude', 'longitude', 'datemut')})
+            df['distance_km'] = DistanceKernel(target['latitude'], target['longitude']).distances(
+                df['latitude'].to_numpy(), df['longitude'].to_numpy()
+            )
+            expected = rank_comparables(df, ordre, estimator.rayon_km, estimator.annees, 3)
+            self.assertEqual(selected[-1], list(expected['idmutation']), ordre)
+        # Les trois ordres donnent ici trois sélections différentes
+        self.assertEqual(len({tuple(ids) for ids in selected}), 3)
+
+    def test_portfolio_makes_no_reverse_geocoding_calls(self):
+        """Tile fetches skip addresses: no Google reverse geocoding for bulk runs"""
+        from sqlalchemy import create_engine
+        from src.supabase_data_retriever import SupabaseDataRetriever
+
+        retriever = SupabaseDataRetriever(cache_comparables=False)
+        retriever.engine = create_engine("sqlite://")
+        frame = FakeRetriever().comparables.to_dataframe().assign(distance_km=0.5)
+        retriever._fetch_frames = lambda conn, query, params, chunk_size=None: iter([frame.copy()])
+
+        geocoder = MagicMock()
+        with patch("src.utils.reverse_geocoding.get_reverse_geocoder", return_value=geocoder):
+            results = list(PortfolioEstimator(retriever).estimate_many(self.properties, workers=1))
+
+        self.assertTrue(any(r['success'] for r in results))
+        self.assertEqual(geocoder.lookup.call_count, 0)
+        self.assertEqual(geocoder.submit.call_count, 0)
+
+    def test_load_properties_csv(self):
+        """CSV portfolios are validated and get a default id"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'portfolio.csv')
+            self.properties.drop(columns=['id']).to_csv(path, index=False)
+            df = load_properties(path)
+            self.assertEqual(list(df['id']), [0, 1, 2])
+
+            self.properties.drop(columns=['surface']).to_csv(path, index=False)
+            with self.assertRaises(ValueError):
+                load_properties(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
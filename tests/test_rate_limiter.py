@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests du limiteur de débit (token bucket, Retry-After)
+"""
+
+import asyncio
+import time
+import unittest
+from email.utils import formatdate
+
+from src.utils.rate_limiter import TokenBucket, parse_retry_after
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertEqual(parse_retry_after("-1"), 0.0)
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 30, usegmt=True)), 30, delta=2)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("bientôt"))
+
+    def test_burst_then_steady_rate(self):
+        bucket = TokenBucket(rate=20, capacity=3)
+
+        async def run():
+            start = time.monotonic()
+            for _ in range(5):
+                await bucket.acquire()
+            return time.monotonic() - start
+
+        # 3 jetons immédiats, puis 2 à 50 ms d'intervalle
+        elapsed = asyncio.run(run())
+        self.assertGreaterEqual(elapsed, 0.09)
+        self.assertLess(elapsed, 0.5)
+
+    def test_pause_blocks_all_requests(self):
+        bucket = TokenBucket(rate=1000, capacity=10)
+        bucket.pause(0.1)
+
+        async def run():
+            start = time.monotonic()
+            await asyncio.gather(bucket.acquire(), bucket.acquire())
+            return time.monotonic() - start
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests du reverse geocoding par lots (cache SQLite + résolution en arrière-plan)
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.supabase_data_retriever import SupabaseDataRetriever
+from src.utils.reverse_geocoding import (
+    AddressCache,
+    ReverseGeocoder,
+    is_placeholder,
+    placeholder_address,
+)
+
+
+class TestReverseGeocoder(unittest.TestCase):
+    """Cache persistant, adresses provisoires et résolution en arrière-plan"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "adresses.sqlite")
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def fake_geocode(self, lat, lon):
+        with self.lock:
+            self.calls.append((lat, lon))
+        return f"Adresse {lat:.3f}"
+
+    def test_cache_miss_returns_placeholders(self):
+        geocoder = ReverseGeocoder(AddressCache(self.path), geocode_fn=self.fake_geocode)
+        adresses, manquantes = geocoder.lookup(["M1", "M2"], [46.37, 46.38], [6.48, 6.49])
+        self.assertEqual(list(manquantes), [0, 1])
+        self.assertEqual(adresses[0], placeholder_address(46.37, 6.48))
+        self.assertTrue(is_placeholder(adresses[1]))
+        self.assertEqual(self.calls, [])
+
+    def test_resolved_addresses_persist_across_instances(self):
+        geocoder = ReverseGeocoder(AddressCache(self.path), geocode_fn=self.fake_geocode)
+        geocoder.submit(["M1", "M2"], [46.37, 46.38], [6.48, 6.49]).result()
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(geocoder.pending(), 0)
+
+        # Nouveau processus: même fichier, aucun appel Google
+        reloaded = ReverseGeocoder(AddressCache(self.path), geocode_fn=self.fake_geocode)
+        adresses, manquantes = reloaded.lookup(["M1", "M2"], [46.37, 46.38], [6.48, 6.49])
+        self.assertEqual(len(manquantes), 0)
+        self.assertEqual(list(adresses), ["Adresse 46.370", "Adresse 46.380"])
+        self.assertEqual(len(self.calls), 2)
+
+    def test_refresh_replaces_placeholders(self):
+        geocoder = ReverseGeocoder(AddressCache(self.path), geocode_fn=self.fake_geocode)
+        adresses, manquantes = geocoder.lookup(["M1"], [46.37], [6.48])
+        geocoder.submit(["M1"], [46.37], [6.48]).result()
+        self.assertEqual(list(geocoder.refresh(["M1"], [46.37], [6.48], adresses)), ["Adresse 46.370"])
+
+    def test_failures_are_not_cached(self):
+        geocoder = ReverseGeocoder(AddressCache(self.path), geocode_fn=lambda lat, lon: None)
+        geocoder.submit(["M1"], [46.37], [6.48]).result()
+        _, manquantes = geocoder.lookup(["M1"], [46.37], [6.48])
+        self.assertEqual(list(manquantes), [0])
+
+    def test_recent_failures_are_not_retried(self):
+        def failing_geocode(lat, lon):
+            self.calls.append((lat, lon))
+            return None
+
+        geocoder = ReverseGeocoder(AddressCache(self.path), geocode_fn=failing_geocode, negative_ttl=0.2)
+        geocoder.submit(["M1"], [46.37], [6.48]).result()
+        self.assertEqual(geocoder.submit(["M1"], [46.37], [6.48]).result(), {})
+        self.assertEqual(len(self.calls), 1)
+
+        # Échec expiré: nouvelle tentative
+        time.sleep(0.25)
+        geocoder.submit(["M1"], [46.37], [6.48]).result()
+        self.assertEqual(len(self.calls), 2)
+
+    def test_wait_covers_coordinates_in_flight_elsewhere(self):
+        def slow_geocode(lat, lon):
+            time.sleep(0.1)
+            return self.fake_geocode(lat, lon)
+
+        geocoder = ReverseGeocoder(AddressCache(self.path), geocode_fn=slow_geocode)
+        # Première recherche: résolution lancée sans attendre
+        geocoder.submit(["M1"], [46.37], [6.48])
+        self.assertEqual(geocoder.pending(), 1)
+
+        # Seconde recherche (attendre_adresses=True) sur les mêmes coordonnées
+        df = pd.DataFrame({"idmutation": ["M1"], "latitude": [46.37], "longitude": [6.48]})
+        with patch("src.utils.reverse_geocoding.get_reverse_geocoder", return_value=geocoder):
+            adresses = SupabaseDataRetriever._adresses(df, attendre=True)
+        self.assertEqual(list(adresses), ["Adresse 46.370"])
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(geocoder.pending(), 0)
+
+    def test_concurrency_is_bounded(self):
+        active = []
+        peak = []
+
+        def slow_geocode(lat, lon):
+            with self.lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with self.lock:
+                active.pop()
+            return "Adresse"
+
+        geocoder = ReverseGeocoder(AddressCache(self.path), max_concurrency=3, geocode_fn=slow_geocode)
+        latitudes = [46.0 + i / 1000 for i in range(12)]
+        geocoder.submit(None, latitudes, [6.5] * 12).result()
+        self.assertLessEqual(max(peak), 3)
+        self.assertEqual(len(peak), 12)
+
+    def test_batches_share_the_concurrency_limit(self):
+        active = []
+        peak = []
+
+        def slow_geocode(lat, lon):
+            with self.lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with self.lock:
+                active.pop()
+            return "Adresse"
+
+        geocoder = ReverseGeocoder(AddressCache(self.path), max_concurrency=4, geocode_fn=slow_geocode)
+        # Deux recherches successives de 2 coordonnées: traitées en parallèle, pas l'une après l'autre
+        lots = [
+            geocoder.submit(None, [46.0 + i / 1000 for i in range(start, start + 2)], [6.5] * 2)
+            for start in (0, 2)
+        ]
+        self.assertEqual([len(lot.result()) for lot in lots], [2, 2])
+        self.assertEqual(max(peak), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
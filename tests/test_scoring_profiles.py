@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test suite for scoring profiles (compiled lookup tables)
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import src.scoring_profiles as scoring_profiles
+from src.scoring_profiles import (
+    DEFAULT_PROFILE, ScoringProfile, compile_profile, get_profile, load_profiles, register_profile
+)
+from src.estimation_algorithm import SimilarityScorer
+
+
+def historical_recency(jours):
+    """Piecewise recency curve as originally written in score_anciennete"""
+    mois = jours / 30.44
+    if mois <= 12:
+        return 100
+    elif mois <= 24:
+        return 80 - (mois - 12) * (30 / 12)
+    elif mois <= 36:
+        return 50 - (mois - 24) * (50 / 12)
+    return 0
+
+
+class TestCompiledProfile(unittest.TestCase):
+    """Test compilation of the default profile"""
+
+    def test_recency_lookup_matches_curve(self):
+        """Recency lookup by day gives the historical piecewise curve"""
+        compiled = compile_profile()
+        jours = np.arange(-5, 1300)
+        expected = [historical_recency(j) for j in jours]
+        np.testing.assert_allclose(compiled.recency_scores(jours.astype(float)), expected, atol=1e-9)
+        self.assertEqual(compiled.recency_scores(np.array([np.nan]))[0], 50)
+
+    def test_type_matrix(self):
+        """Type compatibility comes from the precomputed matrix"""
+        compiled = compile_profile()
+        self.assertEqual(compiled.type_score("Appartement", "APPARTEMENT"), 100)
+        self.assertEqual(compiled.type_score("Maison", "Appartement"), 50)
+        self.assertEqual(compiled.type_score("Maison", "Terrain"), 0)
+        np.testing.assert_array_equal(
+            compiled.type_lookup("Maison", ["Appartement", "Maison", "Terrain"]), [50, 100, 0, 0]
+        )
+
+    def test_compile_is_cached(self):
+        """Each profile is compiled only once"""
+        self.assertIs(compile_profile(), compile_profile(None))
+        self.assertIs(compile_profile("defaut"), compile_profile("defaut"))
+
+
+class TestNamedProfiles(unittest.TestCase):
+    """Test registration, JSON loading and use in the scorer"""
+
+    def test_custom_profile_changes_scores(self):
+        """A profile with wider distance cut-off scores far comparables higher"""
+        register_profile(ScoringProfile(name="rural_test", distance_max_km=30, distance_decay=0.1))
+        comparables = pd.DataFrame({
+            'latitude': [46.50], 'longitude': [6.48], 'sbati': [100],
+            'libtypbien': ['UNE MAISON'], 'datemut': [pd.Timestamp.now()]
+        })
+        defaut = SimilarityScorer.score_batch(46.3787, 6.4812, 100, "Maison", comparables)
+        rural = SimilarityScorer.score_batch(46.3787, 6.4812, 100, "Maison", comparables, profile="rural_test")
+        self.assertGreater(rural[0], defaut[0])
+
+    def test_load_profiles_json(self):
+        """Profiles load from a JSON mapping name -> parameters"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'profiles.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"client_test": {"surface_tolerance_pct": 0.3,
+                                           "compatible_pairs": [["maison", "villa"]]}}, f)
+            self.assertEqual(load_profiles(path), ["client_test"])
+
+        profile = get_profile("client_test")
+        self.assertEqual(profile.surface_tolerance_pct, 0.3)
+        self.assertEqual(profile.distance_weight, DEFAULT_PROFILE.distance_weight)
+        self.assertEqual(compile_profile("client_test").type_score("Villa", "Maison"), 50)
+
+        with self.assertRaises(ValueError):
+            get_profile("inconnu")
+
+    def test_configured_profiles_load_on_first_lookup(self):
+        """Profiles from SCORING_PROFILES_PATH are available by name without explicit loading"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'profiles.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([{"name": "config_test", "distance_max_km": 25}], f)
+            with patch.object(scoring_profiles.Config, 'SCORING_PROFILES_PATH', path), \
+                    patch.object(scoring_profiles, '_configured_loaded', False):
+                self.assertEqual(get_profile("config_test").distance_max_km, 25)
+                # Une seule lecture par processus
+                self.assertEqual(scoring_profiles.load_configured_profiles(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,10 +7,11 @@ Tests data retrieval, coordinate conversion, and market statistics
 
 import unittest
 from unittest.mock import patch, MagicMock
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-from src.supabase_data_retriever import SupabaseDataRetriever
+from src.supabase_data_retriever import SupabaseDataRetriever, lambert93_to_wgs84, parse_wkt_points
 
 
 class TestSupabaseConnection(unittest.TestCase):
@@ -155,6 +156,110 @@ class TestDataRetrieval(unittest.TestCase):
             self.skipTest(f"Distance calculation test failed: {str(e)}")
 
 
+class TestComparablesQuery(unittest.TestCase):
+    """Test SQL generation for comparables (no database needed)"""
+
+    def test_sql_geometry_computed_server_side(self):
+        """Coordinates and distance come from PostGIS, sorted by distance"""
+        query = SupabaseDataRetriever._comparables_query(geometrie_sql=True)
+        self.assertIn('ST_X(', query)
+        self.assertIn('ST_Y(', query)
+        self.assertIn('ST_Distance(', query)
+        self.assertIn('ORDER BY distance_km', query)
+        self.assertNotIn('ST_AsText', query)
+
+    def test_spatial_filter_uses_raw_geometry(self):
+        """ST_DWithin compares geomlocmut directly to a Lambert 93 point (index-friendly)"""
+        query = SupabaseDataRetriever._comparables_query()
+        self.assertRegex(query, r'ST_DWithin\(\s*geomlocmut,')
+        self.assertIn('ST_MakePoint(:x_2154, :y_2154), 2154)', query)
+
+    def test_point_lambert93(self):
+        """Target point is projected to EPSG:2154"""
+        x, y = SupabaseDataRetriever._point_lambert93(46.3787, 6.4812)
+        self.assertAlmostEqual(x, 967480, delta=10)
+        self.assertAlmostEqual(y, 6592426, delta=10)
+
+    def test_order_modes(self):
+        """Ranking before LIMIT: recency, KNN distance or hybrid score"""
+        recent = SupabaseDataRetriever._comparables_query(ordre="recent")
+        self.assertIn('ORDER BY datemut DESC', recent)
+        knn = SupabaseDataRetriever._comparables_query(ordre="distance")
+        self.assertIn('ORDER BY geomlocmut <->', knn)
+        hybride = SupabaseDataRetriever._comparables_query(ordre="hybride")
+        self.assertIn('(CURRENT_DATE - datemut)', hybride)
+        self.assertIn('/ :rayon_m', hybride)
+        with self.assertRaises(ValueError):
+            SupabaseDataRetriever._comparables_query(ordre="prix")
+
+    def test_precomputed_coordinates_query(self):
+        """Precomputed WGS84 columns replace ST_Transform in the select list"""
+        query = SupabaseDataRetriever._comparables_query(coordonnees_precalculees=True)
+        self.assertIn('lat_wgs84 AS latitude', query)
+        self.assertIn('lon_wgs84 AS longitude', query)
+        self.assertNotIn('ST_Transform', query)
+
+    def test_numeric_columns_cast_to_float8(self):
+        """Numerics are cast in SQL so no Decimal conversion is needed client-side"""
+        query = SupabaseDataRetriever._comparables_query()
+        self.assertIn('valeurfonc::float8 AS valeurfonc', query)
+        self.assertIn('sbati::float8 AS sbati', query)
+
+    def test_streamed_fetch_in_chunks(self):
+        """Rows are read by server-side cursor in bounded DataFrame chunks"""
+        from sqlalchemy import create_engine, text
+        engine = create_engine("sqlite://")
+        with engine.connect() as conn:
+            conn.execute(text("CREATE TABLE t (idmutation TEXT, valeurfonc REAL)"))
+            conn.execute(text("INSERT INTO t VALUES ('A', 1.0), ('B', 2.0), ('C', 3.0)"))
+            frames = list(SupabaseDataRetriever._fetch_frames(conn, text("SELECT * FROM t"), {}, chunk_size=2))
+            self.assertEqual([len(frame) for frame in frames], [2, 1])
+            self.assertEqual(frames[0]['valeurfonc'].dtype, np.float64)
+
+            empty = list(SupabaseDataRetriever._fetch_frames(conn, text("SELECT * FROM t WHERE 0"), {}))
+            self.assertEqual(len(empty), 1)
+            self.assertEqual(list(empty[0].columns), ['idmutation', 'valeurfonc'])
+
+    def test_legacy_wkt_query(self):
+        """Legacy mode still returns WKT geometry"""
+        query = SupabaseDataRetriever._comparables_query(geometrie_sql=False)
+        self.assertIn('ST_AsText(geomlocmut)', query)
+        self.assertNotIn('distance_km', query)
+
+
+class TestEngineConfiguration(unittest.TestCase):
+    """Test connection pool settings (no database needed)"""
+
+    def test_pool_settings(self):
+        """Pool size, pre-ping and recycling are configured explicitly"""
+        retriever = SupabaseDataRetriever(pool_size=3, pool_recycle=600)
+        pool = retriever.engine.pool
+        self.assertEqual(pool.size(), 3)
+        self.assertTrue(pool._pre_ping)
+        self.assertEqual(pool._recycle, 600)
+
+    def test_comparables_params(self):
+        """Bound parameters include the Lambert 93 target point and radius in meters"""
+        params = SupabaseDataRetriever._comparables_params(46.3787, 6.4812, "Maison", 50, 100, 5.0, 3, 0)
+        self.assertEqual(params['type_pattern'], "%MAISON%")
+        self.assertEqual(params['rayon_m'], 5000)
+        self.assertEqual(params['limit'], 0)
+        self.assertAlmostEqual(params['x_2154'], 967480, delta=10)
+
+
+class TestCoordinateConversion(unittest.TestCase):
+    """Test vectorized Lambert 93 → WGS84 conversion"""
+
+    def test_wkt_points_converted_in_one_call(self):
+        """WKT parsing and conversion work on whole columns, invalid rows become NaN"""
+        x, y = parse_wkt_points(pd.Series(['POINT(967479.59 6592426.19)', 'POINT EMPTY', None]))
+        lat, lon = lambert93_to_wgs84(x, y)
+        self.assertAlmostEqual(lat[0], 46.3787, places=4)
+        self.assertAlmostEqual(lon[0], 6.4812, places=4)
+        self.assertTrue(np.isnan(lat[1:]).all())
+        self.assertTrue(np.isnan(lon[1:]).all())
+
+
 class TestDataQuality(unittest.TestCase):
     """Test data quality and validation"""
 
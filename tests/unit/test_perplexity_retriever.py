@@ -8,6 +8,8 @@ Phase 5 - EPIC 2: Comparables en Vente
 import pytest
 import asyncio
 import json
+import threading
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 from httpx import AsyncClient, HTTPStatusError, TimeoutException, Response
 
@@ -318,6 +320,35 @@ class TestPerplexityRetriever:
             assert enriched[0]["latitude"] == 46.3727
             assert enriched[0]["longitude"] == 6.4774
 
+    @pytest.mark.asyncio
+    async def test_enrich_with_geocoding_concurrent_and_deduplicated(self, retriever):
+        """Test géocodage parallèle, une requête par adresse distincte"""
+        properties = [
+            PerplexityProperty(address=address)
+            for address in ["Thonon-les-Bains, 74200", "thonon les bains 74200", "Évian-les-Bains", "Annemasse"]
+        ]
+        active = 0
+        max_active = 0
+        lock = threading.Lock()
+
+        def slow_geocode(address):
+            nonlocal active, max_active
+            with lock:
+                active += 1
+                max_active = max(max_active, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            return (46.0, 6.0)
+
+        with patch("src.perplexity_retriever.get_coordinates", side_effect=slow_geocode) as mock_geocode:
+            enriched = await retriever._enrich_with_geocoding(properties)
+
+            assert mock_geocode.call_count == 3
+            assert max_active == 3
+            assert all(prop["latitude"] == 46.0 for prop in enriched)
+            assert [prop["address"] for prop in enriched] == [prop.address for prop in properties]
+
     @pytest.mark.asyncio
     async def test_search_properties_for_sale_full_workflow(self, retriever):
         """Test workflow complet de recherche"""
@@ -374,6 +405,142 @@ class TestPerplexityRetriever:
             assert results == []
 
 
+class TestPerplexityCache:
+    """Tests du cache des recherches et du regroupement des appels identiques"""
+
+    @pytest.fixture
+    def retriever(self):
+        with patch("src.perplexity_retriever.Config.PERPLEXITY_API_KEY", "test-key"):
+            retriever = PerplexityRetriever(cache_ttl=60)
+        content = json.dumps({"properties": [{"address": "Thonon-les-Bains, 74200", "price": 350000.0}]})
+        http_response = MagicMock()
+        http_response.json.return_value = {"choices": [{"message": {"content": content}}]}
+        http_response.raise_for_status = MagicMock()
+
+        async def slow_post(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            return http_response
+
+        retriever.client.post = AsyncMock(side_effect=slow_post)
+        with patch("src.perplexity_retriever.get_coordinates", return_value=(46.3727, 6.4774)):
+            yield retriever
+
+    @pytest.mark.asyncio
+    async def test_identical_searches_hit_cache(self, retriever):
+        first = await retriever.search_properties_for_sale(city="Thonon-les-Bains", postal_code="74200")
+        first[0]["price"] = 0
+        second = await retriever.search_properties_for_sale(city="thonon les bains", postal_code=" 74200")
+        assert retriever.client.post.call_count == 1
+        assert second[0]["price"] == 350000.0
+
+        await retriever.search_properties_for_sale(city="Thonon-les-Bains", postal_code="74200", radius_km=10)
+        assert retriever.client.post.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_searches_are_coalesced(self, retriever):
+        results = await asyncio.gather(*(
+            retriever.search_properties_for_sale(city="Thonon-les-Bains", postal_code="74200")
+            for _ in range(5)
+        ))
+        assert retriever.client.post.call_count == 1
+        assert all(len(result) == 1 for result in results)
+
+    @pytest.mark.asyncio
+    async def test_expired_and_failed_searches_are_not_served(self, retriever):
+        retriever.cache_ttl = 0.01
+        await retriever.search_properties_for_sale(city="Thonon-les-Bains", postal_code="74200")
+        await asyncio.sleep(0.02)
+        await retriever.search_properties_for_sale(city="Thonon-les-Bains", postal_code="74200")
+        assert retriever.client.post.call_count == 2
+
+        retriever.cache_ttl = 60
+        with patch.object(retriever, "_make_request_with_retry", AsyncMock(return_value=None)) as failing:
+            assert await retriever.search_properties_for_sale(city="Evian", postal_code="74500") == []
+            assert await retriever.search_properties_for_sale(city="Evian", postal_code="74500") == []
+            assert failing.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_cache_is_bounded_and_drops_expired_entries(self, retriever):
+        retriever.cache_maxsize = 2
+        for radius_km in (5, 10, 15):
+            await retriever.search_properties_for_sale(city="Thonon-les-Bains", postal_code="74200", radius_km=radius_km)
+        assert len(retriever._cache) == 2
+        # Entrée la plus ancienne évincée
+        await retriever.search_properties_for_sale(city="Thonon-les-Bains", postal_code="74200", radius_km=5)
+        assert retriever.client.post.call_count == 4
+
+        for key in retriever._cache:
+            retriever._cache[key] = (retriever._cache[key][0], time.time() - 1)
+        await retriever.search_properties_for_sale(city="Evian", postal_code="74500")
+        assert len(retriever._cache) == 1
+
+
+class TestPerplexityMultiCommunes:
+    """Tests de la recherche multi-communes et du respect de Retry-After"""
+
+    @pytest.fixture
+    def retriever(self):
+        with patch("src.perplexity_retriever.Config.PERPLEXITY_API_KEY", "test-key"):
+            retriever = PerplexityRetriever(cache_ttl=60)
+            yield retriever
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_honours_retry_after(self, retriever):
+        limited = MagicMock()
+        limited.status_code = 429
+        limited.headers = {"Retry-After": "0.2"}
+        ok = MagicMock()
+        ok.json.return_value = {"choices": []}
+        ok.raise_for_status = MagicMock()
+        retriever.client.post = AsyncMock(side_effect=[
+            HTTPStatusError("Rate limited", request=MagicMock(), response=limited), ok
+        ])
+
+        start = time.monotonic()
+        result = await retriever._make_request_with_retry("test prompt")
+        assert result == {"choices": []}
+        assert time.monotonic() - start >= 0.2
+
+    @pytest.mark.asyncio
+    async def test_select_communes_by_insee_and_radius(self, retriever):
+        communes = await retriever.select_communes(insee_codes=["74281", "74020"])
+        assert sorted(communes["insee_code"]) == ["74020", "74281"]
+
+        positions = {"THONON-LES-BAINS": (46.3705, 6.4793), "ANTHY-SUR-LEMAN": (46.3553, 6.4251)}
+
+        def fake_geocode(address):
+            return positions.get(address.split(",")[0])
+
+        with patch("src.perplexity_retriever.get_coordinates", side_effect=fake_geocode):
+            proches = await retriever.select_communes(center=(46.3705, 6.4793), radius_km=5)
+        assert list(proches["commune"]) == ["THONON-LES-BAINS", "ANTHY-SUR-LEMAN"]
+
+    @pytest.mark.asyncio
+    async def test_search_communes_merges_and_deduplicates(self, retriever):
+        annonces = {
+            "74281": [
+                {"address": "Thonon", "price": 300000.0, "surface": 70.0, "listing_url": "https://ex.fr/a1?src=x"},
+                {"address": "Thonon", "price": 420000.0, "surface": 95.0, "listing_url": None},
+            ],
+            "74020": [
+                {"address": "Anthy", "price": 500000.0, "surface": 110.0, "listing_url": "https://ex.fr/a1/"},
+                {"address": "Anthy", "price": 510000.0, "surface": 120.0, "listing_url": None},
+            ],
+        }
+        postal = {"THONON-LES-BAINS": "74281", "ANTHY-SUR-LEMAN": "74020"}
+
+        async def fake_search(city, postal_code, **kwargs):
+            return [dict(annonce) for annonce in annonces[postal[city]]]
+
+        with patch.object(retriever, "search_properties_for_sale", side_effect=fake_search) as search:
+            results = await retriever.search_communes(insee_codes=["74281", "74020"])
+
+        assert search.call_count == 2
+        # Ordre de insee_mapping.csv; a1 (Thonon) doublon de l'annonce d'Anthy
+        assert [r["price"] for r in results] == [500000.0, 510000.0, 420000.0]
+        assert {r["insee_code"] for r in results} == {"74281", "74020"}
+
+
 # Tests d'intégration optionnels (commentés par défaut)
 # @pytest.mark.integration
 # class TestPerplexityIntegration: